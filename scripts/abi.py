@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Minimal ABI encoding and decoding for `cast`-style signatures such as
+`action()(address)` or `getAddress(bytes32)(address)`.
+
+Supported types: address, bool, uint<N>, int<N>, bytes<N>, bytes, string and
+dynamic arrays (T[]) of those. Nested tuples are not supported.
+"""
+import re
+from typing import Any, List, Sequence, Tuple, Union
+
+from keccak import keccak256
+
+WORD = 32
+
+SIGNATURE_PATTERN = re.compile(r"^\s*(\w*)\s*\(([^()]*)\)\s*(?:\(([^()]*)\))?\s*$")
+
+
+def _split_types(types: str) -> List[str]:
+    return [t.strip() for t in types.split(",") if t.strip()]
+
+
+def parse_signature(signature: str) -> Tuple[str, List[str], List[str]]:
+    """Split `name(inputs)(outputs)` into its name, input types and output types."""
+    match = SIGNATURE_PATTERN.match(signature)
+    if not match:
+        raise ValueError(f"Unsupported signature: {signature}")
+    name, inputs, outputs = match.groups()
+    return name, _split_types(inputs), _split_types(outputs or "")
+
+
+def selector(signature: str) -> bytes:
+    """4-byte function selector of the signature (output types are ignored)."""
+    name, inputs, _ = parse_signature(signature)
+    return keccak256(f"{name}({','.join(inputs)})")[:4]
+
+
+def _is_dynamic(abi_type: str) -> bool:
+    return abi_type in ("bytes", "string") or abi_type.endswith("[]")
+
+
+def _to_bytes(value: Union[bytes, str]) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if value.startswith("0x"):
+        return bytes.fromhex(value[2:])
+    return value.encode("utf-8")
+
+
+def _encode_static(abi_type: str, value: Any) -> bytes:
+    if abi_type == "address":
+        return int(value, 16).to_bytes(WORD, "big")
+    if abi_type == "bool":
+        return int(bool(value)).to_bytes(WORD, "big")
+    if abi_type.startswith("uint"):
+        return int(value).to_bytes(WORD, "big")
+    if abi_type.startswith("int"):
+        return int(value).to_bytes(WORD, "big", signed=True)
+    if abi_type.startswith("bytes"):
+        raw = _to_bytes(value)
+        size = int(abi_type[5:])
+        if len(raw) > size:
+            raise ValueError(f"Value too long for {abi_type}: {value!r}")
+        return raw.ljust(WORD, b"\x00")
+    raise ValueError(f"Unsupported type: {abi_type}")
+
+
+def _encode_dynamic(abi_type: str, value: Any) -> bytes:
+    if abi_type.endswith("[]"):
+        items = list(value)
+        return len(items).to_bytes(WORD, "big") + encode([abi_type[:-2]] * len(items), items)
+    raw = value.encode("utf-8") if abi_type == "string" else _to_bytes(value)
+    return len(raw).to_bytes(WORD, "big") + raw.ljust((len(raw) + WORD - 1) // WORD * WORD, b"\x00")
+
+
+def encode(types: Sequence[str], values: Sequence[Any]) -> bytes:
+    """ABI-encode the values as a tuple of the given types."""
+    if len(types) != len(values):
+        raise ValueError(f"Expected {len(types)} values, got {len(values)}")
+    head_size = WORD * len(types)
+    heads: List[bytes] = []
+    tails: List[bytes] = []
+    for abi_type, value in zip(types, values):
+        if _is_dynamic(abi_type):
+            heads.append((head_size + sum(map(len, tails))).to_bytes(WORD, "big"))
+            tails.append(_encode_dynamic(abi_type, value))
+        else:
+            heads.append(_encode_static(abi_type, value))
+    return b"".join(heads + tails)
+
+
+def _decode_static(abi_type: str, word: bytes) -> Any:
+    if abi_type == "address":
+        return to_checksum_address("0x" + word[-20:].hex())
+    if abi_type == "bool":
+        return int.from_bytes(word, "big") != 0
+    if abi_type.startswith("uint"):
+        return int.from_bytes(word, "big")
+    if abi_type.startswith("int"):
+        return int.from_bytes(word, "big", signed=True)
+    if abi_type.startswith("bytes"):
+        return "0x" + word[: int(abi_type[5:])].hex()
+    raise ValueError(f"Unsupported type: {abi_type}")
+
+
+def _decode_dynamic(abi_type: str, data: bytes, offset: int) -> Any:
+    length = int.from_bytes(data[offset:offset + WORD], "big")
+    start = offset + WORD
+    if abi_type.endswith("[]"):
+        return decode([abi_type[:-2]] * length, data[start:])
+    raw = data[start:start + length]
+    return raw.decode("utf-8") if abi_type == "string" else "0x" + raw.hex()
+
+
+def decode(types: Sequence[str], data: Union[bytes, str]) -> List[Any]:
+    """ABI-decode a tuple of the given types."""
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    values = []
+    for i, abi_type in enumerate(types):
+        word = data[WORD * i:WORD * (i + 1)]
+        if len(word) < WORD:
+            raise ValueError(f"Not enough data to decode {abi_type}")
+        if _is_dynamic(abi_type):
+            values.append(_decode_dynamic(abi_type, data, int.from_bytes(word, "big")))
+        else:
+            values.append(_decode_static(abi_type, word))
+    return values
+
+
+def encode_call(signature: str, *args: Any) -> str:
+    """0x-prefixed calldata for the signature and arguments, like `cast calldata`."""
+    _, inputs, _ = parse_signature(signature)
+    return "0x" + (selector(signature) + encode(inputs, args)).hex()
+
+
+def decode_result(signature: str, data: Union[bytes, str]) -> Any:
+    """Decode the return data of a call using the output types of the signature.
+
+    Returns the single value for one output type, otherwise a tuple.
+    """
+    _, _, outputs = parse_signature(signature)
+    values = decode(outputs, data)
+    return values[0] if len(values) == 1 else tuple(values)
+
+
+def to_checksum_address(address: str) -> str:
+    """EIP-55 checksummed form of the address."""
+    lower = address.lower().removeprefix("0x")
+    digest = keccak256(lower.encode()).hex()
+    return "0x" + "".join(c.upper() if int(digest[i], 16) >= 8 else c for i, c in enumerate(lower))
+
+
+def format_bytes32_string(text: str) -> str:
+    """Right-padded bytes32 of an ASCII string, like `cast --format-bytes32-string`."""
+    raw = text.encode("utf-8")
+    if len(raw) > WORD:
+        raise ValueError(f"String too long for bytes32: {text!r}")
+    return "0x" + raw.ljust(WORD, b"\x00").hex()
+
+
+def parse_bytes32_string(value: Union[bytes, str]) -> str:
+    """ASCII string of a right-padded bytes32, like `cast --parse-bytes32-string`."""
+    return _to_bytes(value).rstrip(b"\x00").decode("utf-8")
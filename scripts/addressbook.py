@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Address Book Engine
+
+Parses every src/test/addresses_*.sol into one index, keyed by book and name and
+reverse-indexed by address, so the books can be checked, diffed against the ChainLog
+and regenerated without grep pipelines.
+
+Rendering a book reproduces its file byte for byte. Only entries whose address changed
+are rewritten, and new entries are aligned like the rest of their book.
+
+Usage:
+    ./scripts/addressbook.py check                  duplicate/conflicting entries, shared addresses
+    ./scripts/addressbook.py lookup <name|address>  every book entry with that name or address
+    ./scripts/addressbook.py diff [--block <n>]     compare addresses_mainnet.sol with the ChainLog snapshot
+    ./scripts/addressbook.py generate [--from-chainlog] [--write]
+"""
+import argparse
+import difflib
+import glob
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from abi import to_checksum_address
+
+ADDRESSES_DIR = "src/test"
+ADDRESSES_GLOB = "addresses_*.sol"
+
+# Chain of every book; wallets and deployers are mainnet address books as well
+BOOK_CHAINS = {
+    "mainnet": "1",
+    "wallets": "1",
+    "deployers": "1",
+    "optimism": "10",
+    "unichain": "130",
+    "base": "8453",
+    "arbitrum": "42161",
+    "avalanche": "43114",
+}
+
+MAPPING_ENTRY_PATTERN = re.compile(r'^(\s*addr\["([A-Za-z0-9_]+)"\]\s*=\s*)(0x[0-9a-fA-F]{40})(\s*;.*)$')
+LIST_ENTRY_PATTERN = re.compile(r"^(\s*)(0x[0-9a-fA-F]{40})(\s*,?\s*(?://\s*(.*?))?\s*)$")
+BOOK_NAME_PATTERN = re.compile(r"addresses_(\w+)\.sol$")
+
+
+class Entry:
+    """A single address of a book, remembering the source line it was parsed from."""
+
+    def __init__(self, book: str, name: str, address: str, line: Optional[str] = None, line_number: int = 0):
+        self.book = book
+        self.name = name
+        self.address = address
+        self.line = line
+        self.line_number = line_number
+        self.parsed_address = address if line is not None else None
+
+    @property
+    def label(self) -> str:
+        return f"{self.book}.{self.name}"
+
+    def __repr__(self) -> str:
+        return f"Entry({self.label}={self.address})"
+
+
+class AddressBook:
+    """One addresses_*.sol file: its entries, and the verbatim lines around them."""
+
+    def __init__(self, path: str):
+        self.path = path
+        match = BOOK_NAME_PATTERN.search(os.path.basename(path))
+        if not match:
+            raise ValueError(f"Not an address book: {path}")
+        self.name = match.group(1)
+        self.chain_id = BOOK_CHAINS.get(self.name)
+        self.is_list = False
+        # Either verbatim lines or entries, in file order
+        self.items: List[Union[str, Entry]] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                self.items.append(self._parse_line(line, line_number))
+
+    def _parse_line(self, line: str, line_number: int) -> Union[str, Entry]:
+        text = line.rstrip("\n")
+        match = MAPPING_ENTRY_PATTERN.match(text)
+        if match:
+            return Entry(self.name, match.group(2), match.group(3), line, line_number)
+        match = LIST_ENTRY_PATTERN.match(text)
+        if match:
+            # `address[]` books have no keys, so entries are named by position and comment
+            self.is_list = True
+            position = sum(isinstance(item, Entry) for item in self.items)
+            name = f"{position}" + (f" ({match.group(4)})" if match.group(4) else "")
+            return Entry(self.name, name, match.group(2), line, line_number)
+        return line
+
+    @property
+    def entries(self) -> List[Entry]:
+        return [item for item in self.items if isinstance(item, Entry)]
+
+    def alignment(self) -> int:
+        """Most common column of the `=` among the entries, used to align new entries."""
+        columns = Counter(
+            entry.line.index("=") + 1 for entry in self.entries if entry.line is not None and not self.is_list
+        )
+        return columns.most_common(1)[0][0] if columns else 50
+
+    def set(self, name: str, address: str) -> Entry:
+        """Update the address of an entry, or add it after the last entry."""
+        for entry in self.entries:
+            if entry.name == name:
+                entry.address = address
+                return entry
+        if self.is_list:
+            raise ValueError(f"Cannot add named entries to {self.path}")
+        entry = Entry(self.name, name, address)
+        last = max((i for i, item in enumerate(self.items) if isinstance(item, Entry)), default=None)
+        if last is None:
+            # Right after the constructor opening
+            last = next(i for i, item in enumerate(self.items) if isinstance(item, str) and "constructor()" in item)
+        self.items.insert(last + 1, entry)
+        return entry
+
+    def _render_entry(self, entry: Entry, width: int) -> str:
+        if entry.line is not None and entry.address == entry.parsed_address:
+            return entry.line
+        if entry.line is not None:
+            # Keep the original padding and comments, only swap the address
+            return entry.line.replace(entry.parsed_address, entry.address, 1)
+        name = f'addr["{entry.name}"]'
+        return f"        {name.ljust(max(width - 9, len(name) + 1))}= {entry.address};\n"
+
+    def render(self) -> str:
+        """Content of the book file, including any updated or added entries."""
+        width = self.alignment()
+        return "".join(
+            self._render_entry(item, width) if isinstance(item, Entry) else item for item in self.items
+        )
+
+    def write(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+
+
+class AddressIndex:
+    """Every address book, indexed by book and name and reverse-indexed by address."""
+
+    def __init__(self, directory: str = ADDRESSES_DIR):
+        paths = sorted(glob.glob(os.path.join(directory, ADDRESSES_GLOB)))
+        if not paths:
+            raise SystemExit(f"No address books found in {directory}")
+        self.books: Dict[str, AddressBook] = {}
+        for path in paths:
+            book = AddressBook(path)
+            self.books[book.name] = book
+        self.reindex()
+
+    def reindex(self) -> None:
+        """Rebuild the lookup tables, e.g. after entries were updated."""
+        self.by_name: Dict[Tuple[str, str], List[Entry]] = defaultdict(list)
+        self.by_address: Dict[str, List[Entry]] = defaultdict(list)
+        for book in self.books.values():
+            for entry in book.entries:
+                self.by_name[(book.name, entry.name)].append(entry)
+                self.by_address[entry.address.lower()].append(entry)
+
+    def __iter__(self) -> Iterable[Entry]:
+        return (entry for book in self.books.values() for entry in book.entries)
+
+    def get(self, book: str, name: str) -> Optional[str]:
+        """Address of the named entry of a book (the last assignment wins, as in Solidity)."""
+        entries = self.by_name.get((book, name))
+        return entries[-1].address if entries else None
+
+    def lookup(self, name_or_address: str) -> List[Entry]:
+        """Entries with the given address, or with the given name in any book."""
+        if re.fullmatch(r"0x[0-9a-fA-F]{40}", name_or_address):
+            return list(self.by_address.get(name_or_address.lower(), []))
+        return [entry for (_, name), entries in self.by_name.items() if name == name_or_address for entry in entries]
+
+    def problems(self) -> List[str]:
+        """Duplicate or conflicting names within a book, and addresses that are not checksummed."""
+        errors = []
+        for (book, name), entries in self.by_name.items():
+            if len(entries) < 2:
+                continue
+            lines = ", ".join(str(entry.line_number) for entry in entries)
+            if len({entry.address for entry in entries}) > 1:
+                errors.append(f"{book}.{name}: conflicting addresses on lines {lines}")
+            else:
+                errors.append(f"{book}.{name}: duplicate entry on lines {lines}")
+        for entry in self:
+            if int(entry.address, 16) and entry.address != to_checksum_address(entry.address):
+                errors.append(f"{entry.label}: {entry.address} is not checksummed")
+        return errors
+
+    def shared_addresses(self) -> Dict[str, List[Entry]]:
+        """Non-zero addresses that appear under more than one name, within or across books and chains."""
+        return {
+            address: entries
+            for address, entries in self.by_address.items()
+            if int(address, 16) and len({(entry.book, entry.name) for entry in entries}) > 1
+        }
+
+
+def diff_chainlog(book: AddressBook, chainlog: Dict[str, str]) -> Tuple[List[str], List[str], List[str]]:
+    """Compare a book with ChainLog entries in one pass.
+
+    Returns:
+        Keys whose address differs, keys missing from the book, and book keys not in the ChainLog.
+    """
+    entries = {entry.name: entry.address for entry in book.entries}
+    mismatched = [key for key in chainlog if key in entries and entries[key].lower() != chainlog[key].lower()]
+    missing = [key for key in chainlog if key not in entries]
+    extra = [key for key in entries if key not in chainlog]
+    return mismatched, missing, extra
+
+
+def load_chainlog(block: Optional[int], sync: bool) -> Dict[str, str]:
+    """ChainLog entries from the local snapshot (see scripts/chainlog.py)."""
+    from chainlog import ChainLogSnapshot
+
+    if sync:
+        from jsonrpc import JsonRpcClient
+
+        client = JsonRpcClient()
+        snapshot = ChainLogSnapshot(chain_id=client.chain_id())
+        snapshot.sync(client)
+    else:
+        snapshot = ChainLogSnapshot()
+    return snapshot.addresses(block)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check, diff and generate the src/test/addresses_*.sol books")
+    parser.add_argument("--dir", default=ADDRESSES_DIR, help=f"Directory of the address books (default: {ADDRESSES_DIR})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("check", help="Report duplicate or conflicting entries and shared addresses")
+    lookup_parser = subparsers.add_parser("lookup", help="Find entries by name or address")
+    lookup_parser.add_argument("queries", nargs="+", metavar="name|address")
+    diff_parser = subparsers.add_parser("diff", help="Compare addresses_mainnet.sol with the ChainLog snapshot")
+    generate_parser = subparsers.add_parser("generate", help="Regenerate the address books from the index")
+    generate_parser.add_argument("--from-chainlog", action="store_true", help="Update mainnet from the ChainLog snapshot")
+    generate_parser.add_argument("--write", action="store_true", help="Write the files instead of printing a diff")
+    for subparser in (diff_parser, generate_parser):
+        subparser.add_argument("--block", type=int, help="ChainLog snapshot block (default: last synced block)")
+        subparser.add_argument("--sync", action="store_true", help="Sync the ChainLog snapshot first")
+    args = parser.parse_args()
+
+    index = AddressIndex(args.dir)
+
+    if args.command == "check":
+        errors = index.problems()
+        for error in errors:
+            print(f"✖ {error}", file=sys.stderr)
+        for address, entries in sorted(index.shared_addresses().items()):
+            print(f"{to_checksum_address(address)}: {', '.join(entry.label for entry in entries)}")
+        if errors:
+            sys.exit(1)
+        print(f"✔ {sum(1 for _ in index)} entries in {len(index.books)} address books")
+
+    elif args.command == "lookup":
+        for query in args.queries:
+            entries = index.lookup(query)
+            if not entries:
+                print(f"✖ {query}: not found", file=sys.stderr)
+            for entry in entries:
+                print(f"{entry.label} {entry.address} ({index.books[entry.book].path}:{entry.line_number})")
+
+    elif args.command == "diff":
+        chainlog = load_chainlog(args.block, args.sync)
+        mismatched, missing, extra = diff_chainlog(index.books["mainnet"], chainlog)
+        for key in mismatched:
+            print(f"✖ {key}: {index.get('mainnet', key)} in the book, {chainlog[key]} in the ChainLog")
+        for key in missing:
+            print(f"✖ {key}: in the ChainLog but not in the book")
+        if extra:
+            print(f"{len(extra)} book entries are not ChainLog keys: {', '.join(extra)}")
+        if mismatched or missing:
+            sys.exit(1)
+        print("✔ addresses_mainnet.sol matches the ChainLog")
+
+    elif args.command == "generate":
+        if args.from_chainlog:
+            book = index.books["mainnet"]
+            for key, address in load_chainlog(args.block, args.sync).items():
+                if index.get("mainnet", key) != address:
+                    book.set(key, address)
+            index.reindex()
+        for book in index.books.values():
+            content = book.render()
+            if args.write:
+                book.write()
+                continue
+            with open(book.path, "r", encoding="utf-8") as f:
+                current = f.read()
+            sys.stdout.writelines(
+                difflib.unified_diff(
+                    current.splitlines(keepends=True), content.splitlines(keepends=True), book.path, book.path
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Spell Archive
+
+Content-addressed storage for the archived spells. Every file is stored once under
+archive/objects/ by the SHA-256 of its content, and every archived spell is a manifest in
+archive/manifests/<name>.json that maps its relative paths to those hashes.
+
+Archived spells that are still plain directories (archive/<date>-DssSpell/) are read the
+same way, so both layouts can be diffed, materialized and indexed.
+
+Usage:
+    ./scripts/archive.py store <date>               archive ./src as <date>-DssSpell
+    ./scripts/archive.py diff <date> [--unified]    compare ./src with the archived spell, per function
+    ./scripts/archive.py checkout <date> [--output <dir>]
+    ./scripts/archive.py pack [<name> ...] [--prune] move archive directories into the store
+    ./scripts/archive.py list
+"""
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from soldiff import diff_sources
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive")
+SOURCE_DIR = "src"
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Relative path -> SHA-256 of the content
+Manifest = Dict[str, str]
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_tree(directory: str) -> Manifest:
+    """Manifest of every file below the directory."""
+    manifest: Manifest = {}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                manifest[os.path.relpath(path, directory).replace(os.sep, "/")] = hash_bytes(f.read())
+    return manifest
+
+
+def spell_name(date_or_name: str) -> str:
+    """Archive name for a date such as `2025-01-09`, or the name itself."""
+    return f"{date_or_name}-DssSpell" if DATE_PATTERN.match(date_or_name) else date_or_name
+
+
+class ArchiveStore:
+    """Object store and manifests of the archived spells."""
+
+    def __init__(self, root: str = ARCHIVE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifests_dir = os.path.join(root, "manifests")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.manifests_dir, f"{name}.json")
+
+    def put(self, data: bytes) -> str:
+        """Store the content unless it is already stored, and return its hash."""
+        digest = hash_bytes(data)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so an interrupted run never leaves a partial object
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with open(self._object_path(digest), "rb") as f:
+            return f.read()
+
+    def names(self) -> List[str]:
+        """Names of every archived spell, stored or still a plain directory, in date order."""
+        names = set()
+        if os.path.isdir(self.manifests_dir):
+            names.update(name[:-len(".json")] for name in os.listdir(self.manifests_dir) if name.endswith(".json"))
+        names.update(
+            name
+            for name in os.listdir(self.root)
+            if name.endswith("Spell") and os.path.isdir(os.path.join(self.root, name))
+        )
+        return sorted(names)
+
+    def is_stored(self, name: str) -> bool:
+        return os.path.exists(self._manifest_path(name))
+
+    def manifest(self, name: str) -> Manifest:
+        """Manifest of an archived spell, hashing its directory when it is not stored yet."""
+        if self.is_stored(name):
+            with open(self._manifest_path(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        directory = os.path.join(self.root, name)
+        if not os.path.isdir(directory):
+            raise SystemExit(f"No archived spell named {name}")
+        return hash_tree(directory)
+
+    def digest(self, name: str, path: str) -> Optional[str]:
+        """Hash of a single file of an archived spell, or None if the spell has no such file."""
+        if self.is_stored(name):
+            return self.manifest(name).get(path)
+        full_path = os.path.join(self.root, name, path)
+        if not os.path.isfile(full_path):
+            return None
+        with open(full_path, "rb") as f:
+            return hash_bytes(f.read())
+
+    def stat(self, name: str, path: str) -> Optional[Tuple[int, int]]:
+        """Modification time and size of what a file of an archived spell is read from.
+
+        That is the manifest of a stored spell, and the file itself otherwise. Unlike the
+        digest, this tells whether a file may have changed without reading it.
+        """
+        full_path = self._manifest_path(name) if self.is_stored(name) else os.path.join(self.root, name, path)
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def read(self, name: str, path: str, manifest: Optional[Manifest] = None) -> bytes:
+        """Content of a file of an archived spell."""
+        if self.is_stored(name):
+            return self.get((manifest or self.manifest(name))[path])
+        with open(os.path.join(self.root, name, path), "rb") as f:
+            return f.read()
+
+    def store_tree(self, directory: str, name: str) -> Manifest:
+        """Archive every file below the directory under the given name."""
+        manifest: Manifest = {}
+        for path in hash_tree(directory):
+            with open(os.path.join(directory, path), "rb") as f:
+                manifest[path] = self.put(f.read())
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        with open(self._manifest_path(name), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return manifest
+
+    def materialize(self, name: str, destination: str) -> None:
+        """Rebuild the directory layout of a stored spell."""
+        for path, digest in self.manifest(name).items():
+            target = os.path.join(destination, *path.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(self._object_path(digest), target)
+
+    def pack(self, name: str, prune: bool = False) -> Manifest:
+        """Move an archive directory into the store, removing the directory if asked to."""
+        directory = os.path.join(self.root, name)
+        manifest = self.store_tree(directory, name)
+        if prune:
+            shutil.rmtree(directory)
+        return manifest
+
+
+def diff_manifests(old: Manifest, new: Manifest) -> Dict[str, List[str]]:
+    """Paths added, removed and changed between two manifests, comparing hashes only."""
+    return {
+        "added": sorted(new.keys() - old.keys()),
+        "removed": sorted(old.keys() - new.keys()),
+        "changed": sorted(path for path in old.keys() & new.keys() if old[path] != new[path]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed archive of the spells")
+    parser.add_argument("--archive", default=ARCHIVE_DIR, help="Archive directory (default: ./archive)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    store_parser = subparsers.add_parser("store", help="Archive the spell sources")
+    diff_parser = subparsers.add_parser("diff", help="Compare the spell sources with an archived spell")
+    for subparser in (store_parser, diff_parser):
+        subparser.add_argument("date", help="Date (YYYY-MM-DD) or name of the archived spell")
+        subparser.add_argument("--src", default=SOURCE_DIR, help=f"Spell sources (default: ./{SOURCE_DIR})")
+    diff_parser.add_argument("--unified", action="store_true", help="Show the changed lines of every changed function")
+    diff_parser.add_argument("--text", action="store_true", help="Diff Solidity files line by line, like diff -u")
+    checkout_parser = subparsers.add_parser("checkout", help="Rebuild the directory of an archived spell")
+    checkout_parser.add_argument("date", help="Date (YYYY-MM-DD) or name of the archived spell")
+    checkout_parser.add_argument("--output", help="Target directory (default: archive/<name>)")
+    pack_parser = subparsers.add_parser("pack", help="Move archive directories into the store")
+    pack_parser.add_argument("names", nargs="*", metavar="name", help="Archived spells (default: all directories)")
+    pack_parser.add_argument("--prune", action="store_true", help="Remove the directories once stored")
+    subparsers.add_parser("list", help="List the archived spells")
+    args = parser.parse_args()
+
+    store = ArchiveStore(args.archive)
+
+    if args.command in ("store", "diff", "checkout") and not args.date.replace("date=", ""):
+        sys.exit(f"You must provide a date (YYYY-MM-DD) option to {args.command} the archived spell")
+
+    if args.command == "store":
+        name = spell_name(args.date.replace("date=", ""))
+        store.store_tree(args.src, name)
+        print(f"Spell, tests and base stored in the archive as {name}")
+
+    elif args.command == "diff":
+        name = spell_name(args.date.replace("date=", ""))
+        archived = store.manifest(name)
+        current = hash_tree(args.src)
+        changes = diff_manifests(archived, current)
+        for path in changes["removed"]:
+            print(f"Only in archive/{name}: {path}")
+        for path in changes["added"]:
+            print(f"Only in {args.src}: {path}")
+        # Only the files whose hashes differ are opened
+        differs = bool(changes["added"] or changes["removed"])
+        for path in changes["changed"]:
+            old = store.read(name, path, archived).decode("utf-8", errors="replace")
+            with open(os.path.join(args.src, path), "r", encoding="utf-8", errors="replace") as f:
+                new = f.read()
+            if path.endswith(".sol") and not args.text:
+                lines = diff_sources(old, new, f"archive/{name}/{path}", f"{args.src}/{path}", args.unified)
+                if lines:
+                    print(f"{path}:")
+                    print("\n".join(f"  {line}" for line in lines))
+                    differs = True
+                continue
+            sys.stdout.writelines(
+                difflib.unified_diff(
+                    old.splitlines(keepends=True),
+                    new.splitlines(keepends=True),
+                    f"archive/{name}/{path}",
+                    f"{args.src}/{path}",
+                )
+            )
+            differs = True
+        if differs:
+            sys.exit(1)
+        print(f"Spell, tests and base match the archive directory {name}")
+
+    elif args.command == "checkout":
+        name = spell_name(args.date.replace("date=", ""))
+        if not store.is_stored(name):
+            sys.exit(f"{name} is not in the archive store")
+        destination = args.output or os.path.join(store.root, name)
+        store.materialize(name, destination)
+        print(f"{name} materialized in {destination}")
+
+    elif args.command == "pack":
+        names = args.names or [name for name in store.names() if not store.is_stored(name)]
+        for name in names:
+            manifest = store.pack(spell_name(name), prune=args.prune)
+            print(f"{spell_name(name)}: {len(manifest)} files")
+
+    elif args.command == "list":
+        for name in store.names():
+            print(f"{name}{'' if store.is_stored(name) else ' (directory)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Spell Gas Benchmark
+
+Casts archived spells, and the spell in src/, on local forks and records their deploy
+gas, schedule and cast gas, storage writes and logs in cache/spell-benchmarks.jsonl.
+Every spell is compared with the spell archived before it, so spells that get close to
+the block gas limit, or use much more gas than their predecessor, are flagged early.
+
+Archived spells are cast on a fork pinned to the block they were deployed in (from their
+test/config.sol), where they exist but are not cast yet; their deploy gas is read from
+the receipt of their creation transaction, found through Etherscan. The spell in src/ is
+built, deployed and cast on a fork of the latest (or given) block. Forks are leased from
+the warm fork pool, so spells at different blocks are benchmarked in parallel.
+
+Usage:
+    ./scripts/benchmark.py run [<date or name> ...] [--last <n>] [--current] OR
+    ./scripts/benchmark.py show OR
+    make benchmark [spells="<date> ..."] [last=<n>]
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from archive import ArchiveStore, spell_name
+from etherscan import EtherscanClient
+from forkpool import POOL_SIZE, ForkPool
+from jsonrpc import JsonRpcClient
+from simulate import TRANSACTION_GAS, simulate
+from spellconfig import SpellConfig
+from testprofile import git_commit
+
+CHAIN_ID = "1"
+HISTORY_PATH = os.path.join("cache", "spell-benchmarks.jsonl")
+CURRENT = "current"
+CONFIG_PATH = "test/config.sol"
+BYTECODE_PATH = os.path.join("out", "DssSpell.sol", "DssSpell.json")
+DEFAULT_LAST = 5
+# Share of the block gas limit above which the cast gas is flagged
+BLOCK_GAS_WARNING = 0.5
+# A spell regressed if it takes this many times as much deploy or cast gas as the previous spell.
+# Gas does not vary between runs like test durations do, so this is tighter than for the tests
+GAS_REGRESSION_THRESHOLD = 1.1
+
+# Benchmark record by spell name
+Records = Dict[str, Dict[str, Any]]
+
+
+def archived_spells(store: ArchiveStore) -> List[str]:
+    """Names of the archived DssSpells, in date order."""
+    return [name for name in store.names() if name.endswith("-DssSpell")]
+
+
+def deployment(store: ArchiveStore, name: str) -> Tuple[str, int]:
+    """Address and deployment block of an archived spell, from its config."""
+    config = SpellConfig(store.read(name, CONFIG_PATH).decode(), f"{name}/{CONFIG_PATH}")
+    address, block = config.get("deployed_spell"), config.get("deployed_spell_block")
+    if int(address, 16) == 0 or block == 0:
+        raise ValueError(f"{name} has no deployed spell address and block in its config")
+    return address, block
+
+
+def deploy_gas(client: JsonRpcClient, etherscan: Optional[EtherscanClient], addresses: List[str]) -> List[Any]:
+    """Gas used by the creation transaction of every address; None without an Etherscan key."""
+    if etherscan is None or not addresses:
+        return [None] * len(addresses)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        creations = list(executor.map(etherscan.contract_creation, addresses))
+    receipts = client.batch([("eth_getTransactionReceipt", [c["txHash"]]) for c in creations], raise_errors=False)
+    return [int(r["gasUsed"], 16) if isinstance(r, dict) else None for r in receipts]
+
+
+def _record(report: Dict[str, Any], block: int, block_gas_limit: int, gas: Optional[int]) -> Dict[str, Any]:
+    diff = report["state_diff"]
+    return {
+        "address": report["spell"],
+        "block": block,
+        "block_gas_limit": block_gas_limit,
+        "deploy_gas": gas,
+        "schedule_gas": report["schedule_gas"],
+        "cast_gas": report["cast_gas"],
+        "storage_writes": None if diff is None else sum(len(d.get("storage", {})) for d in diff.values()),
+        "logs": len(report["logs"]),
+        "success": report["success"],
+    }
+
+
+def benchmark_archived(upstream: str, address: str, block: int, gas: Optional[int]) -> Dict[str, Any]:
+    """Cast a deployed spell on a fork of its deployment block."""
+    with ForkPool().lease(upstream, block) as fork:
+        client = JsonRpcClient(fork.url)
+        block_gas_limit = int(client.request("eth_getBlockByNumber", ["latest", False])["gasLimit"], 16)
+        return _record(simulate(client, address), block, block_gas_limit, gas)
+
+
+def benchmark_current(upstream: str, block: Optional[int], bytecode: str) -> Dict[str, Any]:
+    """Deploy the built spell on a fork and cast it."""
+    with ForkPool().lease(upstream, block) as fork:
+        client = JsonRpcClient(fork.url)
+        fork_block = client.request("eth_getBlockByNumber", ["latest", False])
+        client.request("evm_setBlockGasLimit", [hex(TRANSACTION_GAS)])
+        sender = client.request("eth_accounts")[0]
+        tx_hash = client.request(
+            "eth_sendTransaction", [{"from": sender, "data": bytecode, "gas": hex(TRANSACTION_GAS)}]
+        )
+        receipt = client.request("eth_getTransactionReceipt", [tx_hash])
+        if not receipt or int(receipt["status"], 16) != 1:
+            raise SystemExit(f"Deploying the spell reverted: {tx_hash}")
+        report = simulate(client, receipt["contractAddress"])
+        block, block_gas_limit = int(fork_block["number"], 16), int(fork_block["gasLimit"], 16)
+        return _record(report, block, block_gas_limit, int(receipt["gasUsed"], 16))
+
+
+class BenchmarkHistory:
+    """Recorded benchmark runs, appended as JSON lines."""
+
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+
+    def runs(self) -> List[dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def record(self, spells: Records) -> dict:
+        """Append a run and return it."""
+        run = {
+            "id": datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S"),
+            "commit": git_commit(),
+            "spells": spells,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, sort_keys=True) + "\n")
+        return run
+
+    def latest(self) -> Records:
+        """Latest successful record of every spell benchmarked so far."""
+        records: Records = {}
+        for run in self.runs():
+            for name, record in run["spells"].items():
+                if record.get("success"):
+                    records[name] = record
+        return records
+
+
+def previous_spell(names: List[str], name: str) -> Optional[str]:
+    """The spell archived before the named one; the latest archived one for the current spell."""
+    if name == CURRENT:
+        return names[-1] if names else None
+    index = names.index(name)
+    return names[index - 1] if index > 0 else None
+
+
+def regressions(
+    records: Records, latest: Records, names: List[str], threshold: float = GAS_REGRESSION_THRESHOLD
+) -> List[str]:
+    """Lines reporting every spell close to the block gas limit or using more gas than the previous spell."""
+    lines = []
+    for name, record in records.items():
+        if not record.get("success"):
+            lines.append(f"✖ {name}: {record.get('error') or 'the cast reverted'}")
+            continue
+        if record["cast_gas"] > record["block_gas_limit"] * BLOCK_GAS_WARNING:
+            share = record["cast_gas"] / record["block_gas_limit"]
+            lines.append(f"✖ {name}: the cast uses {share:.0%} of the block gas limit")
+        previous = previous_spell(names, name)
+        before = latest.get(previous) if previous else None
+        if before is None:
+            continue
+        for field in ("deploy_gas", "cast_gas"):
+            if record.get(field) and before.get(field) and record[field] > before[field] * threshold:
+                lines.append(f"✖ {name}: {field} {before[field]} ({previous}) -> {record[field]}")
+    return lines
+
+
+def _format(value: Any) -> str:
+    return "-" if value is None else str(value)
+
+
+def print_records(records: Records) -> None:
+    width = max([len(name) for name in records] + [5])
+    print(f"{'spell':<{width}} {'block':>9} {'deploy gas':>11} {'cast gas':>11} {'writes':>7} {'logs':>5}")
+    for name, record in records.items():
+        if "error" in record:
+            print(f"{name:<{width}} {record['error']}")
+            continue
+        print(
+            f"{name:<{width}} {record['block']:>9} {_format(record['deploy_gas']):>11} {record['cast_gas']:>11} "
+            f"{_format(record['storage_writes']):>7} {record['logs']:>5}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gas of archived spells and the current spell")
+    parser.add_argument("--history", default=HISTORY_PATH, help=f"History file (default: {HISTORY_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Cast the spells on local forks and record their gas")
+    run_parser.add_argument("spells", nargs="*", metavar="spell", help="Archived spell date or name")
+    run_parser.add_argument("--last", type=int, help=f"Also the last n archived spells (default: {DEFAULT_LAST})")
+    run_parser.add_argument("--current", action="store_true", help="Also the spell in src/ (default when no spells are given)")
+    run_parser.add_argument("--block", type=int, help="Fork block of the current spell (default: latest)")
+    run_parser.add_argument("--jobs", type=int, default=POOL_SIZE, help="Spells cast in parallel")
+    run_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=GAS_REGRESSION_THRESHOLD,
+        help=f"Ratio of the gas of the previous spell that is a regression (default: {GAS_REGRESSION_THRESHOLD})",
+    )
+    subparsers.add_parser("show", help="Show the latest record of every spell")
+    args = parser.parse_args()
+
+    history = BenchmarkHistory(args.history)
+    store = ArchiveStore()
+    names = archived_spells(store)
+
+    if args.command == "show":
+        latest = history.latest()
+        print_records({name: latest[name] for name in names + [CURRENT] if name in latest})
+        return
+
+    upstream = os.environ.get("ETH_RPC_URL")
+    if not upstream:
+        sys.exit("Please set ETH_RPC_URL environment variable with RPC url")
+    client = JsonRpcClient(upstream)
+    if client.chain_id() != CHAIN_ID:
+        sys.exit("Please set a Mainnet ETH_RPC_URL")
+    api_key = os.environ.get("ETHERSCAN_API_KEY")
+    if not api_key:
+        print("ETHERSCAN_API_KEY is not set, the deploy gas of archived spells is left out", file=sys.stderr)
+
+    selected = [spell_name(spell.replace("spells=", "")) for spell in args.spells if spell.replace("spells=", "")]
+    for name in selected:
+        if name not in names:
+            sys.exit(f"No archived spell named {name}")
+    current = args.current or not (selected or args.last)
+    last = args.last if args.last is not None else (0 if selected else DEFAULT_LAST)
+    selected += [name for name in names[len(names) - last:] if last and name not in selected]
+    selected.sort(key=names.index)
+
+    records: Records = {}
+    deployments = {}
+    for name in selected:
+        try:
+            deployments[name] = deployment(store, name)
+        except (KeyError, ValueError) as error:
+            records[name] = {"success": False, "error": str(error)}
+    gas = deploy_gas(
+        client, EtherscanClient(api_key, CHAIN_ID) if api_key else None, [a for a, _ in deployments.values()]
+    )
+
+    bytecode = None
+    if current:
+        subprocess.run(["forge", "build", "--quiet"], check=True)
+        with open(BYTECODE_PATH, "r", encoding="utf-8") as f:
+            bytecode = json.load(f)["bytecode"]["object"]
+
+    print(f"Benchmarking {len(deployments) + current} spell(s)", flush=True)
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {
+            name: executor.submit(benchmark_archived, upstream, address, block, spell_gas)
+            for (name, (address, block)), spell_gas in zip(deployments.items(), gas)
+        }
+        if current:
+            futures[CURRENT] = executor.submit(benchmark_current, upstream, args.block, bytecode)
+        for name, future in futures.items():
+            try:
+                records[name] = future.result()
+            except (SystemExit, Exception) as error:
+                records[name] = {"success": False, "error": str(error)}
+
+    records = {name: records[name] for name in selected + [CURRENT] if name in records}
+    # The previous spells are compared with their latest record, made before this run or in it
+    latest = history.latest()
+    history.record(records)
+    latest.update({name: record for name, record in records.items() if record.get("success")})
+    print_records(records)
+    problems = regressions(records, latest, names, args.threshold)
+    if problems:
+        print("\n".join(problems))
+        sys.exit(1)
+    print("No gas regressions")
+
+
+if __name__ == "__main__":
+    main()
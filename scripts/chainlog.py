@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+ChainLog lookups over the shared JSON-RPC client, and a local ChainLog snapshot store.
+
+Every lookup of many keys is sent as one batched set of `eth_call`s instead of
+one `cast call` per key.
+
+The snapshot store is an SQLite file that records every ChainLog change by block
+number, together with the ChainLog `version()`. It is bootstrapped once from
+`list()`/`getAddress()` and then only follows the `UpdateAddress`/`RemoveAddress`
+logs emitted since the last sync, so lookups afterwards need no RPC at all.
+Entries are listed sorted by key, and exported in the order of addresses_mainnet.sol.
+
+Usage:
+    ./scripts/chainlog.py sync
+    ./scripts/chainlog.py get <key> [<key> ...] [--block <number>]
+    ./scripts/chainlog.py list [--block <number>]
+    ./scripts/chainlog.py export [--block <number>] [--book <path>] [--output <path>]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from abi import decode, decode_result, format_bytes32_string, parse_bytes32_string, to_checksum_address
+from addressbook import ADDRESSES_DIR, AddressBook
+from jsonrpc import JsonRpcClient, RpcError, eth_call, to_block_tag
+from keccak import keccak256_hex
+
+CHANGELOG = "0xdA0Ab1e0017DEbCd72Be8599041a2aa3bA7e740F"
+
+LIST_SIGNATURE = "list()(bytes32[])"
+GET_ADDRESS_SIGNATURE = "getAddress(bytes32)(address)"
+VERSION_SIGNATURE = "version()(string)"
+
+UPDATE_ADDRESS_TOPIC = keccak256_hex("UpdateAddress(bytes32,address)")
+REMOVE_ADDRESS_TOPIC = keccak256_hex("RemoveAddress(bytes32)")
+UPDATE_VERSION_TOPIC = keccak256_hex("UpdateVersion(string)")
+
+CHAIN_NAMES = {"1": "ethlive"}
+
+ADDRESSES_MAINNET = os.path.join(ADDRESSES_DIR, "addresses_mainnet.sol")
+
+SNAPSHOT_DIR = os.environ.get(
+    "CHAINLOG_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache"),
+)
+# Blocks to stay behind the chain head, so that synced logs are never reorged
+CONFIRMATIONS = 12
+# Block range of a single `eth_getLogs` request, within common provider limits
+LOG_BLOCK_RANGE = int(os.environ.get("CHAINLOG_LOG_BLOCK_RANGE", "10000"))
+
+ADDRESSES_SOL_HEADER = """\
+// SPDX-FileCopyrightText: © 2020 Dai Foundation <www.daifoundation.org>
+// SPDX-License-Identifier: AGPL-3.0-or-later
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU Affero General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU Affero General Public License for more details.
+//
+// You should have received a copy of the GNU Affero General Public License
+// along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+pragma solidity 0.8.16;
+
+contract Addresses {
+
+    mapping (bytes32 => address) public addr;
+
+    constructor() {
+"""
+
+ADDRESSES_SOL_FOOTER = """\
+    }
+}
+"""
+
+
+def decode_or_none(signature: str, result: Any) -> Any:
+    """Decode a batched `eth_call` result, or None if it reverted or returned no data."""
+    if isinstance(result, RpcError) or not result or result == "0x":
+        return None
+    try:
+        return decode_result(signature, result)
+    except ValueError:
+        return None
+
+
+def list_keys(client: JsonRpcClient, block: str = "latest") -> List[str]:
+    """All ChainLog keys, as strings."""
+    return [parse_bytes32_string(key) for key in client.call(CHANGELOG, LIST_SIGNATURE, block=block)]
+
+
+def get_addresses(client: JsonRpcClient, keys: Sequence[str], block: str = "latest") -> Dict[str, Optional[str]]:
+    """Resolve many ChainLog keys at once; unknown keys map to None."""
+    results = client.batch(
+        [eth_call(CHANGELOG, GET_ADDRESS_SIGNATURE, format_bytes32_string(key), block=block) for key in keys],
+        raise_errors=False,
+    )
+    return {key: decode_or_none(GET_ADDRESS_SIGNATURE, result) for key, result in zip(keys, results)}
+
+
+def resolve(client: JsonRpcClient, key_or_address: str, block: str = "latest") -> str:
+    """Address of a ChainLog key, or the argument itself when it already is an address."""
+    if key_or_address.startswith("0x"):
+        return key_or_address
+    address = get_addresses(client, [key_or_address], block=block)[key_or_address]
+    if address is None:
+        raise SystemExit(f"Could not find {key_or_address} in the ChainLog")
+    return address
+
+
+def _event_words(log: dict) -> List[bytes]:
+    """Indexed and non-indexed 32-byte words of a log, in declaration order."""
+    data = bytes.fromhex(log["data"][2:])
+    return [bytes.fromhex(topic[2:]) for topic in log["topics"][1:]] + [
+        data[i:i + 32] for i in range(0, len(data), 32)
+    ]
+
+
+class ChainLogSnapshot:
+    """SQLite store of every ChainLog change since the snapshot was bootstrapped."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS changes (
+            block INTEGER NOT NULL,
+            log_index INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            address TEXT,
+            PRIMARY KEY (block, log_index, key)
+        );
+        CREATE TABLE IF NOT EXISTS versions (block INTEGER PRIMARY KEY, version TEXT NOT NULL);
+    """
+
+    def __init__(self, path: Optional[str] = None, chain_id: str = "1"):
+        self.path = path or os.path.join(SNAPSHOT_DIR, f"chainlog-{chain_id}.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(self.SCHEMA)
+
+    def _meta(self, name: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def first_block(self) -> Optional[int]:
+        """Block the snapshot was bootstrapped at; older blocks cannot be looked up."""
+        value = self._meta("first_block")
+        return int(value) if value is not None else None
+
+    @property
+    def synced_block(self) -> Optional[int]:
+        """Last block whose logs are included in the snapshot."""
+        value = self._meta("synced_block")
+        return int(value) if value is not None else None
+
+    def version(self, block: Optional[int] = None) -> Optional[str]:
+        """ChainLog `version()` as of the given block (default: last synced block)."""
+        row = self.db.execute(
+            "SELECT version FROM versions WHERE block <= ? ORDER BY block DESC LIMIT 1",
+            (self._check_block(block),),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _check_block(self, block: Optional[int]) -> int:
+        if self.synced_block is None:
+            raise SystemExit(f"ChainLog snapshot {self.path} is empty, please sync it first")
+        if block is None:
+            return self.synced_block
+        if not self.first_block <= block <= self.synced_block:
+            raise SystemExit(
+                f"Block {block} is outside of the snapshot range {self.first_block}-{self.synced_block}"
+            )
+        return block
+
+    def addresses(self, block: Optional[int] = None) -> Dict[str, str]:
+        """Every ChainLog entry as of the given block (default: last synced block), sorted by key."""
+        entries: Dict[str, str] = {}
+        rows = self.db.execute(
+            "SELECT key, address FROM changes WHERE block <= ? ORDER BY block, log_index, rowid",
+            (self._check_block(block),),
+        )
+        for key, address in rows:
+            if address is None:
+                entries.pop(key, None)
+            else:
+                entries[key] = address
+        return dict(sorted(entries.items()))
+
+    def get(self, key: str, block: Optional[int] = None) -> Optional[str]:
+        """Address of a ChainLog key as of the given block (default: last synced block)."""
+        row = self.db.execute(
+            "SELECT address FROM changes WHERE key = ? AND block <= ? "
+            "ORDER BY block DESC, log_index DESC, rowid DESC LIMIT 1",
+            (key, self._check_block(block)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name: str, value: Any) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+
+    def _bootstrap(self, client: JsonRpcClient, block: int) -> None:
+        tag = to_block_tag(block)
+        keys = list_keys(client, block=tag)
+        addresses = get_addresses(client, keys, block=tag)
+        version = client.call(CHANGELOG, VERSION_SIGNATURE, block=tag)
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO changes (block, log_index, key, address) VALUES (?, -1, ?, ?)",
+                [(block, key, addresses[key]) for key in keys if addresses[key]],
+            )
+            self.db.execute("INSERT OR REPLACE INTO versions (block, version) VALUES (?, ?)", (block, version))
+            self._set_meta("first_block", block)
+            self._set_meta("synced_block", block)
+
+    def sync(self, client: JsonRpcClient, to_block: Optional[int] = None) -> int:
+        """Bring the snapshot up to the given block (default: head minus confirmations).
+
+        Returns:
+            The number of ChainLog changes that were applied.
+        """
+        if to_block is None:
+            to_block = int(client.request("eth_blockNumber"), 16) - CONFIRMATIONS
+        if self.synced_block is None:
+            self._bootstrap(client, to_block)
+            return len(self.addresses())
+        if to_block <= self.synced_block:
+            return 0
+
+        ranges = [
+            (start, min(start + LOG_BLOCK_RANGE - 1, to_block))
+            for start in range(self.synced_block + 1, to_block + 1, LOG_BLOCK_RANGE)
+        ]
+        topics = [[UPDATE_ADDRESS_TOPIC, REMOVE_ADDRESS_TOPIC, UPDATE_VERSION_TOPIC]]
+        results = client.batch(
+            [
+                ("eth_getLogs", [{
+                    "address": CHANGELOG,
+                    "fromBlock": hex(start),
+                    "toBlock": hex(end),
+                    "topics": topics,
+                }])
+                for start, end in ranges
+            ]
+        )
+
+        changes: List[Tuple[int, int, str, Optional[str]]] = []
+        versions: List[Tuple[int, str]] = []
+        for log in (log for logs in results for log in logs):
+            if log.get("removed"):
+                continue
+            block, log_index = int(log["blockNumber"], 16), int(log["logIndex"], 16)
+            topic = log["topics"][0]
+            if topic == UPDATE_VERSION_TOPIC:
+                versions.append((block, decode(["string"], log["data"])[0]))
+                continue
+            words = _event_words(log)
+            key = parse_bytes32_string(words[0])
+            address = to_checksum_address("0x" + words[1][-20:].hex()) if topic == UPDATE_ADDRESS_TOPIC else None
+            changes.append((block, log_index, key, address))
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO changes (block, log_index, key, address) VALUES (?, ?, ?, ?)", changes
+            )
+            self.db.executemany("INSERT OR REPLACE INTO versions (block, version) VALUES (?, ?)", versions)
+            self._set_meta("synced_block", to_block)
+        return len(changes)
+
+
+def book_order(entries: Dict[str, str], path: str = ADDRESSES_MAINNET) -> Dict[str, str]:
+    """Entries in the order of an address book, so that an export diffs against it.
+
+    Keys that are not in the book follow in the order given. Without the book, the
+    entries are returned as they are.
+    """
+    if not os.path.exists(path):
+        return entries
+    names = list(dict.fromkeys(entry.name for entry in AddressBook(path).entries))
+    positions = {name: position for position, name in enumerate(names)}
+    # sorted() is stable, so keys outside the book keep their order
+    return dict(sorted(entries.items(), key=lambda item: positions.get(item[0], len(positions))))
+
+
+def render_addresses_sol(entries: Dict[str, str]) -> str:
+    """Render entries in the src/test/addresses_mainnet.sol format."""
+    names = {key: f'addr["{key}"]' for key in entries}
+    # Align the `=` like addresses_mainnet.sol does, unless a key is too long for it
+    width = max([len(name) + 1 for name in names.values()] + [41])
+    lines = [f"        {names[key].ljust(width)}= {address};\n" for key, address in entries.items()]
+    return ADDRESSES_SOL_HEADER + "".join(lines) + ADDRESSES_SOL_FOOTER
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the local ChainLog snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("sync", help="Follow the ChainLog logs since the last sync")
+    get_parser = subparsers.add_parser("get", help="Print the address of ChainLog keys")
+    get_parser.add_argument("keys", nargs="+", metavar="key")
+    list_parser = subparsers.add_parser("list", help="Print every ChainLog entry")
+    export_parser = subparsers.add_parser("export", help="Print the entries in addresses_mainnet.sol format")
+    export_parser.add_argument(
+        "--book", default=ADDRESSES_MAINNET, help=f"Address book to follow the order of (default: {ADDRESSES_MAINNET})"
+    )
+    export_parser.add_argument("--output", help="Write to this path instead of stdout")
+    for subparser in (get_parser, list_parser, export_parser):
+        subparser.add_argument("--block", type=int, help="Block to look up at (default: last synced block)")
+        subparser.add_argument("--sync", action="store_true", help="Sync the snapshot before looking up")
+    args = parser.parse_args()
+
+    if args.command == "sync" or args.sync:
+        client = JsonRpcClient()
+        snapshot = ChainLogSnapshot(chain_id=client.chain_id())
+        changes = snapshot.sync(client)
+        print(
+            f"Synced {snapshot.path} to block {snapshot.synced_block} "
+            f"(version {snapshot.version()}, {changes} changes)",
+            file=sys.stderr,
+        )
+    else:
+        snapshot = ChainLogSnapshot()
+
+    if args.command == "get":
+        for key in args.keys:
+            address = snapshot.get(key, args.block)
+            if address is None:
+                sys.exit(f"Could not find {key} in the ChainLog snapshot")
+            print(address)
+    elif args.command == "list":
+        for key, address in snapshot.addresses(args.block).items():
+            print(f"{key} {address}")
+    elif args.command == "export":
+        content = render_addresses_sol(book_order(snapshot.addresses(args.block), args.book))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(content)
+        else:
+            sys.stdout.write(content)
+
+
+if __name__ == "__main__":
+    main()
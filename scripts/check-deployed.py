@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Deployed Spell Checker
+
+Checks the deployed spell set in src/test/config.sol: that it is verified on Etherscan
+with the expected license, solc version, optimizer settings and DssExecLib address, and
+that the deployment block and timestamp in the config match the chain.
+
+All the verification checks share one `getsourcecode` request and the deployment checks
+one `txlistinternal` request (both sent at once over one pooled session and cached on
+disk per spell address) plus one batched JSON-RPC request for the transaction and block.
+
+Usage:
+    ./scripts/check-deployed.py [--json] OR
+    make check-deployed-spell
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from etherscan import EtherscanClient
+from jsonrpc import JsonRpcClient, RpcError
+from solc import compiler_version
+from spellconfig import SpellConfig
+
+CHAIN_ID = "1"
+CONFIG_PATH = "src/test/config.sol"
+FOUNDRY_CONFIG_PATH = "foundry.toml"
+
+# DssSpell data
+LICENSE = "GNU AGPLv3"
+
+LIBRARY_PATTERN = re.compile(r"DssExecLib:(0x[0-9a-fA-F]{40})")
+
+GREEN = "\033[1;32m"
+RED = "\033[1;31m"
+NC = "\033[0m"
+
+# (name, passed, message if passed, message if failed)
+Check = Tuple[str, bool, str, str]
+
+
+def read_library_address(path: str = FOUNDRY_CONFIG_PATH) -> str:
+    """DssExecLib address linked in foundry.toml."""
+    with open(path, "r", encoding="utf-8") as f:
+        match = LIBRARY_PATTERN.search(f.read())
+    return match.group(1) if match else ""
+
+
+def verification_checks(source_code: Dict[str, Any], library: str, solc: str) -> List[Check]:
+    """Checks of the verified source entry of the spell, built with the full solc build `solc`."""
+    # Linked libraries are listed as `Name:address` (the address possibly without 0x), separated by `;`
+    libraries = dict(entry.partition(":")[::2] for entry in source_code.get("Library", "").split(";") if entry)
+    verified_library = libraries.get("DssExecLib", "").lower().removeprefix("0x")
+    return [
+        ("verified", bool(source_code.get("SourceCode")), "DssSpell is verified.", "DssSpell not verified."),
+        (
+            "license",
+            source_code.get("LicenseType") == LICENSE,
+            "DssSpell was verified with a valid license.",
+            "DssSpell was verified with an invalid or unknown license.",
+        ),
+        (
+            "solc",
+            source_code.get("CompilerVersion") == f"v{solc}",
+            "DssSpell solc version matches.",
+            "DssSpell solc version does not match.",
+        ),
+        (
+            "optimizer",
+            source_code.get("OptimizationUsed") != "1",
+            "DssSpell was not compiled with optimizations.",
+            "DssSpell was compiled with optimizations.",
+        ),
+        (
+            "library",
+            bool(library) and verified_library == library.lower().removeprefix("0x"),
+            "DssSpell library matches hardcoded address in foundry.toml.",
+            "DssSpell library does not match hardcoded address.",
+        ),
+    ]
+
+
+def deployment_checks(
+    client: JsonRpcClient, transactions: List[Dict[str, Any]], block: int, timestamp: int
+) -> List[Check]:
+    """Checks of the deployment block and timestamp against the chain."""
+    if not transactions:
+        return [
+            ("timestamp", False, "", "DssSpell deployment transaction not found."),
+            ("block", False, "", "DssSpell deployment transaction not found."),
+        ]
+    deployment = transactions[0]
+    # The block is known from Etherscan already, so the transaction and block are fetched together
+    tx, block_data = client.batch(
+        [
+            ("eth_getTransactionByHash", [deployment["hash"]]),
+            ("eth_getBlockByNumber", [hex(int(deployment["blockNumber"])), False]),
+        ],
+        raise_errors=False,
+    )
+    tx_block = int(tx["blockNumber"], 16) if tx and not isinstance(tx, RpcError) and tx.get("blockNumber") else None
+    found_timestamp = None
+    if tx_block == int(deployment["blockNumber"]) and block_data and not isinstance(block_data, RpcError):
+        found_timestamp = int(block_data["timestamp"], 16)
+    return [
+        (
+            "timestamp",
+            found_timestamp == timestamp,
+            "DssSpell deployment timestamp matches.",
+            "DssSpell deployment timestamp does not match.",
+        ),
+        (
+            "block",
+            tx_block == block,
+            "DssSpell deployment block number matches.",
+            "DssSpell deployment block number does not match.",
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the deployed spell set in the spell test config")
+    parser.add_argument("--config", default=CONFIG_PATH, help=f"Spell test config (default: {CONFIG_PATH})")
+    parser.add_argument("--json", action="store_true", help="Print the checks as JSON")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("ETHERSCAN_API_KEY")
+    if not os.environ.get("ETH_RPC_URL"):
+        sys.exit("Please set a Mainnet ETH_RPC_URL")
+    if not api_key:
+        sys.exit("Please set ETHERSCAN_API_KEY")
+
+    # Read spell address, block number, and timestamp from config.sol
+    config = SpellConfig.read(args.config)
+    address = config.get("deployed_spell")
+    block = config.get("deployed_spell_block")
+    timestamp = config.get("deployed_spell_created")
+    if int(address, 16) == 0 or block == 0 or timestamp == 0:
+        sys.exit("DssSpell address, block number, or timestamp is not set in config file.")
+
+    client = JsonRpcClient()
+    etherscan = EtherscanClient(api_key, CHAIN_ID)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        chain_id = executor.submit(client.chain_id)
+        source_code = executor.submit(etherscan.source_code, address)
+        transactions = executor.submit(etherscan.internal_transactions, address)
+        if chain_id.result() != CHAIN_ID:
+            sys.exit("Please set a Mainnet ETH_RPC_URL")
+        checks = verification_checks(source_code.result(), read_library_address(), compiler_version())
+        checks += deployment_checks(client, transactions.result(), block, timestamp)
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "spell": address,
+                    "block": block,
+                    "timestamp": timestamp,
+                    "checks": {name: passed for name, passed, _, _ in checks},
+                },
+                indent=2,
+            )
+        )
+    else:
+        for _, passed, success, error in checks:
+            if passed:
+                print(f"[{GREEN}✔{NC}] {GREEN}{success}{NC}")
+            else:
+                print(f"[{RED}✖{NC}] {RED}{error}{NC}")
+    if not all(passed for _, passed, _, _ in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Oracle Feed Inspector
+
+Shows the current and next price of OSMs and LP oracles, whether they can be poked, and
+when. The storage slots of the `cur`/`nxt` feeds, `pass()`, `hop()` and `zzz()` of every
+oracle are fetched in one batched request and the packed price words are decoded locally,
+so every PIP in the ChainLog is checked in seconds.
+
+OSMs keep their feeds in storage slots 3 and 4, LP oracles (which have `orb0()`) in slots
+6 and 7. Every feed is a `(uint128 val, uint128 has)` pair packed into one word.
+
+Usage:
+    ./scripts/check-oracle-feed.py <pip> [<pip> ...] [--json] OR
+    ./scripts/check-oracle-feed.py --all OR
+    make feed pip=<pip>
+
+Where <pip> is an address or a ChainLog key (e.g. PIP_ETH)
+"""
+import argparse
+import datetime
+import json
+import sys
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from chainlog import CHAIN_NAMES, decode_or_none, get_addresses, list_keys
+from jsonrpc import JsonRpcClient, RpcError, eth_call, to_block_tag
+
+PASS_SIGNATURE = "pass()(bool)"
+HOP_SIGNATURE = "hop()(uint16)"
+ZZZ_SIGNATURE = "zzz()(uint64)"
+ORB0_SIGNATURE = "orb0()(address)"
+
+# Storage slots of the current and the next feed
+OSM_FEED_SLOTS = (3, 4)
+LP_FEED_SLOTS = (6, 7)
+
+PIP_PREFIX = "PIP_"
+WAD = Decimal(10) ** 18
+
+
+def decode_feed(word: Any) -> Optional[Dict[str, Any]]:
+    """Price and validity of a packed `(uint128 val, uint128 has)` storage word."""
+    if isinstance(word, RpcError) or not word:
+        return None
+    value = int(word, 16)
+    return {"price": Decimal(value & (2**128 - 1)) / WAD, "valid": value >> 128 != 0}
+
+
+def inspect_feeds(
+    client: JsonRpcClient, oracles: Dict[str, str], block: str = "latest"
+) -> Dict[str, Dict[str, Any]]:
+    """State of every oracle, fetched in one batch.
+
+    Args:
+        client: The JSON-RPC client
+        oracles: Oracle addresses by the label to print them with
+        block: Block tag to read at
+
+    Returns:
+        By label: the address, kind (`osm`, `lp` or None when it is no OSM), `pass`,
+        the `current` and `next` feeds and the timestamp of the next possible poke
+    """
+    slots = sorted(set(OSM_FEED_SLOTS + LP_FEED_SLOTS))
+    per_oracle = 4 + len(slots)
+    calls = []
+    for address in oracles.values():
+        calls += [
+            eth_call(address, PASS_SIGNATURE, block=block),
+            eth_call(address, HOP_SIGNATURE, block=block),
+            eth_call(address, ZZZ_SIGNATURE, block=block),
+            eth_call(address, ORB0_SIGNATURE, block=block),
+        ]
+        calls += [("eth_getStorageAt", [address, hex(slot), block]) for slot in slots]
+    results = client.batch(calls, raise_errors=False)
+
+    feeds = {}
+    for index, (label, address) in enumerate(oracles.items()):
+        passes, hop, zzz, orb0, *words = results[index * per_oracle:(index + 1) * per_oracle]
+        storage = dict(zip(slots, words))
+        passes = decode_or_none(PASS_SIGNATURE, passes)
+        if passes is None:
+            kind = None
+        else:
+            kind = "lp" if decode_or_none(ORB0_SIGNATURE, orb0) else "osm"
+        current_slot, next_slot = LP_FEED_SLOTS if kind == "lp" else OSM_FEED_SLOTS
+        hop, zzz = decode_or_none(HOP_SIGNATURE, hop), decode_or_none(ZZZ_SIGNATURE, zzz)
+        feeds[label] = {
+            "address": address,
+            "kind": kind,
+            "pass": passes,
+            "current": decode_feed(storage[current_slot]) if kind else None,
+            "next": decode_feed(storage[next_slot]) if kind else None,
+            "next_poke": zzz + hop if kind and hop is not None and zzz is not None else None,
+        }
+    return feeds
+
+
+def _format_feed(feed: Optional[Dict[str, Any]]) -> str:
+    if feed is None:
+        return "-"
+    return f"{feed['price']:.18f}" + ("" if feed["valid"] else " (invalid)")
+
+
+def _format_time(timestamp: Optional[int]) -> str:
+    if timestamp is None:
+        return "-"
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the current and next prices of oracles")
+    parser.add_argument("pips", nargs="*", metavar="pip", help="Oracle address or ChainLog key, e.g. PIP_ETH")
+    parser.add_argument("--all", action="store_true", help=f"Inspect every {PIP_PREFIX}* key of the ChainLog")
+    parser.add_argument("--block", default="latest", help="Block number or tag to read at (default: latest)")
+    parser.add_argument("--json", action="store_true", help="Print the feeds as JSON")
+    args = parser.parse_args()
+
+    labels = [pip.replace("pip=", "") for pip in args.pips]
+    labels = [label for label in labels if label]
+    if not labels and not args.all:
+        sys.exit("Please specify the oracle address or ChainLog key (e.g. pip=PIP_ETH), or --all")
+
+    client = JsonRpcClient()
+    block = to_block_tag(args.block)
+    if args.all:
+        labels += [key for key in list_keys(client, block=block) if key.startswith(PIP_PREFIX) and key not in labels]
+    keys = [label for label in labels if not label.startswith("0x")]
+    addresses = get_addresses(client, keys, block=block) if keys else {}
+    for key in keys:
+        if addresses[key] is None:
+            sys.exit(f"Could not find {key} in the ChainLog")
+    feeds = inspect_feeds(client, {label: addresses.get(label, label) for label in labels}, block=block)
+
+    if args.json:
+        # Prices are Decimals, printed as strings to keep every digit
+        print(json.dumps(feeds, default=str, indent=2))
+        return
+
+    chain_id = client.chain_id()
+    print(f"Network: {CHAIN_NAMES.get(chain_id, chain_id)}")
+    width = max(len(label) for label in feeds)
+    print(f"{'pip':<{width}} {'kind':<4} {'canPoke':<7} {'this price':>34} {'next price':>34}  next poke")
+    for label, feed in feeds.items():
+        if feed["kind"] is None:
+            print(f"{label:<{width}} not an OSM or LP oracle ({feed['address']})")
+            continue
+        print(
+            f"{label:<{width}} {feed['kind']:<4} {str(feed['pass']).lower():<7} "
+            f"{_format_feed(feed['current']):>34} {_format_feed(feed['next']):>34}  {_format_time(feed['next_poke'])}"
+        )
+
+
+if __name__ == "__main__":
+    main()
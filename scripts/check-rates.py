@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Rates Table Checker
+
+Checks every `rates[bps] = ...` entry of src/test/rates.sol against the computed rate
+curve, and that every basis-point value the spell tests look up in config.sol is present.
+Exits non-zero on any mismatch, duplicate or missing key.
+
+Usage:
+    ./scripts/check-rates.py [--rates <path>] [--config <path>] [--full] OR
+    make check-rates
+"""
+import argparse
+import re
+import sys
+from typing import Dict, List, Set, Tuple
+
+from rates import MAX_BPS, RATES_SOL_PATH, rate
+from spellconfig import SpellConfig
+
+CONFIG_PATH = "src/test/config.sol"
+
+RATE_ENTRY_PATTERN = re.compile(r"^\s*rates\[\s*(\d+)\s*\]\s*=\s*(\d+)\s*;")
+# System values the tests pass to `rates.rates(...)`, next to the `pct` of every collateral
+RATE_SETTER_VALUES = (
+    "stusds_rate_setter_minStr",
+    "stusds_rate_setter_maxStr",
+    "stusds_rate_setter_minDuty",
+    "stusds_rate_setter_maxDuty",
+)
+
+
+def parse_rates(path: str) -> Tuple[Dict[int, int], List[str]]:
+    """Read the rates table in a single streaming pass.
+
+    Returns:
+        The entries by basis points, and the errors found while reading (duplicates).
+    """
+    entries: Dict[int, int] = {}
+    errors: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            match = RATE_ENTRY_PATTERN.match(line)
+            if not match:
+                continue
+            bps, value = int(match.group(1)), int(match.group(2))
+            if bps in entries:
+                errors.append(f"{path}:{line_number}: duplicate entry for {bps} bps")
+            entries[bps] = value
+    return entries, errors
+
+
+def required_keys(config_path: str) -> Set[int]:
+    """Basis-point values from config.sol that the spell tests look up in the rates table."""
+    config = SpellConfig.read(config_path)
+    required = {0} | {config.typed(values["pct"]) for values in config.collaterals.values() if "pct" in values}
+    return required | {config.get(name) for name in RATE_SETTER_VALUES if name in config.system}
+
+
+def check_rates(entries: Dict[int, int], required: Set[int]) -> List[str]:
+    """Compare the entries with the computed rates and report missing required keys."""
+    errors = []
+    for bps in sorted(entries):
+        if bps > MAX_BPS:
+            errors.append(f"rates[{bps}]: out of range (max {MAX_BPS})")
+            continue
+        expected = rate(bps)
+        if entries[bps] != expected:
+            errors.append(f"rates[{bps}]: found {entries[bps]}, expected {expected}")
+    for bps in sorted(required - entries.keys()):
+        errors.append(f"rates[{bps}]: missing")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check src/test/rates.sol against the computed rates")
+    parser.add_argument("--rates", default=RATES_SOL_PATH, help=f"Rates table (default: {RATES_SOL_PATH})")
+    parser.add_argument("--config", default=CONFIG_PATH, help=f"Spell test config (default: {CONFIG_PATH})")
+    parser.add_argument("--full", action="store_true", help=f"Require every key from 0 to {MAX_BPS}")
+    args = parser.parse_args()
+
+    entries, errors = parse_rates(args.rates)
+    required = required_keys(args.config)
+    if args.full:
+        required |= set(range(MAX_BPS + 1))
+    errors += check_rates(entries, required)
+
+    for error in errors:
+        print(f"✖ {error}", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+    print(f"✔ {len(entries)} rates match the computed rate curve")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,74 +2,56 @@
 """
 Automates deployment of the DssSpell contract, updates config with deployment details,
 runs verification and tests, and commits the resulting changes.
+
+The deployment runs as named stages, and the outcome of every stage is saved to a JSON
+checkpoint, so that after a failure `--resume` continues with the stages that did not
+complete yet. In particular the spell is never deployed twice. As soon as the spell
+address is known, verification runs alongside the block/timestamp lookup and the config
+update. The forked test run waits for verification, as `make test` rebuilds out/ and
+cache/, which the verification backends read.
+
+Usage:
+    ./scripts/deploy.py [--resume | --restart]
 """
 
-import re
+import argparse
+import json
 import os
-import sys
 import subprocess
-import json
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Tuple
+
+from flatten import inputs_digest
+from jsonrpc import JsonRpcClient
+from spellconfig import SpellConfig
 
 # Define static variables
 CHAIN_ID = "1"
 PATH_TO_SPELL = "src/DssSpell.sol"
 SPELL_CONTRACT_NAME = "DssSpell"
 PATH_TO_CONFIG = "src/test/config.sol"
+CHECKPOINT_PATH = ".deploy-checkpoint.json"
 
-# Check for uncommitted changes
-git_status = subprocess.run(
-    ["git", "status", "--porcelain"], stdout=subprocess.PIPE, text=True, check=True
-).stdout.strip()
-if git_status:
-    sys.exit(
-        "There are uncommitted changes in the repository. Please commit or stash them before running this script"
-    )
+# Serializes the output of concurrently running stages
+_output_lock = threading.Lock()
 
-# Check env ETH_RPC_URL is set
-ETH_RPC_URL = os.environ.get("ETH_RPC_URL")
-if not ETH_RPC_URL:
-    sys.exit("Please set ETH_RPC_URL environment variable with RPC url")
-
-# Check ETH_RPC_URL is correct
-cast_chain_id = subprocess.run(
-    ["cast", "chain-id"], stdout=subprocess.PIPE, text=True, check=True
-).stdout.strip()
-if cast_chain_id != CHAIN_ID:
-    sys.exit(
-        f'Please provide correct ETH_RPC_URL. Currently set to chain id "{cast_chain_id}", expected "{CHAIN_ID}"'
-    )
-print(f"Using chain id {cast_chain_id}")
-
-# Check env ETHERSCAN_API_KEY is set
-ETHERSCAN_API_KEY = os.environ.get("ETHERSCAN_API_KEY")
-if not ETHERSCAN_API_KEY:
-    sys.exit("Please set ETHERSCAN_API_KEY environment variable")
-
-# Check env ETH_KEYSTORE is set
-ETH_KEYSTORE = os.environ.get("ETH_KEYSTORE")
-if not ETH_KEYSTORE:
-    # Use `cast wallet import --interactive "keystore_name"`
-    sys.exit("Please set ETH_KEYSTORE environment variable with path to the keystore")
-
-# Build deploy command
-deploy_cmd = [
-    "forge",
-    "create",
-    "--no-cache",
-    "--broadcast",
-    "--json",
-    "--keystore",
-    ETH_KEYSTORE,
-    # Last argument is the contract itself
-    f"{PATH_TO_SPELL}:{SPELL_CONTRACT_NAME}",
-]
 
-# Deploy the spell
-print("Deploying a spell...")
-deploy_logs = subprocess.run(
-    deploy_cmd, stdout=subprocess.PIPE, text=True, check=True
-).stdout
-print(deploy_logs)
+def log(message: str, stage: str = "") -> None:
+    """Print every line of the message, prefixed with the stage it comes from."""
+    prefix = f"[{stage}] " if stage else ""
+    with _output_lock:
+        for line in message.splitlines() or [""]:
+            print(f"{prefix}{line}", flush=True)
+
+
+def run_streamed(command: List[str], stage: str) -> int:
+    """Run a command, streaming its output with the stage prefix, and return its exit code."""
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in process.stdout:
+        log(line.rstrip("\n"), stage)
+    return process.wait()
 
 
 # Helper
@@ -81,95 +63,251 @@ def parse_json(raw_data: str, error_type: str):
         sys.exit(f"Could not parse {error_type} as JSON")
 
 
-# Get spell address
-deploy_data = parse_json(deploy_logs, "forge create output")
-spell_address = deploy_data.get("deployedTo")
-if not spell_address:
-    sys.exit("Could not find address of the deployed spell in the output")
-print(f"Extracted spell address: {spell_address}")
-
-# Get spell transaction
-tx_hash = deploy_data.get("transactionHash")
-if not tx_hash:
-    sys.exit("Could not find transaction hash in the output")
-print(f"Extracted transaction hash: {tx_hash}")
-
-# Get deployed contract block number
-tx_block = subprocess.run(
-    ["cast", "tx", tx_hash, "blockNumber"],
-    stdout=subprocess.PIPE,
-    text=True,
-    check=True,
-).stdout.strip()
-print(f"Fetched transaction block: {tx_block}")
-
-# Get deployed contract timestamp
-tx_timestamp = subprocess.run(
-    ["cast", "block", tx_block, "--field", "timestamp"],
-    stdout=subprocess.PIPE,
-    text=True,
-    check=True,
-).stdout.strip()
-print(f"Fetched transaction timestamp: {tx_timestamp}")
-
-# Read config
-with open(PATH_TO_CONFIG, "r", encoding="utf-8") as f:
-    config_content = f.read()
-
-# Edit config
-print(f'Editing config file "{PATH_TO_CONFIG}"...')
-config_content = re.sub(
-    r"(\s*deployed_spell:\s*).*(,)",
-    r"\g<1>address(" + spell_address + r")\g<2>",
-    config_content,
-)
-config_content = re.sub(
-    r"(\s*deployed_spell_block:\s*).*(,)",
-    r"\g<1>" + tx_block + r"\g<2>",
-    config_content,
-)
-config_content = re.sub(
-    r"(\s*deployed_spell_created:\s*).*(,)",
-    r"\g<1>" + tx_timestamp + r"\g<2>",
-    config_content,
-)
-
-# Write back to config
-with open(PATH_TO_CONFIG, "w", encoding="utf-8") as f:
-    f.write(config_content)
-
-# Verify the contract
-subprocess.run(
-    [
-        "make",
-        "verify",
-        f"addr={spell_address}",
-    ],
-    check=True,
-)
-
-# Re-run the tests
-print("Re-running the tests...")
-test_logs = subprocess.run(
-    ["make", "test"], capture_output=True, text=True, check=False
-)
-print(test_logs.stdout)
-
-if test_logs.returncode != 0:
-    print(test_logs.stderr)
-    print("Ensure Tests PASS before commiting the `config.sol` changes!")
-    sys.exit(test_logs.returncode)
-
-# Commit the changes
-print("Commiting changes to the `config.sol`...")
-subprocess.run(
-    [
-        "git",
-        "commit",
-        "-m",
-        "add deployed spell info",
-        "--",
-        PATH_TO_CONFIG,
-    ],
-    check=True,
-)
+class Checkpoint:
+    """Completed stages and the values they produced, saved after every stage."""
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.path = path
+        self.completed: List[str] = []
+        self.values: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.completed, self.values = data["completed"], data["values"]
+        return True
+
+    def complete(self, stage: str, values: Dict[str, str]) -> None:
+        with self._lock:
+            self.values.update(values)
+            self.completed.append(stage)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"completed": self.completed, "values": self.values}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def preflight(values: Dict[str, str]) -> Dict[str, str]:
+    """Check that the working tree is clean, and record the spell sources being deployed."""
+    # Check for uncommitted changes
+    git_status = subprocess.run(
+        ["git", "status", "--porcelain"], stdout=subprocess.PIPE, text=True, check=True
+    ).stdout.strip()
+    if git_status:
+        sys.exit(
+            "There are uncommitted changes in the repository. Please commit or stash them before running this script"
+        )
+    return {"source_digest": inputs_digest(PATH_TO_SPELL)}
+
+
+def deploy(values: Dict[str, str]) -> Dict[str, str]:
+    """Deploy the spell with `forge create`."""
+    # Build deploy command
+    deploy_cmd = [
+        "forge",
+        "create",
+        "--no-cache",
+        "--broadcast",
+        "--json",
+        "--keystore",
+        os.environ["ETH_KEYSTORE"],
+        # Last argument is the contract itself
+        f"{PATH_TO_SPELL}:{SPELL_CONTRACT_NAME}",
+    ]
+
+    # Deploy the spell
+    log("Deploying a spell...", "deploy")
+    deploy_logs = subprocess.run(deploy_cmd, stdout=subprocess.PIPE, text=True, check=True).stdout
+    log(deploy_logs, "deploy")
+
+    # Get spell address
+    deploy_data = parse_json(deploy_logs, "forge create output")
+    spell_address = deploy_data.get("deployedTo")
+    if not spell_address:
+        sys.exit("Could not find address of the deployed spell in the output")
+    log(f"Extracted spell address: {spell_address}", "deploy")
+
+    # Get spell transaction
+    tx_hash = deploy_data.get("transactionHash")
+    if not tx_hash:
+        sys.exit("Could not find transaction hash in the output")
+    log(f"Extracted transaction hash: {tx_hash}", "deploy")
+    return {"spell_address": spell_address, "tx_hash": tx_hash}
+
+
+def lookup(values: Dict[str, str]) -> Dict[str, str]:
+    """Fetch the block number and timestamp of the deployment transaction."""
+    rpc = JsonRpcClient()
+    tx_hash = values["tx_hash"]
+
+    # Get deployed contract block number
+    tx = rpc.request("eth_getTransactionByHash", [tx_hash])
+    if not tx or not tx.get("blockNumber"):
+        sys.exit(f"Could not find block number of transaction {tx_hash}")
+    tx_block = str(int(tx["blockNumber"], 16))
+    log(f"Fetched transaction block: {tx_block}", "lookup")
+
+    # Get deployed contract timestamp
+    block = rpc.request("eth_getBlockByNumber", [tx["blockNumber"], False])
+    tx_timestamp = str(int(block["timestamp"], 16))
+    log(f"Fetched transaction timestamp: {tx_timestamp}", "lookup")
+    return {"tx_block": tx_block, "tx_timestamp": tx_timestamp}
+
+
+def update_config(values: Dict[str, str]) -> Dict[str, str]:
+    """Write the deployment details to the spell test config."""
+    config = SpellConfig.read(PATH_TO_CONFIG)
+
+    # Edit config, only the expressions of the three values change
+    log(f'Editing config file "{PATH_TO_CONFIG}"...', "config")
+    config.set("deployed_spell", f"address({values['spell_address']})")
+    config.set("deployed_spell_block", values["tx_block"])
+    config.set("deployed_spell_created", values["tx_timestamp"])
+
+    # Write back to config
+    config.write()
+    return {}
+
+
+def verify(values: Dict[str, str]) -> Dict[str, str]:
+    """Verify the deployed spell on the block explorers."""
+    returncode = run_streamed(["make", "verify", f"addr={values['spell_address']}"], "verify")
+    if returncode != 0:
+        sys.exit(f"Verification failed with exit code {returncode}")
+    return {}
+
+
+def test(values: Dict[str, str]) -> Dict[str, str]:
+    """Re-run the tests against the deployed spell."""
+    log("Re-running the tests...", "test")
+    returncode = run_streamed(["make", "test"], "test")
+    if returncode != 0:
+        log("Ensure Tests PASS before commiting the `config.sol` changes!", "test")
+        sys.exit(f"Tests failed with exit code {returncode}")
+    return {}
+
+
+def commit(values: Dict[str, str]) -> Dict[str, str]:
+    """Commit the deployment details."""
+    # Commit the changes
+    log("Commiting changes to the `config.sol`...", "commit")
+    subprocess.run(
+        [
+            "git",
+            "commit",
+            "-m",
+            "add deployed spell info",
+            "--",
+            PATH_TO_CONFIG,
+        ],
+        check=True,
+    )
+    return {}
+
+
+# Stages with the stages they depend on, in the order they are started
+STAGES: List[Tuple[str, Callable[[Dict[str, str]], Dict[str, str]], Tuple[str, ...]]] = [
+    ("preflight", preflight, ()),
+    ("deploy", deploy, ("preflight",)),
+    ("verify", verify, ("deploy",)),
+    ("lookup", lookup, ("deploy",)),
+    ("config", update_config, ("lookup",)),
+    # After verify, as the rebuild of the tests rewrites the out/ and cache/ that verify reads
+    ("test", test, ("config", "verify")),
+    ("commit", commit, ("test",)),
+]
+
+
+def run_stages(checkpoint: Checkpoint) -> None:
+    """Run every stage that is not completed yet, each as soon as its dependencies are."""
+    pending = {name: (function, dependencies) for name, function, dependencies in STAGES}
+    for name in checkpoint.completed:
+        pending.pop(name, None)
+    failures: List[str] = []
+
+    with ThreadPoolExecutor(max_workers=len(STAGES)) as executor:
+        running = {}
+        while pending or running:
+            if not failures:
+                for name, (function, dependencies) in list(pending.items()):
+                    if all(dependency in checkpoint.completed for dependency in dependencies):
+                        del pending[name]
+                        # Every stage gets its own copy of the values produced so far
+                        running[executor.submit(function, dict(checkpoint.values))] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    checkpoint.complete(name, future.result())
+                except (Exception, SystemExit) as e:
+                    log(f"Stage failed: {e}", name)
+                    failures.append(name)
+
+    if failures and checkpoint.completed:
+        sys.exit(
+            f"Stage(s) {', '.join(failures)} failed. "
+            f"Fix the issue and run ./scripts/deploy.py --resume to continue from {CHECKPOINT_PATH}"
+        )
+    if failures:
+        sys.exit(f"Stage(s) {', '.join(failures)} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy the spell, update the config, verify and test it")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--resume", action="store_true", help="Continue with the stages that did not complete")
+    group.add_argument("--restart", action="store_true", help="Discard the checkpoint of a previous run")
+    args = parser.parse_args()
+
+    checkpoint = Checkpoint()
+    if args.restart:
+        checkpoint.remove()
+    if args.resume:
+        if not checkpoint.load():
+            sys.exit(f"There is no {CHECKPOINT_PATH} to resume from")
+        if checkpoint.values.get("source_digest") != inputs_digest(PATH_TO_SPELL):
+            sys.exit("The spell sources changed since the checkpoint was created, they no longer match the deployment")
+        log(f"Resuming after the stage(s): {', '.join(checkpoint.completed)}")
+    elif os.path.exists(CHECKPOINT_PATH):
+        sys.exit(
+            f"{CHECKPOINT_PATH} exists from a previous run. "
+            "Use --resume to continue it, or --restart if it must be discarded"
+        )
+
+    # Check env ETH_RPC_URL is set
+    ETH_RPC_URL = os.environ.get("ETH_RPC_URL")
+    if not ETH_RPC_URL:
+        sys.exit("Please set ETH_RPC_URL environment variable with RPC url")
+
+    # Check ETH_RPC_URL is correct
+    rpc_chain_id = JsonRpcClient(ETH_RPC_URL).chain_id()
+    if rpc_chain_id != CHAIN_ID:
+        sys.exit(
+            f'Please provide correct ETH_RPC_URL. Currently set to chain id "{rpc_chain_id}", expected "{CHAIN_ID}"'
+        )
+    print(f"Using chain id {rpc_chain_id}")
+
+    # Check env ETHERSCAN_API_KEY is set
+    if not os.environ.get("ETHERSCAN_API_KEY"):
+        sys.exit("Please set ETHERSCAN_API_KEY environment variable")
+
+    # Check env ETH_KEYSTORE is set
+    if not os.environ.get("ETH_KEYSTORE"):
+        # Use `cast wallet import --interactive "keystore_name"`
+        sys.exit("Please set ETH_KEYSTORE environment variable with path to the keystore")
+
+    run_stages(checkpoint)
+    checkpoint.remove()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Deployed Spell Source Diff
+
+Compares the source Etherscan has for the deployed spell with the local spell, per contract
+and per function. The local side is the flattened spell from scripts/flatten.py, which only
+runs `forge flatten` when one of its inputs changed, and the Etherscan source of an address
+is cached as it never changes, so an unchanged tree is compared without any rebuild.
+
+Usage:
+    ./scripts/diff-deployed.py [<spell address>] [--unified] OR
+    make diff-deployed-spell [spell=<address>]
+"""
+import argparse
+import os
+import re
+import sys
+
+from etherscan import EtherscanClient, verified_sources
+from flatten import flatten
+from soldiff import diff_sources
+from spellconfig import SpellConfig
+
+CONFIG_PATH = "src/test/config.sol"
+
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+
+def get_deployed_spell_address(config_path: str = CONFIG_PATH) -> str:
+    """Deployed spell address from the spell test config."""
+    address = SpellConfig.read(config_path).get("deployed_spell")
+    if int(address, 16) == 0:
+        raise SystemExit("DssSpell address is not set in config file.")
+    return address
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff the deployed spell source against the local spell")
+    parser.add_argument("spell", nargs="?", default="", help=f"Spell address (default: deployed_spell in {CONFIG_PATH})")
+    parser.add_argument("--chain-id", default="1", help="Chain ID of the deployment (default: 1)")
+    parser.add_argument("--unified", action="store_true", help="Show the changed lines of every changed function")
+    args = parser.parse_args()
+
+    api_key = os.environ.get("ETHERSCAN_API_KEY")
+    if not api_key:
+        sys.exit("Please set ETHERSCAN_API_KEY")
+    spell = args.spell.replace("spell=", "")
+    address = spell if ADDRESS_PATTERN.match(spell) else get_deployed_spell_address()
+
+    source_code = EtherscanClient(api_key, args.chain_id).source_code(address)
+    if not source_code.get("SourceCode"):
+        sys.exit(f"{address} is not verified on Etherscan")
+    verified = "\n".join(verified_sources(source_code).values())
+    lines = diff_sources(verified, flatten(), f"etherscan:{address}", "local", args.unified)
+    if lines:
+        print("\n".join(lines))
+        sys.exit(1)
+    print(f"✔ Source of {address} matches the local spell")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Small Etherscan API client shared by the scripts.
+
+All requests go over one pooled session, and responses that can no longer change
+(the verified source of a contract, the transactions of a deployment) are cached on
+disk per address, so checking the same spell again needs no request at all.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import requests
+
+ETHERSCAN_API_URL = os.environ.get("ETHERSCAN_API_URL", "https://api.etherscan.io/v2/api")
+CACHE_DIR = os.path.join("cache", "etherscan")
+REQUEST_TIMEOUT_SECONDS = 30
+
+
+class EtherscanClient:
+    """Etherscan API client for one chain, with a disk cache per address and action."""
+
+    def __init__(self, api_key: str, chain_id: str = "1", session: Optional[requests.Session] = None):
+        self.api_key = api_key
+        self.chain_id = chain_id
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def _cache_path(self, action: str, address: str) -> str:
+        return os.path.join(CACHE_DIR, f"{self.chain_id}-{address.lower()}-{action}.json")
+
+    def get(self, module: str, action: str, address: str, **params: Any) -> Any:
+        """`result` of an API request, or raise SystemExit if the request failed."""
+        response = self.session.get(
+            ETHERSCAN_API_URL,
+            params={
+                "chainid": self.chain_id,
+                "module": module,
+                "action": action,
+                "address": address,
+                "apikey": self.api_key,
+                **params,
+            },
+            timeout=REQUEST_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
+        data = response.json()
+        # An empty list of transactions is reported as status 0 too
+        no_transactions = data.get("message") == "No transactions found"
+        if data.get("status") != "1" and not no_transactions:
+            raise SystemExit(f"Etherscan {action} of {address} failed: {data.get('result') or data.get('message')}")
+        return data["result"]
+
+    def _cached(self, action: str, address: str) -> Optional[Any]:
+        path = self._cache_path(action, address)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _store(self, action: str, address: str, result: Any) -> None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = self._cache_path(action, address)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+
+    def source_code(self, address: str) -> Dict[str, Any]:
+        """`getsourcecode` entry of the address; cached once the contract is verified."""
+        cached = self._cached("getsourcecode", address)
+        if cached is not None:
+            return cached
+        result = self.get("contract", "getsourcecode", address)[0]
+        if result.get("SourceCode"):
+            self._store("getsourcecode", address, result)
+        return result
+
+    def internal_transactions(self, address: str) -> List[Dict[str, Any]]:
+        """Internal transactions of the address, oldest first; cached once there are any."""
+        cached = self._cached("txlistinternal", address)
+        if cached is not None:
+            return cached
+        result = self.get("account", "txlistinternal", address, startblock=0, endblock=99999999, sort="asc")
+        if result:
+            self._store("txlistinternal", address, result)
+        return result
+
+    def contract_creation(self, address: str) -> Dict[str, Any]:
+        """Creator and creation transaction of the contract; cached, as it never changes."""
+        cached = self._cached("getcontractcreation", address)
+        if cached is not None:
+            return cached
+        result = self.get("contract", "getcontractcreation", address, contractaddresses=address)[0]
+        self._store("getcontractcreation", address, result)
+        return result
+
+
+def verified_sources(source_code: Dict[str, Any]) -> Dict[str, str]:
+    """Verified source files by name, from a `getsourcecode` entry."""
+    code = source_code["SourceCode"]
+    if code.startswith("{{"):
+        # Standard JSON input, wrapped in an extra pair of braces
+        return {name: entry["content"] for name, entry in json.loads(code[1:-1])["sources"].items()}
+    if code.startswith("{"):
+        return {name: entry["content"] for name, entry in json.loads(code).items()}
+    return {f"{source_code.get('ContractName') or 'DssSpell'}.sol": code}
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Flattened spell source, cached by the hashes of its inputs.
+
+`forge flatten` is only invoked when one of the files reachable through the
+imports of the given source (or foundry.toml/remappings.txt) has changed,
+otherwise the flattened source is served from the cache directory.
+
+Usage:
+    ./scripts/flatten.py [<source>] [--output <path>]
+"""
+import argparse
+import hashlib
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+SOURCE_FILE_PATH = "src/DssSpell.sol"
+CACHE_DIR = os.path.join("cache", "flatten")
+REMAPPINGS_PATH = "remappings.txt"
+CONFIG_FILES = ("foundry.toml", REMAPPINGS_PATH)
+
+IMPORT_PATTERN = re.compile(r"""^\s*import\s+(?:[^'"]*?\bfrom\s+)?["']([^"']+)["']""", re.MULTILINE)
+
+
+def read_remappings(path: str = REMAPPINGS_PATH) -> List[Tuple[str, str]]:
+    """Read remappings as (prefix, target) pairs, longest prefix first."""
+    if not os.path.exists(path):
+        return []
+    remappings = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if "=" in line:
+                prefix, target = line.split("=", 1)
+                remappings.append((prefix, target))
+    return sorted(remappings, key=lambda remapping: len(remapping[0]), reverse=True)
+
+
+def resolve_import(importer: str, target: str, remappings: List[Tuple[str, str]]) -> str:
+    """Resolve an import path the same way solc does with the given remappings."""
+    if target.startswith("."):
+        return os.path.normpath(os.path.join(os.path.dirname(importer), target))
+    for prefix, replacement in remappings:
+        if target.startswith(prefix):
+            return os.path.normpath(replacement + target[len(prefix):])
+    return os.path.normpath(target)
+
+
+def source_inputs(source: str = SOURCE_FILE_PATH) -> Dict[str, str]:
+    """Map every file the source transitively imports to its sha256 digest.
+
+    Imports that cannot be found on disk are recorded with an empty digest, so
+    that they still become part of the cache key.
+    """
+    remappings = read_remappings()
+    digests: Dict[str, str] = {}
+    pending = [os.path.normpath(source)]
+    while pending:
+        path = pending.pop()
+        if path in digests:
+            continue
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            digests[path] = ""
+            continue
+        digests[path] = hashlib.sha256(content).hexdigest()
+        for target in IMPORT_PATTERN.findall(content.decode("utf-8", errors="replace")):
+            pending.append(resolve_import(path, target, remappings))
+    return digests
+
+
+def inputs_digest(source: str = SOURCE_FILE_PATH) -> str:
+    """Single digest over the source inputs and the build configuration."""
+    digests = source_inputs(source)
+    for path in CONFIG_FILES:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digests[path] = hashlib.sha256(f.read()).hexdigest()
+    h = hashlib.sha256()
+    for path in sorted(digests):
+        h.update(f"{path}\0{digests[path]}\n".encode())
+    return h.hexdigest()
+
+
+def cached_path(source: str = SOURCE_FILE_PATH, digest: Optional[str] = None) -> str:
+    """Path of the cache entry for the current inputs of the source."""
+    return os.path.join(CACHE_DIR, f"{digest or inputs_digest(source)}.sol")
+
+
+def flatten(source: str = SOURCE_FILE_PATH) -> str:
+    """Return the flattened source, running `forge flatten` only on a cache miss."""
+    path = cached_path(source)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    try:
+        result = subprocess.run(
+            ["forge", "flatten", source], capture_output=True, text=True, check=True
+        )
+    except FileNotFoundError:
+        raise SystemExit("Error: forge not found in PATH")
+    except subprocess.CalledProcessError as e:
+        raise SystemExit(f"forge flatten failed: {e.stderr.strip()}")
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(result.stdout)
+    os.replace(tmp_path, path)
+    return result.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flatten a source file, reusing cached output")
+    parser.add_argument("source", nargs="?", default=SOURCE_FILE_PATH)
+    parser.add_argument("--output", help="Write the flattened source to this path instead of stdout")
+    args = parser.parse_args()
+
+    flat = flatten(args.source)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(flat)
+    else:
+        sys.stdout.write(flat)
+
+
+if __name__ == "__main__":
+    main()
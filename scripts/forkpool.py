@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Pool of warm anvil forks shared by the scripts.
+
+Starting `anvil -f <url>` for every run means waiting for the fork to come up and
+refetching every account and storage slot it touches. The pool instead keeps the anvil
+instances running between runs, keyed by upstream URL and fork block, and hands them
+out as leases. On every lease the instance is reverted to the snapshot taken right
+after it started, so each user gets a clean fork, and a leased warm fork is ready in
+milliseconds.
+
+The registry of instances lives in cache/forks/pool.json, guarded by a lock file, so
+concurrent scripts never share an instance. Upstream URLs usually contain an API key,
+so the registry only keeps a hash of them (to match instances) and a redacted form (to
+list them). Instances pinned to a block keep the state they fetched in anvil's RPC
+cache on disk (written when the instance stops), so even a fresh instance at a block
+used before starts warm.
+
+Idle instances are stopped after FORK_POOL_IDLE_TIMEOUT seconds, and instances
+following the latest block are replaced after FORK_POOL_MAX_AGE seconds so they never
+drift too far behind the chain. As the instances outlive the scripts that started them,
+this is done by a detached reaper process, which the pool starts along with the first
+instance and which exits once no instance is left.
+
+Usage:
+    ./scripts/forkpool.py list OR
+    ./scripts/forkpool.py run [--fork-url <url>] [--block <number>] -- <command> [<arg> ...] OR
+    ./scripts/forkpool.py stop [--fork-url <url>] OR
+    ./scripts/forkpool.py reap OR
+    make forks [cmd=stop]
+"""
+import argparse
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from jsonrpc import JsonRpcClient
+
+POOL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "forks")
+POOL_SIZE = int(os.environ.get("FORK_POOL_SIZE", "4"))
+IDLE_TIMEOUT_SECONDS = int(os.environ.get("FORK_POOL_IDLE_TIMEOUT", "1800"))
+MAX_AGE_SECONDS = int(os.environ.get("FORK_POOL_MAX_AGE", "600"))
+
+READY_TIMEOUT_SECONDS = 60
+POLL_INTERVAL_SECONDS = 0.2
+STOP_TIMEOUT_SECONDS = 10
+REAP_INTERVAL_SECONDS = 60
+
+
+def wait_for_node(url: str, pid: Optional[int] = None, timeout: float = READY_TIMEOUT_SECONDS) -> None:
+    """Poll the node until it answers, instead of sleeping a fixed time."""
+    client = JsonRpcClient(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pid is not None and not is_running(pid):
+            raise SystemExit(f"anvil exited before the fork at {url} was ready")
+        try:
+            client.request("eth_chainId")
+            return
+        except Exception:
+            time.sleep(POLL_INTERVAL_SECONDS)
+    raise SystemExit(f"The fork at {url} was not ready after {timeout}s")
+
+
+def is_running(pid: int) -> bool:
+    try:
+        # Reap the process if it is an exited child of this process
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def fork_id(fork_url: str) -> str:
+    """Hash identifying an upstream URL, without revealing the API key it may contain."""
+    return hashlib.sha256(fork_url.encode()).hexdigest()[:16]
+
+
+def redact(fork_url: str) -> str:
+    """Upstream URL without its credentials, path and query, e.g. `https://eth-mainnet.example.com/…`."""
+    parts = urlsplit(fork_url)
+    host = parts.hostname or ""
+    if parts.port:
+        host += f":{parts.port}"
+    hidden = parts.username or parts.password or parts.path.strip("/") or parts.query
+    return f"{parts.scheme}://{host}{'/…' if hidden else ''}"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Lease:
+    """A fork of `fork_url` leased from the pool, at `url` until it is released."""
+
+    def __init__(self, instance: Dict[str, Any], fork_url: str):
+        self.port = instance["port"]
+        self.url = instance["url"]
+        self.fork_url = fork_url
+        self.block = instance["block"]
+
+    def __repr__(self) -> str:
+        return f"Lease({self.url} forking {redact(self.fork_url)} at {self.block or 'latest'})"
+
+
+class ForkPool:
+    """Warm anvil instances, keyed by upstream URL and fork block."""
+
+    def __init__(
+        self,
+        root: str = POOL_DIR,
+        size: int = POOL_SIZE,
+        idle_timeout: float = IDLE_TIMEOUT_SECONDS,
+        max_age: float = MAX_AGE_SECONDS,
+    ):
+        self.root = root
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.registry_path = os.path.join(root, "pool.json")
+        self.reaper_path = os.path.join(root, "reaper.pid")
+
+    @contextlib.contextmanager
+    def _registry(self) -> Iterator[List[Dict[str, Any]]]:
+        """The registered instances, locked against other processes; changes are saved on exit."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, "pool.lock"), "w", encoding="utf-8") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            instances = []
+            if os.path.exists(self.registry_path):
+                with open(self.registry_path, "r", encoding="utf-8") as f:
+                    instances = json.load(f)
+            yield instances
+            tmp_path = f"{self.registry_path}.tmp{os.getpid()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(instances, f, indent=2)
+            os.replace(tmp_path, self.registry_path)
+
+    def _is_idle(self, instance: Dict[str, Any]) -> bool:
+        # Leases of processes that died without releasing them are free again
+        return instance["lessee"] is None or not is_running(instance["lessee"])
+
+    def _prune(self, instances: List[Dict[str, Any]]) -> None:
+        """Drop exited instances, and stop expired and surplus idle ones."""
+        now = time.time()
+        instances[:] = [instance for instance in instances if is_running(instance["pid"])]
+        idle = sorted((i for i in instances if self._is_idle(i)), key=lambda i: i["released_at"] or 0)
+        surplus = len(instances) - self.size
+        for instance in idle:
+            expired = now - (instance["released_at"] or instance["started_at"]) > self.idle_timeout
+            stale = instance["block"] is None and now - instance["started_at"] > self.max_age
+            if expired or stale or surplus > 0:
+                _stop(instance)
+                instances.remove(instance)
+                surplus -= 1
+
+    def instances(self) -> List[Dict[str, Any]]:
+        """The running instances, with whether they are leased."""
+        with self._registry() as instances:
+            self._prune(instances)
+            return [{**instance, "leased": not self._is_idle(instance)} for instance in instances]
+
+    def acquire(self, fork_url: str, block: Optional[int] = None) -> Lease:
+        """Lease a clean fork of the URL at the block (the latest block if None)."""
+        with self._registry() as instances:
+            self._prune(instances)
+            fork = fork_id(fork_url)
+            instance = next(
+                (i for i in instances if i["fork"] == fork and i["block"] == block and self._is_idle(i)), None
+            )
+            if instance is None:
+                instance = _spawn(self.root, fork_url, block)
+                instances.append(instance)
+                self._start_reaper()
+            instance["lessee"] = os.getpid()
+        lease = Lease(instance, fork_url)
+        try:
+            if instance["snapshot"] is None:
+                wait_for_node(lease.url, instance["pid"])
+                snapshot = JsonRpcClient(lease.url).request("evm_snapshot")
+            else:
+                snapshot = _revert(lease, instance["snapshot"])
+        except BaseException:
+            self.release(lease, discard=True)
+            raise
+        with self._registry() as instances:
+            for entry in instances:
+                if entry["port"] == lease.port:
+                    entry["snapshot"] = snapshot
+        return lease
+
+    def release(self, lease: Lease, discard: bool = False) -> None:
+        """Return the fork to the pool, or stop it if `discard`."""
+        with self._registry() as instances:
+            for instance in list(instances):
+                if instance["port"] != lease.port:
+                    continue
+                if discard:
+                    _stop(instance)
+                    instances.remove(instance)
+                else:
+                    instance["lessee"] = None
+                    instance["released_at"] = time.time()
+
+    @contextlib.contextmanager
+    def lease(self, fork_url: str, block: Optional[int] = None) -> Iterator[Lease]:
+        lease = self.acquire(fork_url, block)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def stop(self, fork_url: Optional[str] = None) -> int:
+        """Stop the idle instances (of the URL only, if given) and return how many were stopped."""
+        with self._registry() as instances:
+            self._prune(instances)
+            fork = None if fork_url is None else fork_id(fork_url)
+            stopped = [i for i in instances if self._is_idle(i) and fork in (None, i["fork"])]
+            for instance in stopped:
+                _stop(instance)
+                instances.remove(instance)
+        return len(stopped)
+
+    def _start_reaper(self) -> None:
+        """Start the reaper process unless it is running; called with the registry locked."""
+        if os.path.exists(self.reaper_path):
+            with open(self.reaper_path, "r", encoding="utf-8") as f:
+                pid = int(f.read().strip() or 0)
+            if pid and is_running(pid):
+                return
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "reap",
+                "--root",
+                self.root,
+                "--size",
+                str(self.size),
+                "--idle-timeout",
+                str(self.idle_timeout),
+                "--max-age",
+                str(self.max_age),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        with open(self.reaper_path, "w", encoding="utf-8") as f:
+            f.write(str(process.pid))
+
+    def reap(self, interval: float = REAP_INTERVAL_SECONDS) -> None:
+        """Stop expired and idle instances every `interval` seconds, until no instance is left."""
+        interval = max(1.0, min(interval, self.idle_timeout, self.max_age))
+        while True:
+            with self._registry() as instances:
+                self._prune(instances)
+                if not instances:
+                    # Removed with the registry locked, so a new instance always gets a new reaper
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(self.reaper_path)
+                    return
+            time.sleep(interval)
+
+
+def _spawn(root: str, fork_url: str, block: Optional[int]) -> Dict[str, Any]:
+    port = _free_port()
+    command = ["anvil", "--fork-url", fork_url, "--port", str(port)]
+    if block is not None:
+        command += ["--fork-block-number", str(block)]
+    log_path = os.path.join(root, f"anvil-{port}.log")
+    with open(log_path, "w", encoding="utf-8") as log:
+        # Its own session, so the instance outlives this process and is not hit by its Ctrl-C
+        process = subprocess.Popen(
+            command, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+        )
+    return {
+        "pid": process.pid,
+        "port": port,
+        "url": f"http://127.0.0.1:{port}",
+        "log": log_path,
+        "fork": fork_id(fork_url),
+        "upstream": redact(fork_url),
+        "block": block,
+        "snapshot": None,
+        "lessee": None,
+        "started_at": time.time(),
+        "released_at": None,
+    }
+
+
+def _revert(lease: Lease, snapshot: str) -> str:
+    """Revert the fork to its clean snapshot and return the new snapshot (a revert consumes it)."""
+    client = JsonRpcClient(lease.url)
+    reverted = client.request("evm_revert", [snapshot])
+    if not reverted:
+        forking: Dict[str, Any] = {"jsonRpcUrl": lease.fork_url}
+        if lease.block is not None:
+            forking["blockNumber"] = lease.block
+        client.request("anvil_reset", [{"forking": forking}])
+    return client.request("evm_snapshot")
+
+
+def _stop(instance: Dict[str, Any]) -> None:
+    """Stop the instance; SIGTERM lets anvil write its RPC cache to disk first."""
+    pid = instance["pid"]
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    deadline = time.monotonic() + STOP_TIMEOUT_SECONDS
+    while is_running(pid) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    if is_running(pid):
+        os.kill(pid, signal.SIGKILL)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(instance["log"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pool of warm anvil forks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the running forks")
+    run_parser = subparsers.add_parser("run", help="Run a command with ETH_RPC_URL pointing at a leased fork")
+    run_parser.add_argument(
+        "--fork-url", default=os.environ.get("ETH_RPC_URL"), help="Upstream node (default: ETH_RPC_URL)"
+    )
+    run_parser.add_argument("--block", type=int, help="Fork block number (default: latest)")
+    run_parser.add_argument("arguments", nargs=argparse.REMAINDER, metavar="command")
+    stop_parser = subparsers.add_parser("stop", help="Stop the idle forks")
+    stop_parser.add_argument("--fork-url", help="Only stop forks of this upstream node")
+    reap_parser = subparsers.add_parser("reap", help="Stop the idle and expired forks until none is left")
+    reap_parser.add_argument("--root", default=POOL_DIR, help=argparse.SUPPRESS)
+    reap_parser.add_argument("--size", type=int, default=POOL_SIZE, help=argparse.SUPPRESS)
+    reap_parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT_SECONDS, help=argparse.SUPPRESS)
+    reap_parser.add_argument("--max-age", type=float, default=MAX_AGE_SECONDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.command == "reap":
+        ForkPool(args.root, args.size, args.idle_timeout, args.max_age).reap()
+        return
+    pool = ForkPool()
+    if args.command == "list":
+        now = time.time()
+        for instance in pool.instances():
+            state = "leased" if instance["leased"] else "idle"
+            print(
+                f"{instance['url']}  {state:<6}  block {instance['block'] or 'latest'}  "
+                f"up {now - instance['started_at']:.0f}s  {instance['upstream']}"
+            )
+        return
+    if args.command == "stop":
+        print(f"Stopped {pool.stop(args.fork_url)} fork(s)")
+        return
+
+    if not args.fork_url:
+        sys.exit("Please set ETH_RPC_URL environment variable with RPC url")
+    command = args.arguments[1:] if args.arguments[:1] == ["--"] else args.arguments
+    if not command:
+        sys.exit("Please provide the command to run")
+    with pool.lease(args.fork_url, args.block) as lease:
+        returncode = subprocess.run(command, env={**os.environ, "ETH_RPC_URL": lease.url}).returncode
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
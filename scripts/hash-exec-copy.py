@@ -5,17 +5,32 @@ Executive Vote Hash Generator
 This script fetches an executive vote document from the sky-ecosystem/executive-votes repository
 for a given date and calculates its keccak hash.
 
+GitHub API responses are cached on disk together with their ETag, so that repeated runs only
+issue conditional requests, and documents are stored by the commit SHA they were fetched at.
+With --offline, results are served from the cache alone.
+
+Several dates, or every executive within a date range, can be hashed at once. Each year
+directory is then listed once and the documents are fetched concurrently.
+
 Usage:
-    ./hash-exec-copy.py <date> OR
-    make exec-hash date=<date>
+    ./hash-exec-copy.py <date> [<date> ...] [--offline] [--format table|jsonl] OR
+    ./hash-exec-copy.py --from <date> --to <date> [--offline] [--format table|jsonl] OR
+    make exec-hash date=<date> OR
+    make exec-hash from=<date> to=<date>
 
 Where <date> is in the format YYYY-MM-DD
 """
 
 import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import requests
-import subprocess
+
+from keccak import keccak256_hex
 
 # Constants
 INPUT_DATE_FORMAT = "%Y-%m-%d"
@@ -23,14 +38,120 @@ INPUT_DATE_FORMAT_DISPLAY = "YYYY-MM-DD"
 REPO_URL = "/sky-ecosystem/executive-votes"
 GITHUB_API_BASE = "https://api.github.com/repos"
 GITHUB_RAW_BASE = "https://raw.githubusercontent.com"
+EXEC_FILE_PATTERN = re.compile(r"^executive-vote-(\d{4}-\d{2}-\d{2})")
+DEFAULT_JOBS = 8
+CACHE_DIR = os.environ.get(
+    "EXEC_HASH_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "exec-hash"),
+)
+
+
+class ExecutiveCache:
+    """On-disk cache for GitHub API responses and executive documents.
+
+    API responses are stored with their ETag and revalidated with If-None-Match.
+    Documents are content-addressed by the commit SHA and path they were fetched at,
+    so they never need to be revalidated.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, offline=False, session=None, pool_size=DEFAULT_JOBS):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        if os.environ.get("GITHUB_TOKEN"):
+            self.session.headers["Authorization"] = f"Bearer {os.environ['GITHUB_TOKEN']}"
+
+    def _response_path(self, url, params):
+        key = hashlib.sha256(json.dumps([url, params], sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.cache_dir, "responses", f"{key}.json")
+
+    def _document_path(self, commit_hash, file_path):
+        return os.path.join(self.cache_dir, "documents", commit_hash, file_path)
+
+    @staticmethod
+    def _write(path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def cached_json(self, url, params=None):
+        """Return the cached body of an API response, or None if it was never fetched."""
+        path = self._response_path(url, params)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["body"]
+
+    def get_json(self, url, params=None):
+        """Fetch a JSON API response, revalidating any cached copy with its ETag.
+
+        Raises:
+            SystemExit: If offline and the response is not cached
+            requests.exceptions.RequestException: If the HTTP request fails
+        """
+        path = self._response_path(url, params)
+        cached = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+
+        if self.offline:
+            if cached is None:
+                raise SystemExit(f"Error: {url} is not cached, cannot proceed offline")
+            return cached["body"]
+
+        headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+        response = self.session.get(url, params=params, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return cached["body"]
+        response.raise_for_status()
 
+        body = response.json()
+        self._write(path, json.dumps({"etag": response.headers.get("ETag"), "body": body}))
+        return body
 
-def find_exec_file_by_date(year, formatted_date):
+    def get_document(self, commit_hash, file_path):
+        """Fetch the document at the given commit, from the cache when possible.
+
+        Returns:
+            tuple: (content, url) of the raw document
+
+        Raises:
+            SystemExit: If offline and the document is not cached
+            requests.exceptions.RequestException: If the HTTP request fails
+        """
+        raw_url = f"{GITHUB_RAW_BASE}{REPO_URL}/{commit_hash}/{file_path}"
+        path = self._document_path(commit_hash, file_path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                return f.read(), raw_url
+
+        if self.offline:
+            raise SystemExit(f"Error: {raw_url} is not cached, cannot proceed offline")
+
+        response = self.session.get(raw_url)
+        response.raise_for_status()
+        self._write(path, response.text)
+        return response.text, response.url
+
+
+def find_exec_file_by_date(year, formatted_date, cache):
     """Find the executive vote file for a specific date in the given year directory.
 
+    A previously cached directory listing is used as-is when it already contains the
+    date, otherwise the listing is revalidated.
+
     Args:
         year (str): The year to search in
         formatted_date (str): The date in YYYY-MM-DD format
+        cache (ExecutiveCache): The cache to fetch the listing through
 
     Returns:
         str: The filename of the matching executive vote file
@@ -40,19 +161,18 @@ def find_exec_file_by_date(year, formatted_date):
     """
     api_url = f"{GITHUB_API_BASE}{REPO_URL}/contents/{year}"
 
-    try:
-        # Get list of files in the year directory
-        response = requests.get(api_url)
-        response.raise_for_status()
-        files = response.json()
-
+    def match(files):
         # Find files that match the date pattern
         pattern = f'executive-vote-{formatted_date}'
-        matching_files = [file.get('name') for file in files if file.get(
+        matching_files = [file.get('name') for file in files or [] if file.get(
             'type') == 'file' and pattern in file.get('name')]
+        return matching_files[0] if matching_files else None  # Return the first matching file
 
-        if matching_files:
-            return matching_files[0]  # Return the first matching file
+    try:
+        # Get list of files in the year directory
+        exec_title = match(cache.cached_json(api_url)) or match(cache.get_json(api_url))
+        if exec_title:
+            return exec_title
 
         raise SystemExit(
             f"Error: No executive vote file found for date {formatted_date}")
@@ -62,12 +182,13 @@ def find_exec_file_by_date(year, formatted_date):
             f"HTTP Request failed when listing directory contents: {e}")
 
 
-def get_executive(exec_title, year):
+def get_executive(exec_title, year, cache):
     """Fetch the executive vote document and its metadata.
 
     Args:
         exec_title (str): The filename of the executive vote document
         year (str): The year directory containing the document
+        cache (ExecutiveCache): The cache to fetch the commit and document through
 
     Returns:
         tuple: (content, url, commit_hash) where:
@@ -83,13 +204,11 @@ def get_executive(exec_title, year):
     commits_url = f"{GITHUB_API_BASE}{REPO_URL}/commits"
     file_path = f"{year}/{exec_title}"
 
-    response = requests.get(
+    commits = cache.get_json(
         commits_url,
         params={
             'path': file_path,
             'per_page': '1'})
-    response.raise_for_status()
-    commits = response.json()
 
     if not commits:
         raise SystemExit(f"Error: Executive copy not found: {exec_title}")
@@ -101,15 +220,9 @@ def get_executive(exec_title, year):
             f"Error: Executive copy commit hash not found: {exec_title}")
 
     # Get the file content from the specific commit
-    raw_url = f"{GITHUB_RAW_BASE}{REPO_URL}/{commit_hash}/{file_path}"
-    content_response = requests.get(raw_url)
-    content_response.raise_for_status()
-
-    # Store the URL for output
-    executive_url = content_response.url
+    content, executive_url = cache.get_document(commit_hash, file_path)
 
     # Remove trailing newline for consistent hashing
-    content = content_response.text
     if content and content[-1] == '\n':
         content = content[:-1]
 
@@ -117,81 +230,221 @@ def get_executive(exec_title, year):
 
 
 def get_content_hash(content):
-    """Calculate the keccak hash of the content using the 'cast' command.
+    """Calculate the keccak hash of the content, as `cast keccak` would.
 
     Args:
         content (str): The content to hash
 
     Returns:
         str: The keccak hash of the content
+    """
+    return keccak256_hex(content)
 
-    Raises:
-        SystemExit: If the 'cast' command is not found or fails
+
+def list_exec_files(year, cache):
+    """List the executive vote files of a year directory, revalidating the listing once.
+
+    Args:
+        year (str): The year directory to list
+        cache (ExecutiveCache): The cache to fetch the listing through
+
+    Returns:
+        list: (date, filename) tuples, sorted by date
     """
+    api_url = f"{GITHUB_API_BASE}{REPO_URL}/contents/{year}"
+    files = []
+    for file in cache.get_json(api_url) or []:
+        match = EXEC_FILE_PATTERN.match(file.get('name', ''))
+        if file.get('type') == 'file' and match:
+            files.append((match.group(1), file['name']))
+    return sorted(files)
+
+
+def hash_executive(formatted_date, exec_title, cache):
+    """Fetch and hash a single executive vote document.
+
+    Returns:
+        dict: The date, file, commit, url and hash of the document, or the error
+    """
+    year = formatted_date[:4]
+    result = {"date": formatted_date, "file": exec_title}
     try:
-        # Run the 'cast keccak' command with the content
-        keccak_result = subprocess.run(
-            ['cast', 'keccak', '--', content],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True
-        )
-        return keccak_result.stdout.strip()  # Strip any whitespace
-    except FileNotFoundError:
+        content, executive_url, commit_hash = get_executive(exec_title, year, cache)
+        result.update(commit=commit_hash, url=executive_url, hash=get_content_hash(content))
+    except (SystemExit, requests.exceptions.RequestException) as e:
+        result["error"] = str(e)
+    return result
+
+
+def hash_executives(dates, date_from, date_to, cache, jobs=DEFAULT_JOBS):
+    """Hash the executives of the given dates, or of every date within the range.
+
+    Each year directory is listed once, then the documents are fetched concurrently.
+
+    Args:
+        dates (list): Explicit dates in YYYY-MM-DD format
+        date_from (str): Start of the date range, inclusive
+        date_to (str): End of the date range, inclusive
+        cache (ExecutiveCache): The cache to fetch everything through
+        jobs (int): Maximum number of concurrent downloads
+
+    Returns:
+        list: One result dict per executive, see `hash_executive`
+    """
+    if dates:
+        years = sorted({date[:4] for date in dates})
+    else:
+        years = [str(year) for year in range(int(date_from[:4]), int(date_to[:4]) + 1)]
+
+    listings = {}
+    for year in years:
+        try:
+            listings[year] = list_exec_files(year, cache)
+        except requests.exceptions.HTTPError as e:
+            # Years without any executive have no directory
+            if e.response is None or e.response.status_code != 404:
+                raise
+            listings[year] = []
+
+    targets = []
+    results = []
+    if dates:
+        for formatted_date in dates:
+            titles = [title for date, title in listings[formatted_date[:4]] if date == formatted_date]
+            if titles:
+                targets.append((formatted_date, titles[0]))
+            else:
+                results.append({
+                    "date": formatted_date,
+                    "error": f"No executive vote file found for date {formatted_date}",
+                })
+    else:
+        for year in years:
+            targets.extend((date, title) for date, title in listings[year] if date_from <= date <= date_to)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results.extend(executor.map(lambda target: hash_executive(*target, cache), targets))
+    return sorted(results, key=lambda result: (result["date"], result.get("file", "")))
+
+
+def print_results(results, output_format):
+    """Print the results as an aligned table or as JSON lines."""
+    if output_format == "jsonl":
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    columns = ["date", "commit", "url", "hash"]
+    rows = [
+        [result["date"], "ERROR", result["error"], ""] if "error" in result
+        else [result[column] for column in columns]
+        for result in results
+    ]
+    widths = [max(len(row[i]) for row in [columns, *rows]) for i in range(len(columns))]
+    for row in [columns, *rows]:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def parse_date(date_string):
+    """Parse a date argument (optionally prefixed with `date=`) into YYYY-MM-DD format."""
+    try:
+        date = datetime.strptime(date_string.replace("date=", ""), INPUT_DATE_FORMAT)
+    except ValueError:
         raise SystemExit(
-            "Error: The 'cast' command is not found. Ensure it's installed and in the PATH.")
-    except subprocess.CalledProcessError as e:
-        raise SystemExit(f"Command failed with error: {e.stderr}")
+            f"Invalid date format. Please use {INPUT_DATE_FORMAT_DISPLAY}.")
+    return date.strftime(INPUT_DATE_FORMAT)
 
 
 def parse_arguments():
     """Parse command line arguments.
 
     Returns:
-        datetime: The parsed date object
+        argparse.Namespace: The arguments, with `dates`, `date_from` and `date_to`
+        normalized to YYYY-MM-DD format
     """
     parser = argparse.ArgumentParser(
-        description="Fetch an executive vote document and calculate its keccak hash")
+        description="Fetch executive vote documents and calculate their keccak hashes")
     parser.add_argument(
-        "date",
+        "dates",
+        nargs="*",
+        metavar="date",
         help=f"Date to find executive copy for (format: {INPUT_DATE_FORMAT_DISPLAY})"
     )
+    parser.add_argument(
+        "--from",
+        dest="date_from",
+        help="Hash every executive from this date on (inclusive)"
+    )
+    parser.add_argument(
+        "--to",
+        dest="date_to",
+        help="Hash every executive up to this date (inclusive, default: today)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["table", "jsonl"],
+        help="Output format for multiple executives (default: table)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Maximum number of concurrent downloads (default: {DEFAULT_JOBS})"
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve results from the local cache only, without any network request"
+    )
 
     args = parser.parse_args()
-    date_string = args.date.replace("date=", "")
+    # `make exec-hash` passes an empty `date=` when only a range is given
+    args.dates = [parse_date(date) for date in args.dates if date.replace("date=", "")]
 
-    try:
-        return datetime.strptime(date_string, INPUT_DATE_FORMAT)
-    except ValueError:
-        raise SystemExit(
-            f"Invalid date format. Please use {INPUT_DATE_FORMAT_DISPLAY}.")
+    if args.date_from or args.date_to:
+        if args.dates:
+            parser.error("Dates cannot be combined with --from/--to")
+        if not args.date_from:
+            parser.error("--to requires --from")
+        args.date_from = parse_date(args.date_from)
+        args.date_to = parse_date(args.date_to or datetime.now().strftime(INPUT_DATE_FORMAT))
+    elif not args.dates:
+        parser.error("Please provide a date or a --from/--to range")
 
+    return args
 
-def main():
-    """Main function to fetch and hash an executive vote document."""
-    # Parse the date argument
-    date = parse_arguments()
 
-    # Extract year and format date
-    year = date.strftime("%Y")
-    formatted_date = date.strftime('%Y-%m-%d')
+def main():
+    """Main function to fetch and hash executive vote documents."""
+    args = parse_arguments()
+    cache = ExecutiveCache(offline=args.offline, pool_size=args.jobs)
 
     try:
-        # Find the executive file for the given date
-        exec_title = find_exec_file_by_date(year, formatted_date)
-
-        # Get the content and metadata
-        executive_content, executive_url, commit_hash = get_executive(
-            exec_title, year)
-
-        # Calculate the hash
-        exec_hash = get_content_hash(executive_content)
-
-        # Output results
-        print(f"Executive Votes repo commit: {commit_hash}")
-        print(f"Raw GitHub URL: {executive_url}")
-        print(f"Exec copy hash: {exec_hash}")
+        if len(args.dates) == 1 and not args.format:
+            # Extract year and format date
+            formatted_date = args.dates[0]
+            year = formatted_date[:4]
+
+            # Find the executive file for the given date
+            exec_title = find_exec_file_by_date(year, formatted_date, cache)
+
+            # Get the content and metadata
+            executive_content, executive_url, commit_hash = get_executive(
+                exec_title, year, cache)
+
+            # Calculate the hash
+            exec_hash = get_content_hash(executive_content)
+
+            # Output results
+            print(f"Executive Votes repo commit: {commit_hash}")
+            print(f"Raw GitHub URL: {executive_url}")
+            print(f"Exec copy hash: {exec_hash}")
+            return
+
+        results = hash_executives(args.dates, args.date_from, args.date_to, cache, args.jobs)
+        print_results(results, args.format or "table")
+        if any("error" in result for result in results):
+            raise SystemExit(1)
 
     except requests.exceptions.RequestException as e:
         raise SystemExit(f"HTTP Request failed: {e}")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Small JSON-RPC client shared by the scripts, replacing one `cast` process per lookup.
+
+All requests go over a single keep-alive session, and independent lookups can be
+sent together as one JSON-RPC batch request.
+"""
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional, Sequence, Tuple
+
+import requests
+
+from abi import decode_result, encode_call
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 4
+REQUEST_TIMEOUT_SECONDS = 30
+
+# A (method, params) pair, as accepted by `JsonRpcClient.batch`
+RpcRequest = Tuple[str, list]
+
+
+class RpcError(Exception):
+    """Error object returned by the node for a request."""
+
+    def __init__(self, method: str, error: dict):
+        self.method = method
+        self.code = error.get("code")
+        self.data = error.get("data")
+        super().__init__(f"{method} failed ({self.code}): {error.get('message', error)}")
+
+
+def eth_call(to: str, signature: str, *args: Any, block: str = "latest") -> RpcRequest:
+    """`eth_call` request for a `cast`-style signature, e.g. `action()(address)`."""
+    return "eth_call", [{"to": to, "data": encode_call(signature, *args)}, block]
+
+
+def to_block_tag(block: Any) -> str:
+    """Block tag for an int/decimal block number, or a named tag such as "latest"."""
+    if isinstance(block, int) or str(block).isdigit():
+        return hex(int(block))
+    return str(block)
+
+
+class JsonRpcClient:
+    """JSON-RPC client with persistent connections and batch support."""
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        session: Optional[requests.Session] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ):
+        self.url = url or os.environ.get("ETH_RPC_URL")
+        if not self.url:
+            raise SystemExit("Please set ETH_RPC_URL environment variable with RPC url")
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+
+    def _next_id(self) -> int:
+        with self._ids_lock:
+            return next(self._ids)
+
+    def _post(self, payload: Any) -> Any:
+        response = self.session.post(self.url, json=payload, timeout=REQUEST_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.json()
+
+    def request(self, method: str, params: Optional[list] = None) -> Any:
+        """Send a single request and return its result."""
+        body = self._post({"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": params or []})
+        if body.get("error"):
+            raise RpcError(method, body["error"])
+        return body.get("result")
+
+    def _batch_chunk(self, calls: Sequence[RpcRequest], raise_errors: bool) -> List[Any]:
+        ids = [self._next_id() for _ in calls]
+        body = self._post(
+            [
+                {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+                for request_id, (method, params) in zip(ids, calls)
+            ]
+        )
+        if isinstance(body, dict):
+            # Some nodes answer a whole batch with a single error object
+            raise RpcError("batch", body.get("error") or {"message": str(body)})
+        # Responses of a batch may arrive in any order
+        by_id = {response.get("id"): response for response in body}
+        results: List[Any] = []
+        for request_id, (method, _) in zip(ids, calls):
+            response = by_id.get(request_id, {"error": {"message": "missing response"}})
+            if response.get("error"):
+                error = RpcError(method, response["error"])
+                if raise_errors:
+                    raise error
+                results.append(error)
+            else:
+                results.append(response.get("result"))
+        return results
+
+    def batch(self, calls: Sequence[RpcRequest], raise_errors: bool = True) -> List[Any]:
+        """Send the requests as JSON-RPC batches and return the results in order.
+
+        Requests are split into chunks of `batch_size` to stay within provider limits,
+        and up to `concurrency` chunks are in flight at once.
+        With `raise_errors=False`, failed requests yield their `RpcError` instead of raising.
+        """
+        chunks = [calls[start:start + self.batch_size] for start in range(0, len(calls), self.batch_size)]
+        if len(chunks) <= 1 or self.concurrency <= 1:
+            chunk_results = [self._batch_chunk(chunk, raise_errors) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                chunk_results = list(executor.map(lambda chunk: self._batch_chunk(chunk, raise_errors), chunks))
+        return [result for results in chunk_results for result in results]
+
+    def call(self, to: str, signature: str, *args: Any, block: str = "latest") -> Any:
+        """Perform an `eth_call` and decode the result using the signature output types."""
+        method, params = eth_call(to, signature, *args, block=block)
+        return decode_result(signature, self.request(method, params))
+
+    def chain_id(self) -> str:
+        """Chain ID as a decimal string, matching `cast chain-id`."""
+        return str(int(self.request("eth_chainId"), 16))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+In-process keccak-256, as used by Ethereum (original Keccak padding, not SHA3-256).
+
+Usage:
+    ./scripts/keccak.py <text>    hash the given text
+    ./scripts/keccak.py < file    hash stdin
+"""
+import sys
+from typing import List, Union
+
+RATE_BYTES = 136  # 1088-bit rate for a 256-bit capacity digest
+MASK_64 = (1 << 64) - 1
+
+ROUND_CONSTANTS = [
+    0x0000000000000001, 0x0000000000008082, 0x800000000000808A, 0x8000000080008000,
+    0x000000000000808B, 0x0000000080000001, 0x8000000080008081, 0x8000000000008009,
+    0x000000000000008A, 0x0000000000000088, 0x0000000080008009, 0x000000008000000A,
+    0x000000008000808B, 0x800000000000008B, 0x8000000000008089, 0x8000000000008003,
+    0x8000000000008002, 0x8000000000000080, 0x000000000000800A, 0x800000008000000A,
+    0x8000000080008081, 0x8000000000008080, 0x0000000080000001, 0x8000000080008008,
+]
+
+# Rotation offsets, indexed by x + 5 * y
+ROTATIONS = [
+    0, 1, 62, 28, 27,
+    36, 44, 6, 55, 20,
+    3, 10, 43, 25, 39,
+    41, 45, 15, 21, 8,
+    18, 2, 61, 56, 14,
+]
+
+
+def _rotl(value: int, shift: int) -> int:
+    return ((value << shift) | (value >> (64 - shift))) & MASK_64 if shift else value
+
+
+def _permute(state: List[int]) -> None:
+    """Keccak-f[1600] over 25 little-endian 64-bit lanes, in place."""
+    for round_constant in ROUND_CONSTANTS:
+        # θ
+        c = [state[x] ^ state[x + 5] ^ state[x + 10] ^ state[x + 15] ^ state[x + 20] for x in range(5)]
+        d = [c[(x - 1) % 5] ^ _rotl(c[(x + 1) % 5], 1) for x in range(5)]
+        for i in range(25):
+            state[i] ^= d[i % 5]
+        # ρ and π
+        b = [0] * 25
+        for x in range(5):
+            for y in range(5):
+                b[y + 5 * ((2 * x + 3 * y) % 5)] = _rotl(state[x + 5 * y], ROTATIONS[x + 5 * y])
+        # χ
+        for y in range(0, 25, 5):
+            row = b[y:y + 5]
+            for x in range(5):
+                state[y + x] = row[x] ^ ((~row[(x + 1) % 5]) & row[(x + 2) % 5])
+        # ι
+        state[0] ^= round_constant
+
+
+def keccak256(data: Union[bytes, str]) -> bytes:
+    """Return the 32-byte keccak-256 digest of the data (str is UTF-8 encoded)."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    padded = bytearray(data)
+    padded.append(0x01)
+    padded.extend(b"\x00" * (-len(padded) % RATE_BYTES))
+    padded[-1] |= 0x80
+
+    state = [0] * 25
+    for offset in range(0, len(padded), RATE_BYTES):
+        block = padded[offset:offset + RATE_BYTES]
+        for i in range(RATE_BYTES // 8):
+            state[i] ^= int.from_bytes(block[8 * i:8 * i + 8], "little")
+        _permute(state)
+
+    return b"".join(lane.to_bytes(8, "little") for lane in state[:4])
+
+
+def keccak256_hex(data: Union[bytes, str]) -> str:
+    """0x-prefixed hex keccak-256 digest, matching `cast keccak` output."""
+    return "0x" + keccak256(data).hex()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(keccak256_hex(sys.argv[1]))
+    else:
+        print(keccak256_hex(sys.stdin.buffer.read()))
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Per-second rates in ray (10^27) precision for annual percentage rates.
+
+The rates are computed with exact integer arithmetic that reproduces the
+`bc -l` expression `e(l(x)/(60 * 60 * 24 * 365)) * 10^27` at `scale=27`
+digit for digit, including the truncations bc performs at every step of its
+math library, so the output matches what the former `rates.sh` printed.
+
+Usage:
+    ./scripts/rates.py               list all rates from 0 to 100% with granularity of 0.01%
+    ./scripts/rates.py <entry>       return the computed rate, e.g. 4.25
+    ./scripts/rates.py --sol         emit src/test/rates.sol with the full table
+"""
+import argparse
+import math
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+SECONDS_PER_YEAR = 60 * 60 * 24 * 365
+SCALE = 27
+MAX_BPS = 10000
+PERCENT_PATTERN = re.compile(r"^(0|[1-9][0-9]?|100)(\.[0-9]{1,2})?$")
+RATES_SOL_PATH = "src/test/rates.sol"
+
+RATES_SOL_HEADER = """\
+// SPDX-FileCopyrightText: © 2020 Dai Foundation <www.daifoundation.org>
+// SPDX-License-Identifier: AGPL-3.0-or-later
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU Affero General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU Affero General Public License for more details.
+//
+// You should have received a copy of the GNU Affero General Public License
+// along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+pragma solidity 0.8.16;
+
+contract Rates {
+
+    mapping (uint256 => uint256) public rates;
+
+    constructor() {
+"""
+
+RATES_SOL_FOOTER = """\
+    }
+
+}
+"""
+
+# A bc number: the value multiplied by 10^scale, and its scale.
+Number = Tuple[int, int]
+
+
+def _truncate(value: int, from_scale: int, to_scale: int) -> int:
+    """Change the scale of a scaled integer, truncating towards zero like bc."""
+    if to_scale >= from_scale:
+        return value * 10 ** (to_scale - from_scale)
+    quotient = abs(value) // 10 ** (from_scale - to_scale)
+    return quotient if value >= 0 else -quotient
+
+
+def _trunc_div(numerator: int, denominator: int) -> int:
+    """Integer division truncating towards zero, for a positive denominator."""
+    quotient = abs(numerator) // denominator
+    return quotient if numerator >= 0 else -quotient
+
+
+def _add(a: Number, b: Number) -> Number:
+    scale = max(a[1], b[1])
+    return _truncate(a[0], a[1], scale) + _truncate(b[0], b[1], scale), scale
+
+
+def _sub(a: Number, b: Number) -> Number:
+    return _add(a, (-b[0], b[1]))
+
+
+def _mul(a: Number, b: Number, scale: int) -> Number:
+    result_scale = min(a[1] + b[1], max(scale, a[1], b[1]))
+    return _truncate(a[0] * b[0], a[1] + b[1], result_scale), result_scale
+
+
+def _div(a: Number, b: Number, scale: int) -> Number:
+    numerator = a[0] * 10 ** (scale + b[1])
+    denominator = b[0] * 10 ** a[1]
+    quotient = abs(numerator) // abs(denominator)
+    return (quotient if (numerator >= 0) == (denominator >= 0) else -quotient), scale
+
+
+def _sqrt(x: Number, scale: int) -> Number:
+    result_scale = max(scale, x[1])
+    return math.isqrt(_truncate(x[0], x[1], 2 * result_scale)), result_scale
+
+
+def _bc_l(x: Number, scale: int) -> Number:
+    """bc's `l(x)` (natural logarithm) from libmath.b, for x > 0."""
+    z = scale
+    scale = 6 + scale
+    f: Number = (2, 0)
+    while x[0] >= 2 * 10 ** x[1]:
+        f = _mul(f, (2, 0), scale)
+        x = _sqrt(x, scale)
+    while x[0] * 2 <= 10 ** x[1]:
+        f = _mul(f, (2, 0), scale)
+        x = _sqrt(x, scale)
+
+    one: Number = (1, 0)
+    n, _ = _div(_sub(x, one), _add(x, one), scale)
+    m, _ = _mul((n, scale), (n, scale), scale)
+    v = n
+    # From here on every term has the same scale, so bc's multiplication and
+    # division reduce to plain integer operations truncated towards zero.
+    unit = 10**scale
+    i = 3
+    while True:
+        if n >= 0:
+            n = n * m // unit
+            e = n // i
+        else:
+            n = _trunc_div(n * m, unit)
+            e = _trunc_div(n, i)
+        if e == 0:
+            v = _mul(f, (v, scale), scale)
+            return _div(v, one, z)
+        v += e
+        i += 2
+
+
+def _bc_e(x: Number, scale: int) -> Number:
+    """bc's `e(x)` (exponential) from libmath.b, for 0 <= x <= 1."""
+    z = scale
+    n = _add((6 + z, 0), _mul((44, 2), x, scale))
+    # Assigning to `scale` keeps the integer part only
+    scale = _truncate(n[0], n[1], 0)
+    if x[0] > 10 ** x[1]:
+        raise ValueError("Arguments above 1 are not supported")
+
+    v, v_scale = _add((1, 0), x)
+    a = x
+    d = 1
+    i = 2
+    while True:
+        a = _mul(a, x, scale)
+        d *= i
+        e, _ = _div(a, (d, 0), scale)
+        if e == 0:
+            return _div((v, v_scale), (1, 0), z)
+        v = _truncate(v, v_scale, scale) + e
+        v_scale = scale
+        i += 1
+
+
+@lru_cache(maxsize=None)
+def rate(bps: int) -> int:
+    """Per-second rate in ray for an annual rate given in basis points."""
+    if not 0 <= bps <= MAX_BPS:
+        raise ValueError(f"Basis points out of range: {bps}")
+    # `scale=4; bps/10000 + 1`, which is exact
+    normalized_amount: Number = (bps + MAX_BPS, 4)
+    exponent = _div(_bc_l(normalized_amount, SCALE), (SECONDS_PER_YEAR, 0), SCALE)
+    value, scale = _bc_e(exponent, SCALE)
+    # `* 10^27` keeps the scale at 27, so the integer part is the scaled value
+    return _truncate(value, scale, SCALE)
+
+
+def rate_table(bps_range: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """Rates for the given basis points, by default the full 0-100% table."""
+    return {bps: rate(bps) for bps in (range(MAX_BPS + 1) if bps_range is None else bps_range)}
+
+
+def parse_percentage(value: str) -> int:
+    """Basis points of a percentage such as `4.25`, validated like rates.sh did."""
+    if not PERCENT_PATTERN.match(value) or float(value) > 100:
+        raise ValueError(value)
+    whole, _, fraction = value.partition(".")
+    return int(whole) * 100 + int(fraction.ljust(2, "0"))
+
+
+def render_rates_sol(rates: Dict[int, int]) -> str:
+    """Render the `Rates` contract of src/test/rates.sol for the given table."""
+    lines = [f"        rates[{bps:5d}] = {rates[bps]};\n" for bps in sorted(rates)]
+    return RATES_SOL_HEADER + "".join(lines) + RATES_SOL_FOOTER
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List all rates or compute specific ones")
+    parser.add_argument("pct", nargs="?", default="", help="Percentage to compute the rate for, e.g. 4.25")
+    parser.add_argument("--sol", action="store_true", help="Emit the Solidity rates table instead")
+    parser.add_argument("--output", help=f"Write the Solidity table to this path, e.g. {RATES_SOL_PATH}")
+    args = parser.parse_args()
+    pct = args.pct.replace("pct=", "")
+
+    if args.sol:
+        content = render_rates_sol(rate_table())
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(content)
+        else:
+            sys.stdout.write(content)
+        return
+
+    if not pct:
+        sys.stdout.writelines(f"{bps // 100}.{bps % 100:02d}%: {value}\n" for bps, value in rate_table().items())
+        return
+
+    try:
+        bps = parse_percentage(pct)
+    except ValueError:
+        sys.exit(
+            f"Please specify a percentage parameter (e.g. for 4.25% use {sys.argv[0]} 4.25 or make rates pct=4.25)"
+        )
+    print(f"{pct}%: {rate(bps)}")
+
+
+if __name__ == "__main__":
+    main()
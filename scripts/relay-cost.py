@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+L2 Spell Relay Cost Estimator
+
+Estimates what governance needs to pass along with the relay of L2 spells: the L2 gas of
+Optimism spells, and the max gas, gas price bid, max submission cost and L1 call value of
+Arbitrum spells. Spells on both networks can be estimated in one run.
+
+The relay addresses are resolved with two batched L1 requests, and the L1 and L2 lookups
+run concurrently with asyncio. The local Optimism fork (needed to impersonate the L1 gov
+relay on the L2 messenger of Bedrock contracts) is leased from the warm fork pool, so a
+warm fork is ready in milliseconds.
+
+Usage:
+    ./scripts/relay-cost.py [--optimism <spell> ...] [--arbitrum <spell> ...] [--json] OR
+    make opt-cost spell=<address> OR
+    make arb-cost spell=<address>
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List
+
+from abi import encode_call, format_bytes32_string
+from chainlog import CHANGELOG, GET_ADDRESS_SIGNATURE, decode_or_none
+from forkpool import ForkPool
+from jsonrpc import JsonRpcClient, RpcError, eth_call
+
+OPTIMISM_RPC_URL = os.environ.get("OPTIMISM_RPC_URL", "https://mainnet.optimism.io")
+ARBITRUM_RPC_URL = os.environ.get("ARBITRUM_RPC_URL", "https://arb1.arbitrum.io/rpc")
+
+PRE_BEDROCK_L1_MESSENGER_IMPL = "0xd9166833FF12A5F900ccfBf2c8B62a90F1Ca1FD5"
+OPT_ADDRESS_MANAGER = "0xdE1FCfB0851916CA5101820A69b13a4E276bd81F"
+NODE_INTERFACE = "0x00000000000000000000000000000000000000C8"
+
+# Offset of the L2 alias of an L1 address
+L1_TO_L2_ALIAS_OFFSET = 0x1111000000000000000000000000000000001111
+# Storage slot of `xDomainMsgSender` of the L2 messenger (it was slot 4 pre-Bedrock)
+X_DOMAIN_MSG_SENDER_SLOT = 204
+# Factor by which L1 block.basefee could grow between now and the spell cast time
+BASE_FEE_SAFETY_FACTOR = 20
+# Deposit assumed by the Arbitrum retryable ticket estimate
+ARB_ESTIMATE_DEPOSIT = 10**18
+
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+EXECUTE_CALLDATA = encode_call("execute()")
+
+
+def relay_calldata(spell: str) -> str:
+    return encode_call("relay(address,bytes)", spell, EXECUTE_CALLDATA)
+
+
+def _result(signature: str, result: Any, description: str) -> Any:
+    value = decode_or_none(signature, result)
+    if value is None:
+        raise SystemExit(f"Could not get {description}: {result}")
+    return value
+
+
+def resolve_relays(client: JsonRpcClient, optimism: bool, arbitrum: bool) -> Dict[str, str]:
+    """L1 addresses of the relays (and their inbox/messengers), in two batches."""
+    opt_relay, arb_relay, l1_messenger_impl = client.batch(
+        [
+            eth_call(CHANGELOG, GET_ADDRESS_SIGNATURE, format_bytes32_string("OPTIMISM_GOV_RELAY")),
+            eth_call(CHANGELOG, GET_ADDRESS_SIGNATURE, format_bytes32_string("ARBITRUM_GOV_RELAY")),
+            eth_call(OPT_ADDRESS_MANAGER, "getAddress(string)(address)", "OVM_L1CrossDomainMessenger"),
+        ],
+        raise_errors=False,
+    )
+    relays: Dict[str, str] = {}
+    calls = []
+    if optimism:
+        relays["opt_l1_relay"] = _result(GET_ADDRESS_SIGNATURE, opt_relay, "OPTIMISM_GOV_RELAY")
+        relays["opt_l1_messenger_impl"] = _result("getAddress(string)(address)", l1_messenger_impl, "the L1 messenger")
+        calls += [
+            eth_call(relays["opt_l1_relay"], "l2GovernanceRelay()(address)"),
+            eth_call(relays["opt_l1_relay"], "messenger()(address)"),
+        ]
+    if arbitrum:
+        relays["arb_l1_relay"] = _result(GET_ADDRESS_SIGNATURE, arb_relay, "ARBITRUM_GOV_RELAY")
+        calls += [
+            eth_call(relays["arb_l1_relay"], "l2GovernanceRelay()(address)"),
+            eth_call(relays["arb_l1_relay"], "inbox()(address)"),
+        ]
+    results = iter(client.batch(calls, raise_errors=False))
+    if optimism:
+        relays["opt_l2_relay"] = _result("l2GovernanceRelay()(address)", next(results), "the Optimism L2 relay")
+        relays["opt_l1_messenger"] = _result("messenger()(address)", next(results), "the Optimism L1 messenger")
+    if arbitrum:
+        relays["arb_l2_relay"] = _result("l2GovernanceRelay()(address)", next(results), "the Arbitrum L2 relay")
+        relays["arb_inbox"] = _result("inbox()(address)", next(results), "the Arbitrum inbox")
+    return relays
+
+
+def _estimates(client: JsonRpcClient, calls: List[dict]) -> List[Any]:
+    results = client.batch([("eth_estimateGas", [call]) for call in calls], raise_errors=False)
+    return [result if isinstance(result, RpcError) else int(result, 16) for result in results]
+
+
+async def optimism_costs(spells: List[str], relays: Dict[str, str], pool: ForkPool) -> Dict[str, Dict[str, Any]]:
+    """L2 gas of relaying every Optimism spell."""
+    l2 = JsonRpcClient(OPTIMISM_RPC_URL)
+    l2_messenger = _result(
+        "messenger()(address)",
+        (await asyncio.to_thread(l2.batch, [eth_call(relays["opt_l2_relay"], "messenger()(address)")], False))[0],
+        "the Optimism L2 messenger",
+    )
+
+    if relays["opt_l1_messenger_impl"].lower() == PRE_BEDROCK_L1_MESSENGER_IMPL.lower():
+        print("Gas estimation performed for pre-Bedrock contracts", file=sys.stderr)
+        aliased = (int(relays["opt_l1_messenger"], 16) + L1_TO_L2_ALIAS_OFFSET) % 2**160
+        calls = [
+            {
+                "from": f"0x{aliased:040x}",
+                "to": l2_messenger,
+                "data": encode_call(
+                    "relayMessage(address,address,bytes,uint256)",
+                    relays["opt_l2_relay"],
+                    relays["opt_l1_relay"],
+                    relay_calldata(spell),
+                    0,
+                ),
+            }
+            for spell in spells
+        ]
+        gas = await asyncio.to_thread(_estimates, l2, calls)
+    else:
+        # The relay only accepts messages the messenger received from the L1 gov relay
+        lease = await asyncio.to_thread(pool.acquire, OPTIMISM_RPC_URL)
+        try:
+            local = JsonRpcClient(lease.url)
+            await asyncio.to_thread(
+                local.request,
+                "anvil_setStorageAt",
+                [l2_messenger, f"0x{X_DOMAIN_MSG_SENDER_SLOT:064x}", f"0x{int(relays['opt_l1_relay'], 16):064x}"],
+            )
+            calls = [
+                {"from": l2_messenger, "to": relays["opt_l2_relay"], "data": relay_calldata(spell)} for spell in spells
+            ]
+            gas = await asyncio.to_thread(_estimates, local, calls)
+        finally:
+            pool.release(lease)
+    return {
+        spell: {"error": str(value)} if isinstance(value, RpcError) else {"OPT_GAS": value}
+        for spell, value in zip(spells, gas)
+    }
+
+
+async def arbitrum_costs(spells: List[str], relays: Dict[str, str], l1: JsonRpcClient) -> Dict[str, Dict[str, Any]]:
+    """Max gas, gas price bid, max submission cost and L1 call value of every Arbitrum spell."""
+    l2 = JsonRpcClient(ARBITRUM_RPC_URL)
+    l1_relay, l2_relay = relays["arb_l1_relay"], relays["arb_l2_relay"]
+    estimate_calls = [
+        (
+            "eth_estimateGas",
+            [
+                {
+                    "to": NODE_INTERFACE,
+                    "data": encode_call(
+                        "estimateRetryableTicket(address,uint256,address,uint256,address,address,bytes)",
+                        l1_relay,
+                        ARB_ESTIMATE_DEPOSIT,
+                        l2_relay,
+                        0,
+                        l2_relay,
+                        l2_relay,
+                        relay_calldata(spell),
+                    ),
+                }
+            ],
+        )
+        for spell in spells
+    ]
+    fee_signature = "calculateRetryableSubmissionFee(uint256,uint256)(uint256)"
+    fee_calls = [
+        eth_call(relays["arb_inbox"], fee_signature, (len(relay_calldata(spell)) - 2) // 2, 0) for spell in spells
+    ]
+    # The L2 gas price and estimates, and the L1 submission fees, are independent
+    l2_results, fees = await asyncio.gather(
+        asyncio.to_thread(l2.batch, [("eth_gasPrice", [])] + estimate_calls, False),
+        asyncio.to_thread(l1.batch, fee_calls, False),
+    )
+    if isinstance(l2_results[0], RpcError):
+        raise SystemExit(f"Could not get the Arbitrum gas price: {l2_results[0]}")
+    gas_price_bid = int(l2_results[0], 16)
+
+    costs = {}
+    for spell, max_gas, fee in zip(spells, l2_results[1:], fees):
+        if isinstance(max_gas, RpcError):
+            costs[spell] = {"error": str(max_gas)}
+            continue
+        max_submission_cost = _result(fee_signature, fee, "the submission fee") * BASE_FEE_SAFETY_FACTOR
+        max_gas = int(max_gas, 16)
+        costs[spell] = {
+            "ARB_MAX_GAS": max_gas,
+            "ARB_GAS_PRICE_BID": gas_price_bid,
+            "ARB_MAX_SUBMISSION_COST": max_submission_cost,
+            "ARB_L1_CALL_VALUE": max_gas * gas_price_bid + max_submission_cost,
+        }
+    return costs
+
+
+async def estimate(optimism: List[str], arbitrum: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    l1 = JsonRpcClient()
+    chain_id, relays = await asyncio.gather(
+        asyncio.to_thread(l1.chain_id),
+        asyncio.to_thread(resolve_relays, l1, bool(optimism), bool(arbitrum)),
+    )
+    if chain_id != "1":
+        raise SystemExit("Please set a Mainnet ETH_RPC_URL")
+    tasks = {}
+    if optimism:
+        tasks["optimism"] = optimism_costs(optimism, relays, ForkPool())
+    if arbitrum:
+        tasks["arbitrum"] = arbitrum_costs(arbitrum, relays, l1)
+    return dict(zip(tasks, await asyncio.gather(*tasks.values())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate the relay costs of L2 spells")
+    parser.add_argument("--optimism", nargs="+", default=[], metavar="spell", help="Optimism spell addresses")
+    parser.add_argument("--arbitrum", nargs="+", default=[], metavar="spell", help="Arbitrum spell addresses")
+    parser.add_argument("--json", action="store_true", help="Print the estimates as JSON")
+    args = parser.parse_args()
+
+    for network, example, spells in (
+        ("Optimism", "0x9495632F53Cc16324d2FcFCdD4EB59fb88dDab12", args.optimism),
+        ("Arbitrum", "0x852CCBB823D73b3e35f68AD6b14e29B02360FD3d", args.arbitrum),
+    ):
+        for spell in spells:
+            if not ADDRESS_PATTERN.match(spell):
+                sys.exit(f"Please specify the {network} spell address (e.g. {example})")
+    if not args.optimism and not args.arbitrum:
+        sys.exit("Please specify an Optimism (--optimism) or Arbitrum (--arbitrum) spell address")
+
+    costs = asyncio.run(estimate(args.optimism, args.arbitrum))
+    if args.json:
+        print(json.dumps(costs, indent=2))
+        return
+    for network, spells in costs.items():
+        for spell, values in spells.items():
+            print(f"{network.capitalize()} spell {spell}:")
+            if "error" in values:
+                print(f"  Could not estimate: {values['error']}")
+            for name, value in values.items():
+                if name == "OPT_GAS":
+                    print(f"  OPT_GAS = {value} (Recommended to use at least 4x this value to be safe).")
+                elif name != "error":
+                    print(f"  {name:<23} = {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Local caching JSON-RPC proxy.
+
+Forwards JSON-RPC requests (single or batched) to an upstream node over a pool of
+keep-alive connections. Responses to immutable queries, i.e. those pinned to a block
+number or hash such as the `eth_getStorageAt`/`eth_getCode`/`eth_call` requests of a
+fork pinned with `--fork-block-number`, are stored in an SQLite cache on disk, and
+identical requests that are in flight at the same time are sent upstream only once.
+Repeated runs at the same block therefore need next to no upstream traffic.
+
+`run` starts the proxy on a free port and runs a command with ETH_RPC_URL pointing at
+it, so forge and the scripts use it without any change.
+
+Usage:
+    ./scripts/rpcproxy.py serve [--port <port>] [--upstream <url>] OR
+    ./scripts/rpcproxy.py run -- <command> [<arg> ...] OR
+    make cached target=<make target>
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8545
+CACHE_PATH = os.environ.get(
+    "RPC_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "rpc-cache.sqlite"),
+)
+DEFAULT_CONCURRENCY = 16
+REQUEST_TIMEOUT_SECONDS = 60
+
+# Methods whose result never changes
+CONSTANT_METHODS = {"eth_chainId", "net_version"}
+# Methods whose result is fixed once the block parameter at the given index is pinned
+BLOCK_PINNED_METHODS = {
+    "eth_getStorageAt": 2,
+    "eth_getCode": 1,
+    "eth_getBalance": 1,
+    "eth_getTransactionCount": 1,
+    "eth_call": 1,
+    "eth_getProof": 2,
+    "eth_getBlockByNumber": 0,
+}
+# Methods looked up by hash, cached once they return a result
+HASH_METHODS = {"eth_getBlockByHash", "eth_getTransactionByHash", "eth_getTransactionReceipt"}
+# Methods whose result only becomes final once it is mined (a pending transaction has no `blockNumber` yet)
+MINED_METHODS = {"eth_getTransactionByHash"}
+
+
+def is_pinned_block(block: Any) -> bool:
+    """Whether a block parameter refers to one fixed block: a number or a block hash."""
+    if isinstance(block, dict):
+        return "blockHash" in block or is_pinned_block(block.get("blockNumber"))
+    return isinstance(block, str) and block.startswith("0x")
+
+
+def cache_key(request: dict) -> Optional[str]:
+    """Key of a request whose response can be cached, or None if it can change."""
+    method, params = request.get("method"), request.get("params") or []
+    if method in BLOCK_PINNED_METHODS:
+        index = BLOCK_PINNED_METHODS[method]
+        if len(params) <= index or not is_pinned_block(params[index]):
+            return None
+    elif method not in CONSTANT_METHODS and method not in HASH_METHODS:
+        return None
+    return json.dumps([method, params], sort_keys=True, separators=(",", ":"))
+
+
+def is_final(request: dict, response: dict) -> bool:
+    """Whether the response to a cacheable request can be cached."""
+    # Errors and missing results (e.g. an unknown transaction) are not final
+    if "error" in response or response.get("result") is None:
+        return False
+    if request.get("method") in MINED_METHODS:
+        return isinstance(response["result"], dict) and response["result"].get("blockNumber") is not None
+    return True
+
+
+def _outcome(response: dict) -> dict:
+    return {key: response[key] for key in ("result", "error") if key in response}
+
+
+class ResponseCache:
+    """Results of immutable requests by cache key, in an SQLite file (or in memory for `:memory:`)."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, result TEXT NOT NULL);
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        # Several proxies (e.g. of concurrent make targets) may share the file
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    def get(self, key: str) -> Any:
+        """Cached result, or None if there is none."""
+        row = self.db.execute("SELECT result FROM responses WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_many(self, items: List[Tuple[str, Any]]) -> None:
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO responses (key, result) VALUES (?, ?)",
+                [(key, json.dumps(result, separators=(",", ":"))) for key, result in items],
+            )
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        self.db.close()
+
+
+class RpcProxy:
+    """Caching JSON-RPC proxy served with asyncio.
+
+    Cache keys are prefixed with the chain ID of the upstream, so one cache file can
+    serve several upstream nodes and chains.
+
+    Args:
+        upstream: URL of the node to forward to.
+        cache: Where responses are stored, in memory by default.
+        concurrency: Upstream connections (and requests in flight) at most.
+    """
+
+    def __init__(
+        self, upstream: str, cache: Optional[ResponseCache] = None, concurrency: int = DEFAULT_CONCURRENCY
+    ):
+        self.upstream = upstream
+        self.cache = ResponseCache(":memory:") if cache is None else cache
+        self.chain_id = ""
+        self.stats = {"requests": 0, "cached": 0, "merged": 0, "upstream": 0}
+        # The same counters per URL path, so that clients given different paths can be told apart
+        self.stats_by_path: Dict[str, Dict[str, int]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self.url = ""
+
+    def _post(self, payload: Any) -> Any:
+        response = self._session.post(self.upstream, json=payload, timeout=REQUEST_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.json()
+
+    async def _forward(self, requests_: List[dict]) -> List[dict]:
+        """Send requests upstream as one batch and return their responses in order."""
+        self.stats["upstream"] += len(requests_)
+        payload = [dict(request, id=index) for index, request in enumerate(requests_)]
+        try:
+            body = await asyncio.get_running_loop().run_in_executor(self._executor, self._post, payload)
+        except (requests.RequestException, ValueError) as e:
+            return [{"error": {"code": -32603, "message": f"Upstream request failed: {e}"}}] * len(requests_)
+        if isinstance(body, dict):
+            # Some nodes answer a whole batch with a single error object
+            return [body] * len(requests_)
+        by_id = {response.get("id"): response for response in body}
+        missing = {"error": {"code": -32603, "message": "missing response"}}
+        return [by_id.get(index, missing) for index in range(len(requests_))]
+
+    async def resolve(self, requests_: List[dict], path: str = "/") -> List[dict]:
+        """Responses to the requests, from the cache, from requests in flight or from upstream."""
+        self.stats["requests"] += len(requests_)
+        path_stats = self.stats_by_path.setdefault(path, dict.fromkeys(self.stats, 0))
+        path_stats["requests"] += len(requests_)
+        loop = asyncio.get_running_loop()
+        responses: List[Optional[dict]] = [None] * len(requests_)
+        waiting: List[Tuple[int, asyncio.Future]] = []
+        forwarded: List[Tuple[int, Optional[str]]] = []
+        for index, request in enumerate(requests_):
+            key = cache_key(request)
+            if key is not None:
+                key = f"{self.chain_id}:{key}"
+                result = self.cache.get(key)
+            if key is not None and result is not None:
+                self.stats["cached"] += 1
+                path_stats["cached"] += 1
+                responses[index] = {"result": result}
+            elif key is not None and key in self._in_flight:
+                self.stats["merged"] += 1
+                path_stats["merged"] += 1
+                waiting.append((index, self._in_flight[key]))
+            else:
+                if key is not None:
+                    self._in_flight[key] = loop.create_future()
+                forwarded.append((index, key))
+
+        if forwarded:
+            path_stats["upstream"] += len(forwarded)
+            try:
+                upstream_responses = await self._forward([requests_[index] for index, _ in forwarded])
+            except BaseException:
+                # Requests merged into these must never wait forever, e.g. when this one is cancelled
+                failed = {"error": {"code": -32603, "message": "Upstream request was cancelled"}}
+                for _, key in forwarded:
+                    if key is not None:
+                        self._in_flight.pop(key).set_result(failed)
+                raise
+            cacheable = []
+            for (index, key), response in zip(forwarded, upstream_responses):
+                responses[index] = response
+                if key is None:
+                    continue
+                if is_final(requests_[index], response):
+                    cacheable.append((key, response["result"]))
+                self._in_flight.pop(key).set_result(response)
+            if cacheable:
+                self.cache.put_many(cacheable)
+        for index, future in waiting:
+            responses[index] = await future
+
+        return [
+            {"jsonrpc": "2.0", "id": request.get("id"), **_outcome(response)}
+            for request, response in zip(requests_, responses)
+        ]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests on a connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                parts = request_line.decode("latin-1").split()
+                path = parts[1] if len(parts) > 1 else "/"
+                headers = {}
+                while True:
+                    line = (await reader.readline()).decode("latin-1").strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get("transfer-encoding", "").lower() == "chunked":
+                    body = b""
+                    while True:
+                        size = int((await reader.readline()).split(b";")[0], 16)
+                        chunk = await reader.readexactly(size + 2)
+                        if size == 0:
+                            break
+                        body += chunk[:-2]
+                else:
+                    body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                try:
+                    payload = json.loads(body)
+                    if isinstance(payload, list):
+                        result: Any = await self.resolve(payload, path)
+                    else:
+                        result = (await self.resolve([payload], path))[0]
+                    status, content = "200 OK", json.dumps(result).encode()
+                except ValueError:
+                    status = "400 Bad Request"
+                    error = {"code": -32700, "message": "Parse error"}
+                    content = json.dumps({"jsonrpc": "2.0", "id": None, "error": error}).encode()
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode()
+                    + content
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Closed by the client, or by `stop()`
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = 0) -> str:
+        """Start listening and return the URL of the proxy."""
+        chain_id = (await self._forward([{"jsonrpc": "2.0", "method": "eth_chainId", "params": []}]))[0]
+        if "error" in chain_id:
+            raise SystemExit(f"Could not reach the upstream node: {chain_id['error'].get('message')}")
+        self.chain_id = str(int(chain_id["result"], 16))
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.url = f"http://{host}:{self._server.sockets[0].getsockname()[1]}"
+        return self.url
+
+    def start(self, host: str = DEFAULT_HOST, port: int = 0) -> str:
+        """Serve from a background thread, for scripts that are not asyncio themselves."""
+        started = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.serve(host, port))
+                started.set()
+                self._loop.run_forever()
+            finally:
+                self._loop.close()
+
+        errors: List[BaseException] = []
+
+        def run_safely() -> None:
+            try:
+                run()
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                started.set()
+
+        self._thread = threading.Thread(target=run_safely, daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise SystemExit(f"Could not start the RPC proxy: {errors[0]}")
+        return self.url
+
+    async def _shutdown(self) -> None:
+        """Stop listening and close the open client connections, then the loop."""
+        if self._server:
+            self._server.close()
+        connections = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in connections:
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        asyncio.get_running_loop().stop()
+
+    def stop(self) -> None:
+        if self._loop and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            if self._thread:
+                self._thread.join(timeout=REQUEST_TIMEOUT_SECONDS)
+        self._executor.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caching JSON-RPC proxy for block-pinned requests")
+    parser.add_argument(
+        "--upstream", default=os.environ.get("ETH_RPC_URL"), help="Upstream node (default: ETH_RPC_URL)"
+    )
+    parser.add_argument("--cache", default=CACHE_PATH, help="Response cache (default: cache/rpc-cache.sqlite)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Serve until interrupted")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    run_parser = subparsers.add_parser("run", help="Run a command with ETH_RPC_URL pointing at the proxy")
+    run_parser.add_argument("arguments", nargs=argparse.REMAINDER, metavar="command")
+    args = parser.parse_args()
+    if not args.upstream:
+        sys.exit("Please set ETH_RPC_URL environment variable with RPC url")
+
+    proxy = RpcProxy(args.upstream, ResponseCache(args.cache))
+    if args.command == "serve":
+
+        async def serve() -> None:
+            url = await proxy.serve(args.host, args.port)
+            print(f"Proxying chain {proxy.chain_id} on {url}, cache: {args.cache}", flush=True)
+            await asyncio.Event().wait()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        return
+
+    command = args.arguments[1:] if args.arguments[:1] == ["--"] else args.arguments
+    if not command:
+        sys.exit("Please provide the command to run")
+    url = proxy.start()
+    try:
+        returncode = subprocess.run(command, env={**os.environ, "ETH_RPC_URL": url}).returncode
+    finally:
+        proxy.stop()
+    stats = proxy.stats
+    print(
+        f"RPC: {stats['requests']} requests, {stats['cached']} from cache, {stats['merged']} merged, "
+        f"{stats['upstream']} sent upstream",
+        file=sys.stderr,
+    )
+    sys.exit(returncode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Archived Spell Search
+
+Persistent inverted index over the DssSpell.sol and test/config.sol of every archived
+spell. Identifiers (and their camelCase/snake_case parts), string literals such as ilks
+and ChainLog keys, addresses and numeric constants are indexed against spell dates.
+
+The index lives in cache/archive-index.sqlite. Every run first indexes the archived spells
+that are new or changed since the last run. Files whose modification time and size (or
+those of their manifest) are unchanged are not read at all, and spells that were removed
+or renamed drop out of the index. A file identical to one that is already indexed is not
+tokenized again, and neither is a line.
+
+Usage:
+    ./scripts/search-archive.py <term> [<term> ...] [--anywhere] [--spells] OR
+    make search-archive q="ETH-A stability fee"
+
+All terms must appear on the same line, or with --anywhere in the same file.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from archive import ArchiveStore
+
+INDEX_PATH = os.environ.get(
+    "ARCHIVE_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "archive-index.sqlite"),
+)
+INDEXED_FILES = ("DssSpell.sol", "test/config.sol")
+
+STRING_PATTERN = re.compile(r'"([^"\\\n]{1,64})"')
+ADDRESS_PATTERN = re.compile(r"\b0x[0-9a-fA-F]{40}\b")
+NUMBER_PATTERN = re.compile(r"(?<![\w.])\d[\d_]*(?:\.\d+)?(?![\w.])")
+IDENTIFIER_PATTERN = re.compile(r"\b[A-Za-z_$][A-Za-z0-9_$]*\b")
+SUBWORD_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        spell TEXT NOT NULL,
+        path TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        mtime INTEGER,
+        size INTEGER,
+        PRIMARY KEY (spell, path)
+    );
+    CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, digest TEXT NOT NULL UNIQUE);
+    CREATE TABLE IF NOT EXISTS lines (id INTEGER PRIMARY KEY, hash BLOB NOT NULL UNIQUE, text TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS document_lines (
+        document INTEGER NOT NULL,
+        line_number INTEGER NOT NULL,
+        line INTEGER NOT NULL,
+        PRIMARY KEY (document, line_number)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS document_lines_by_line ON document_lines (line);
+    CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE);
+    CREATE TABLE IF NOT EXISTS postings (
+        term INTEGER NOT NULL,
+        line INTEGER NOT NULL,
+        PRIMARY KEY (term, line)
+    ) WITHOUT ROWID;
+"""
+
+
+def normalize_term(term: str) -> str:
+    """Form under which a term is indexed and looked up."""
+    term = term.strip().lower()
+    if NUMBER_PATTERN.fullmatch(term):
+        return term.replace("_", "")
+    return term
+
+
+def tokenize(line: str) -> Set[str]:
+    """Every indexed term of a source line."""
+    terms = set()
+    for match in STRING_PATTERN.finditer(line):
+        terms.add(match.group(1))
+    for match in ADDRESS_PATTERN.finditer(line):
+        terms.add(match.group(0))
+    for match in NUMBER_PATTERN.finditer(line):
+        terms.add(match.group(0))
+    for match in IDENTIFIER_PATTERN.finditer(line):
+        identifier = match.group(0)
+        terms.add(identifier)
+        # e.g. `setIlkStabilityFee` is found by `stability` and `fee`, `ETH_A_LINE` by `line`
+        terms.update(subword for subword in SUBWORD_PATTERN.findall(identifier) if len(subword) > 1)
+    return {normalize_term(term) for term in terms}
+
+
+class ArchiveIndex:
+    """Inverted index of the archived spells, kept in SQLite."""
+
+    def __init__(self, path: str = INDEX_PATH, store: Optional[ArchiveStore] = None):
+        self.store = store or ArchiveStore()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        if "mtime" not in {column for _, column, *_ in self.db.execute("PRAGMA table_info(files)")}:
+            # Indexes written before the file stats were recorded
+            self.db.executescript(
+                "ALTER TABLE files ADD COLUMN mtime INTEGER; ALTER TABLE files ADD COLUMN size INTEGER;"
+            )
+        # Loaded on the first insert only, so that searching does not read every term
+        self._terms: Optional[Dict[str, int]] = None
+
+    def _term_id(self, term: str) -> int:
+        if self._terms is None:
+            self._terms = dict(self.db.execute("SELECT term, id FROM terms"))
+        term_id = self._terms.get(term)
+        if term_id is None:
+            term_id = self.db.execute("INSERT INTO terms (term) VALUES (?)", (term,)).lastrowid
+            self._terms[term] = term_id
+        return term_id
+
+    def _line_id(self, text: str) -> int:
+        digest = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        row = self.db.execute("SELECT id FROM lines WHERE hash = ?", (digest,)).fetchone()
+        if row:
+            return row[0]
+        line_id = self.db.execute("INSERT INTO lines (hash, text) VALUES (?, ?)", (digest, text)).lastrowid
+        self.db.executemany(
+            "INSERT OR IGNORE INTO postings (term, line) VALUES (?, ?)",
+            [(self._term_id(term), line_id) for term in tokenize(text)],
+        )
+        return line_id
+
+    def _index_document(self, spell: str, path: str, digest: str) -> None:
+        if self.db.execute("SELECT 1 FROM documents WHERE digest = ?", (digest,)).fetchone():
+            return
+        document_id = self.db.execute("INSERT INTO documents (digest) VALUES (?)", (digest,)).lastrowid
+        content = self.store.read(spell, path).decode("utf-8", errors="replace")
+        self.db.executemany(
+            "INSERT INTO document_lines (document, line_number, line) VALUES (?, ?, ?)",
+            [
+                (document_id, line_number, self._line_id(text.rstrip()))
+                for line_number, text in enumerate(content.splitlines(), start=1)
+                if text.strip()
+            ],
+        )
+
+    def update(self) -> int:
+        """Index the archived spells that are new or changed since the last update.
+
+        Files are only hashed when their modification time or size changed, and the files
+        of spells that no longer exist are removed from the index.
+
+        Returns:
+            The number of files that were (re)indexed.
+        """
+        rows = self.db.execute("SELECT spell, path, digest, mtime, size FROM files")
+        indexed = {(spell, path): (digest, (mtime, size)) for spell, path, digest, mtime, size in rows}
+        present = set()
+        updated = 0
+        with self.db:
+            for spell in self.store.names():
+                for path in INDEXED_FILES:
+                    stat = self.store.stat(spell, path)
+                    known = indexed.get((spell, path))
+                    if stat is not None and known is not None and known[1] == stat:
+                        present.add((spell, path))
+                        continue
+                    digest = self.store.digest(spell, path) if stat is not None else None
+                    if digest is None:
+                        continue
+                    present.add((spell, path))
+                    if known is None or known[0] != digest:
+                        self._index_document(spell, path, digest)
+                        updated += 1
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO files (spell, path, digest, mtime, size) VALUES (?, ?, ?, ?, ?)",
+                        (spell, path, digest, *stat),
+                    )
+            self.db.executemany("DELETE FROM files WHERE spell = ? AND path = ?", set(indexed) - present)
+        return updated
+
+    def search(self, terms: Iterable[str], anywhere: bool = False) -> List[Tuple[str, str, int, str]]:
+        """Lines with all the terms (or any line with a term, in files with all of them).
+
+        Returns:
+            `(spell, path, line number, text)` tuples in spell date order.
+        """
+        term_ids = []
+        for term in dict.fromkeys(normalize_term(term) for term in terms):
+            row = self.db.execute("SELECT id FROM terms WHERE term = ?", (term,)).fetchone()
+            term_ids.append(row[0] if row else None)
+        if not term_ids or None in term_ids:
+            return []
+        placeholders = ",".join("?" * len(term_ids))
+        if anywhere:
+            matching = f"""
+                SELECT document_lines.document, document_lines.line_number, postings.line
+                FROM postings JOIN document_lines ON document_lines.line = postings.line
+                WHERE postings.term IN ({placeholders})
+                AND document_lines.document IN (
+                    SELECT document_lines.document
+                    FROM postings JOIN document_lines ON document_lines.line = postings.line
+                    WHERE postings.term IN ({placeholders})
+                    GROUP BY document_lines.document HAVING COUNT(DISTINCT postings.term) = ?
+                )
+            """
+            params = term_ids + term_ids + [len(term_ids)]
+        else:
+            matching = f"""
+                SELECT document_lines.document, document_lines.line_number, document_lines.line
+                FROM document_lines
+                WHERE document_lines.line IN (
+                    SELECT line FROM postings WHERE term IN ({placeholders})
+                    GROUP BY line HAVING COUNT(*) = ?
+                )
+            """
+            params = term_ids + [len(term_ids)]
+        rows = self.db.execute(
+            f"""
+            SELECT DISTINCT files.spell, files.path, matching.line_number, lines.text
+            FROM ({matching}) AS matching
+            JOIN documents ON documents.id = matching.document
+            JOIN files ON files.digest = documents.digest
+            JOIN lines ON lines.id = matching.line
+            ORDER BY files.spell, files.path, matching.line_number
+            """,
+            params,
+        )
+        return rows.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the DssSpell.sol and config.sol of every archived spell")
+    parser.add_argument("terms", nargs="+", metavar="term", help="Identifier, string, address or number, e.g. ETH-A")
+    parser.add_argument("--anywhere", action="store_true", help="Match terms anywhere in a file, not on one line")
+    parser.add_argument("--spells", action="store_true", help="Only print the matching spells")
+    parser.add_argument("--index", default=INDEX_PATH, help="Index database (default: cache/archive-index.sqlite)")
+    args = parser.parse_args()
+
+    # `make search-archive q="..."` passes the terms as a single argument
+    terms = [term for arg in args.terms for term in arg.replace("q=", "", 1).split()]
+    if not terms:
+        sys.exit("Please specify the terms to search for, e.g. make search-archive q=\"ETH-A stability fee\"")
+
+    start = time.monotonic()
+    index = ArchiveIndex(args.index)
+    updated = index.update()
+    if updated:
+        print(f"Indexed {updated} archived files in {time.monotonic() - start:.1f}s", file=sys.stderr)
+
+    results = index.search(terms, anywhere=args.anywhere)
+    if args.spells:
+        for spell in dict.fromkeys(spell for spell, _, _, _ in results):
+            print(spell)
+    else:
+        for spell, path, line_number, text in results:
+            print(f"{spell}/{path}:{line_number}: {text.strip()}")
+    if not results:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Local Spell Cast Simulator
+
+Casts a spell on a local anvil fork, the way `cast-on-tenderly` does on a Tenderly
+testnet: the hat of the chief is given to the spell by overwriting its storage slot,
+the spell is scheduled, the time is warped to `nextCastTime()` and the spell is cast.
+Then it reports the gas used, the emitted logs and the storage, balance and code diffs
+of the cast, labelled with the ChainLog keys of the touched addresses.
+
+The fork is leased from the warm fork pool and the ChainLog is read in one batch, so a
+simulation takes seconds and needs no Tenderly account.
+
+Usage:
+    ./scripts/simulate.py <spell> [--block <number>] [--json] [--all] OR
+    make cast-local spell=<address>
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from abi import encode_call
+from chainlog import CHANGELOG, decode_or_none, get_addresses, list_keys
+from forkpool import ForkPool
+from jsonrpc import JsonRpcClient, RpcError, eth_call
+
+CHAIN_ID = "1"
+CHIEF_HAT_SLOT = 1
+TRANSACTION_GAS = 1_000_000_000
+
+# Chronicle oracles read by Spark spells, which revert on stale prices once the time is warped
+CHRONICLE_ORACLES = {
+    "Chronicle_BTC_USD_3": "0x24C392CDbF32Cf911B258981a66d5541d85269ce",
+    "Chronicle_ETH_USD_3": "0x46ef0071b1E2fF6B42d36e5A177EA43Ae5917f4E",
+}
+# Storage slot of the Chronicle `_pokeData`, a `(uint32 age, uint128 price)` pair in two 16 byte halves
+CHRONICLE_POKE_DATA_SLOT = 4
+CHRONICLE_AGE_MARGIN_SECONDS = 30 * 24 * 60 * 60
+
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+
+def _word(value: int) -> str:
+    return f"0x{value:064x}"
+
+
+def chainlog_labels(addresses: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """ChainLog keys by lowercase address."""
+    labels = {CHANGELOG.lower(): "CHANGELOG"}
+    for key, address in addresses.items():
+        if address is not None:
+            labels.setdefault(address.lower(), key)
+    return labels
+
+
+def fix_chronicle_staleness(client: JsonRpcClient) -> None:
+    """Move the age of the Chronicle prices into the future, keeping the prices."""
+    addresses = list(CHRONICLE_ORACLES.values())
+    words = client.batch([("eth_getStorageAt", [a, hex(CHRONICLE_POKE_DATA_SLOT), "latest"]) for a in addresses])
+    age = int(time.time()) + CHRONICLE_AGE_MARGIN_SECONDS
+    slot = _word(CHRONICLE_POKE_DATA_SLOT)
+    client.batch(
+        [
+            ("anvil_setStorageAt", [address, slot, _word(age << 128 | int(word, 16) % 2**128)])
+            for address, word in zip(addresses, words)
+        ]
+    )
+
+
+def give_hat(client: JsonRpcClient, chief: str, spell: str) -> None:
+    """Make the spell the hat of the chief, as if it had been voted in."""
+    client.request("anvil_setStorageAt", [chief, _word(CHIEF_HAT_SLOT), _word(int(spell, 16))])
+    if client.call(chief, "hat()(address)").lower() != spell.lower():
+        raise SystemExit("Spell does not have the hat")
+
+
+def send(client: JsonRpcClient, sender: str, to: str, signature: str) -> Dict[str, Any]:
+    """Send a transaction from an unlocked account and return its receipt."""
+    tx_hash = client.request(
+        "eth_sendTransaction", [{"from": sender, "to": to, "data": encode_call(signature), "gas": hex(TRANSACTION_GAS)}]
+    )
+    receipt = client.request("eth_getTransactionReceipt", [tx_hash])
+    if receipt is None:
+        raise SystemExit(f"{signature} was not mined: {tx_hash}")
+    return receipt
+
+
+def state_diff(client: JsonRpcClient, tx_hash: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Balance, nonce, code and storage changes of the transaction by lowercase address.
+
+    Uses the `prestateTracer` in diff mode; None if the node does not support it.
+    """
+    try:
+        trace = client.request(
+            "debug_traceTransaction", [tx_hash, {"tracer": "prestateTracer", "tracerConfig": {"diffMode": True}}]
+        )
+    except RpcError:
+        return None
+    pre, post = trace.get("pre", {}), trace.get("post", {})
+    diffs = {}
+    for address in sorted(set(pre) | set(post)):
+        before, after = pre.get(address, {}), post.get(address, {})
+        diff: Dict[str, Any] = {}
+        for field in ("balance", "nonce", "code"):
+            if field in after and after[field] != before.get(field):
+                diff[field] = [before.get(field), after[field]]
+        before_storage, after_storage = before.get("storage", {}), after.get("storage", {})
+        storage = {}
+        for slot in sorted(set(before_storage) | set(after_storage)):
+            # Slots cleared by the transaction are left out of `post`
+            old, new = int(before_storage.get(slot, "0x0"), 16), int(after_storage.get(slot, "0x0"), 16)
+            if old != new:
+                storage[slot] = [_word(old), _word(new)]
+        if storage:
+            diff["storage"] = storage
+        if diff:
+            diffs[address.lower()] = diff
+    return diffs
+
+
+def simulate(client: JsonRpcClient, spell: str) -> Dict[str, Any]:
+    """Schedule and cast the spell on the fork behind the client, and report what the cast did."""
+    addresses = get_addresses(client, list_keys(client))
+    labels = chainlog_labels(addresses)
+    chief = addresses["MCD_ADM"]
+    description, done = client.batch(
+        [eth_call(spell, "description()(string)"), eth_call(spell, "done()(bool)")], raise_errors=False
+    )
+    if decode_or_none("done()(bool)", done):
+        raise SystemExit(f"Spell {spell} has already been cast")
+    sender = client.request("eth_accounts")[0]
+    # The gas of the schedule and cast transactions is above the default block gas limit
+    client.request("evm_setBlockGasLimit", [hex(TRANSACTION_GAS)])
+
+    fix_chronicle_staleness(client)
+    give_hat(client, chief, spell)
+    schedule = send(client, sender, spell, "schedule()")
+    if int(schedule["status"], 16) != 1:
+        raise SystemExit(f"Scheduling the spell reverted: {schedule['transactionHash']}")
+    next_cast_time = client.call(spell, "nextCastTime()(uint256)")
+    client.request("evm_setNextBlockTimestamp", [hex(next_cast_time)])
+    cast = send(client, sender, spell, "cast()")
+
+    diff = state_diff(client, cast["transactionHash"])
+    logs = [
+        {
+            "address": log["address"],
+            "label": labels.get(log["address"].lower()),
+            "topics": log["topics"],
+            "data": log["data"],
+        }
+        for log in cast["logs"]
+    ]
+    return {
+        "spell": spell,
+        "description": decode_or_none("description()(string)", description),
+        "success": int(cast["status"], 16) == 1,
+        "next_cast_time": next_cast_time,
+        "schedule_gas": int(schedule["gasUsed"], 16),
+        "cast_gas": int(cast["gasUsed"], 16),
+        "cast_transaction": cast["transactionHash"],
+        "logs": logs,
+        "state_diff": None
+        if diff is None
+        else {address: {"label": labels.get(address), **changes} for address, changes in diff.items()},
+    }
+
+
+def print_report(report: Dict[str, Any], show_all: bool = False) -> None:
+    print(f"Spell:     {report['spell']} {report['description'] or ''}".rstrip())
+    print(f"Cast:      {'succeeded' if report['success'] else 'REVERTED'} ({report['cast_transaction']})")
+    print(f"Cast time: {report['next_cast_time']}")
+    print(f"Gas:       schedule {report['schedule_gas']}, cast {report['cast_gas']}")
+
+    emitters: Dict[str, int] = {}
+    for log in report["logs"]:
+        emitter = log["label"] or log["address"]
+        emitters[emitter] = emitters.get(emitter, 0) + 1
+    print(f"\nLogs: {len(report['logs'])}")
+    for emitter, count in emitters.items():
+        print(f"  {emitter:<42} {count}")
+
+    if report["state_diff"] is None:
+        print("\nState diff: not supported by this anvil version")
+        return
+    unlabelled = [address for address, diff in report["state_diff"].items() if diff["label"] is None]
+    print(f"\nState diff: {len(report['state_diff'])} addresses, {len(unlabelled)} not in the ChainLog")
+    for address, diff in report["state_diff"].items():
+        if diff["label"] is None and not show_all:
+            continue
+        print(f"  {diff['label'] or address}")
+        for field in ("balance", "nonce", "code"):
+            if field in diff:
+                old, new = diff[field]
+                if field == "code":
+                    old, new = f"{len(old or '0x') // 2 - 1} bytes", f"{len(new or '0x') // 2 - 1} bytes"
+                print(f"    {field}: {old} -> {new}")
+        for slot, (old, new) in diff.get("storage", {}).items():
+            print(f"    {slot}: {old} -> {new}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cast a spell on a local fork and report what it did")
+    parser.add_argument("spell", help="Spell address")
+    parser.add_argument("--block", type=int, help="Fork block number (default: latest)")
+    parser.add_argument("--all", action="store_true", help="Show the diffs of addresses outside the ChainLog too")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    spell = args.spell.replace("spell=", "")
+    if not ADDRESS_PATTERN.match(spell):
+        sys.exit("Please specify the spell address (e.g. spell=0x...)")
+    upstream = os.environ.get("ETH_RPC_URL")
+    if not upstream:
+        sys.exit("Please set ETH_RPC_URL environment variable with RPC url")
+    if JsonRpcClient(upstream).chain_id() != CHAIN_ID:
+        sys.exit("Please set a Mainnet ETH_RPC_URL")
+
+    with ForkPool().lease(upstream, args.block) as fork:
+        report = simulate(JsonRpcClient(fork.url), spell)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.all)
+    if not report["success"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
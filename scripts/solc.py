@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Full solc build of the compiler version configured in foundry.toml.
+
+Explorers expect the full build string (e.g. `0.8.16+commit.07a7930e`) where
+foundry.toml only sets the version. The build is read from the forge build info
+in out/build-info when the spell has been built, otherwise from the list of solc
+releases (cached in cache/solc-list.json, and only fetched again for a version
+that is not in it yet).
+"""
+import glob
+import json
+import os
+import tomllib
+from typing import Optional
+
+import requests
+
+FOUNDRY_CONFIG_PATH = "foundry.toml"
+BUILD_INFO_DIR = os.path.join("out", "build-info")
+SOLC_LIST_URL = os.environ.get("SOLC_LIST_URL", "https://binaries.soliditylang.org/linux-amd64/list.json")
+SOLC_LIST_CACHE_PATH = os.path.join("cache", "solc-list.json")
+REQUEST_TIMEOUT_SECONDS = 30
+
+
+def configured_version(path: str = FOUNDRY_CONFIG_PATH) -> str:
+    """`solc_version` of the default profile in foundry.toml."""
+    with open(path, "rb") as f:
+        return tomllib.load(f)["profile"]["default"]["solc_version"]
+
+
+def build_info_version(version: str, build_info_dir: str = BUILD_INFO_DIR) -> Optional[str]:
+    """Full build of the version used by a forge build, if there is one."""
+    for path in glob.glob(os.path.join(build_info_dir, "*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            long_version = json.load(f).get("solcLongVersion", "")
+        if long_version.split("+")[0] == version:
+            return long_version
+    return None
+
+
+def _list_version(solc_list: dict, version: str) -> Optional[str]:
+    for build in solc_list.get("builds", []):
+        if build.get("version") == version and "prerelease" not in build:
+            return build["longVersion"]
+    return None
+
+
+def release_version(version: str, cache_path: str = SOLC_LIST_CACHE_PATH) -> Optional[str]:
+    """Full build of a released version, from the cached or fetched list of solc releases."""
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            long_version = _list_version(json.load(f), version)
+        if long_version:
+            return long_version
+
+    response = requests.get(SOLC_LIST_URL, timeout=REQUEST_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    solc_list = response.json()
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp_path = f"{cache_path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(solc_list, f)
+    os.replace(tmp_path, cache_path)
+    return _list_version(solc_list, version)
+
+
+def long_version(version: str) -> str:
+    """Full build string of a solc version, or raise SystemExit if it cannot be found."""
+    if "+commit." in version:
+        return version
+    found = build_info_version(version)
+    if found is None:
+        try:
+            found = release_version(version)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise SystemExit(f"Could not fetch the solc releases to find the build of {version}: {e}")
+    if found is None:
+        raise SystemExit(f"Unknown solc version {version}")
+    return found
+
+
+def compiler_version(path: str = FOUNDRY_CONFIG_PATH) -> str:
+    """Full solc build string of the version configured in foundry.toml."""
+    return long_version(configured_version(path))
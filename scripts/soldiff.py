@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Structural Solidity diff.
+
+Both sides are normalized the same way (CRLF line breaks, trailing whitespace and blank
+lines, SPDX and pragma headers), split into contracts and their members (functions,
+modifiers, events, state variables...), and compared member by member. Differences are
+reported per contract and per function instead of as one diff of whole files, which also
+makes a flattened file comparable with the same sources split over several files.
+
+Usage:
+    ./scripts/soldiff.py <old.sol> <new.sol> [--unified]
+"""
+import argparse
+import difflib
+import re
+import sys
+from typing import Dict, List, Tuple
+
+HEADER_PATTERN = re.compile(r"^\s*(?://\s*SPDX-License-Identifier:.*|pragma\s+(?:solidity|experimental|abicoder)\b.*)$")
+UNIT_PATTERN = re.compile(r"^(?:abstract\s+)?(contract|interface|library)\s+(\w+)")
+FUNCTION_PATTERN = re.compile(r"^function\s+(\w+)\s*\(([^)]*)\)")
+NAMED_MEMBER_PATTERN = re.compile(r"^(modifier|event|struct|enum|error|type)\s+(\w+)")
+SPECIAL_FUNCTION_PATTERN = re.compile(r"^(constructor|receive|fallback)\b")
+VARIABLE_PATTERN = re.compile(r"(\w+)\s*(?:=|;)")
+# Statements whose body in braces ends them; others (e.g. `import {A} from "a.sol";`) end at a `;`
+BRACE_BODIED_PATTERN = re.compile(
+    r"^\s*(?:abstract\s+)?(?:contract|interface|library|function|modifier|struct|enum|constructor|receive|fallback)\b"
+)
+
+# A member of a contract (or of the file): its label, e.g. `function actions()`, and its text
+Members = Dict[str, str]
+
+
+def normalize(source: str) -> str:
+    """Drop what differs between a flattened, an explorer and an archived copy of the same source."""
+    lines = [line.rstrip() for line in source.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    return "\n".join(line for line in lines if not HEADER_PATTERN.match(line)).strip("\n") + "\n"
+
+
+def mask(source: str) -> str:
+    """Copy of the source with comments and string contents blanked out, keeping every offset."""
+    masked = list(source)
+
+    def blank(start: int, end: int) -> None:
+        for j in range(start, end):
+            if masked[j] != "\n":
+                masked[j] = " "
+
+    i, length = 0, len(source)
+    while i < length:
+        if source.startswith("//", i):
+            end = source.find("\n", i)
+            end = length if end == -1 else end
+            blank(i, end)
+            i = end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            end = length if end == -1 else end + 2
+            blank(i, end)
+            i = end
+        elif source[i] in "\"'":
+            quote, end = source[i], i + 1
+            while end < length and source[end] not in (quote, "\n"):
+                end += 2 if source[end] == "\\" else 1
+            blank(i + 1, min(end, length))
+            i = end + 1
+        else:
+            i += 1
+    return "".join(masked)
+
+
+def split_statements(source: str, masked: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """Spans of the top-level statements between start and end: up to a `;`, or the closing `}`
+    of a brace-bodied declaration (contract, function, struct...).
+
+    Comments in front of a statement belong to its span.
+    """
+    spans = []
+    depth, parens, begin = 0, 0, start
+
+    def statement_end(i: int) -> int:
+        # A comment after the end of a statement, on the same line, still belongs to it
+        line_end = masked.find("\n", i, end)
+        line_end = end if line_end == -1 else line_end
+        return line_end if not masked[i:line_end].strip() else i
+
+    for i in range(start, end):
+        if i < begin:
+            continue
+        char = masked[i]
+        if char == "(":
+            parens += 1
+        elif char == ")":
+            parens -= 1
+        elif char == "{":
+            depth += 1
+        elif parens == 0 and (
+            char == ";" and depth == 0
+            or char == "}" and depth == 1 and BRACE_BODIED_PATTERN.match(masked[begin:i].lstrip())
+        ):
+            depth = 0
+            spans.append((begin, statement_end(i + 1)))
+            begin = spans[-1][1]
+        elif char == "}":
+            depth -= 1
+    if source[begin:end].strip():
+        spans.append((begin, end))
+    return spans
+
+
+def _parameter_types(parameters: str) -> str:
+    return ",".join(parameter.split()[0] for parameter in parameters.split(",") if parameter.strip())
+
+
+def label(statement: str) -> str:
+    """Label of a statement, from its masked text, e.g. `function actions()` or `variable MCD_VAT`."""
+    text = " ".join(statement.split())
+    for pattern, make_label in (
+        (UNIT_PATTERN, lambda m: f"{m.group(1)} {m.group(2)}"),
+        (FUNCTION_PATTERN, lambda m: f"function {m.group(1)}({_parameter_types(m.group(2))})"),
+        (SPECIAL_FUNCTION_PATTERN, lambda m: m.group(1)),
+        (NAMED_MEMBER_PATTERN, lambda m: f"{m.group(1)} {m.group(2)}"),
+    ):
+        match = pattern.match(text)
+        if match:
+            return make_label(match)
+    if text.startswith(("using ", "import ")) or not text:
+        return text
+    match = VARIABLE_PATTERN.search(text)
+    return f"variable {match.group(1)}" if match else text[:60]
+
+
+def _add(members: Members, name: str, text: str) -> None:
+    # Overloads and repeated declarations get a numbered label
+    unique, count = name, 1
+    while unique in members:
+        count += 1
+        unique = f"{name} #{count}"
+    members[unique] = text
+
+
+def _compact(text: str) -> str:
+    return "\n".join(line for line in text.strip("\n").split("\n") if line.strip())
+
+
+def parse(source: str) -> Dict[str, Members]:
+    """Split a (normalized) source into its units and their members.
+
+    Returns:
+        Members by unit label (e.g. `contract DssSpellAction`); statements outside of any
+        contract, such as free functions and file-level constants, are under the `file` unit.
+    """
+    masked = mask(source)
+    units: Dict[str, Members] = {"file": {}}
+    for start, end in split_statements(source, masked, 0, len(source)):
+        name = label(masked[start:end])
+        if not UNIT_PATTERN.match(name):
+            # Imports are gone once flattened, and only locate code that is compared anyway
+            if name and not name.startswith("import "):
+                _add(units["file"], name, _compact(source[start:end]))
+            continue
+        body_start = masked.index("{", start) + 1
+        members: Members = {}
+        # Everything up to the `{`, e.g. the inheritance list, is compared too
+        _add(members, "declaration", _compact(source[start:body_start]))
+        for member_start, member_end in split_statements(source, masked, body_start, end - 1):
+            member = label(masked[member_start:member_end])
+            if member:
+                _add(members, member, _compact(source[member_start:member_end]))
+        unique = name
+        count = 1
+        while unique in units:
+            count += 1
+            unique = f"{name} #{count}"
+        units[unique] = members
+    if not units["file"]:
+        del units["file"]
+    return units
+
+
+def diff_units(old: Dict[str, Members], new: Dict[str, Members]) -> List[Tuple[str, str, List[Tuple[str, str]]]]:
+    """Differences between two parsed sources.
+
+    Returns:
+        `(status, unit, members)` for every unit that is added (`+`), removed (`-`) or
+        changed (`~`); `members` lists the `(status, member)` pairs that differ in a changed unit.
+    """
+    result = []
+    for unit in list(old) + [unit for unit in new if unit not in old]:
+        if unit not in new:
+            result.append(("-", unit, []))
+        elif unit not in old:
+            result.append(("+", unit, []))
+        elif old[unit] != new[unit]:
+            members = []
+            for member in list(old[unit]) + [member for member in new[unit] if member not in old[unit]]:
+                if member not in new[unit]:
+                    members.append(("-", member))
+                elif member not in old[unit]:
+                    members.append(("+", member))
+                elif old[unit][member] != new[unit][member]:
+                    members.append(("~", member))
+            result.append(("~", unit, members))
+    return result
+
+
+def report(
+    old: Dict[str, Members],
+    new: Dict[str, Members],
+    old_name: str = "old",
+    new_name: str = "new",
+    unified: bool = False,
+) -> List[str]:
+    """Lines of a per-contract, per-function report, with member diffs if `unified` is set."""
+    lines = []
+    for status, unit, members in diff_units(old, new):
+        lines.append(f"{status} {unit}")
+        for member_status, member in members:
+            if member_status != "~":
+                lines.append(f"    {member_status} {member}")
+                continue
+            before, after = old[unit][member].split("\n"), new[unit][member].split("\n")
+            changes = list(
+                difflib.unified_diff(before, after, f"{old_name}: {member}", f"{new_name}: {member}", lineterm="")
+            )
+            if " ".join(old[unit][member].split()) == " ".join(new[unit][member].split()):
+                lines.append(f"    ~ {member} (whitespace only)")
+                continue
+            added = sum(1 for line in changes[2:] if line.startswith("+"))
+            removed = sum(1 for line in changes[2:] if line.startswith("-"))
+            lines.append(f"    ~ {member} (+{added} -{removed})")
+            if unified:
+                lines.extend(f"        {line}" for line in changes)
+    return lines
+
+
+def diff_sources(old: str, new: str, old_name: str = "old", new_name: str = "new", unified: bool = False) -> List[str]:
+    """Structural report of the differences between two sources; empty if they match."""
+    old, new = normalize(old), normalize(new)
+    if old == new:
+        return []
+    return report(parse(old), parse(new), old_name, new_name, unified) or [
+        "~ whitespace or comments outside of any declaration"
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Structural diff of two Solidity sources")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--unified", action="store_true", help="Show the changed lines of every changed member")
+    args = parser.parse_args()
+
+    sources = []
+    for path in (args.old, args.new):
+        with open(path, "r", encoding="utf-8") as f:
+            sources.append(f.read())
+    lines = diff_sources(*sources, args.old, args.new, args.unified)
+    print("\n".join(lines) if lines else f"✔ {args.old} and {args.new} match")
+    sys.exit(1 if lines else 0)
+
+
+if __name__ == "__main__":
+    main()
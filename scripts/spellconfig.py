@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Structured reader/writer for src/test/config.sol.
+
+The file is read and tokenized once into the values of its `SpellValues`, `SystemValues`
+and `CollateralValues` structs. Every value keeps the span of its expression, so values can
+be read with their struct field type (e.g. `deployed_spell_block` as an int) and edited in
+place, leaving the rest of the file byte-identical.
+
+Usage:
+    ./scripts/spellconfig.py get <name> [<name> ...]       e.g. deployed_spell, ETH-A.pct
+    ./scripts/spellconfig.py set <name>=<expression> [...]
+"""
+import argparse
+import ast
+import operator
+import re
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from abi import to_checksum_address
+from soldiff import mask
+
+CONFIG_PATH = "src/test/config.sol"
+
+STRUCT_PATTERN = re.compile(r"\bstruct\s+(\w+)\s*\{([^}]*)\}")
+CONSTANT_PATTERN = re.compile(r"\b\w+\s+constant\s+(?:(?:private|internal|public)\s+)?(\w+)\s*=\s*([^;]+);")
+SPELL_VALUES_PATTERN = re.compile(r"\bspellValues\s*=\s*SpellValues\s*\(\s*\{")
+COLLATERAL_PATTERN = re.compile(r"\bafterSpell\s*\.\s*collaterals\s*\[\s*\"([^\"]*)\"\s*\]\s*=\s*CollateralValues\s*\(\s*\{")
+SYSTEM_VALUE_PATTERN = re.compile(r"\bafterSpell\s*\.\s*(\w+)\s*=\s*")
+FIELD_PATTERN = re.compile(r"\s*(\w+)\s*:\s*")
+ADDRESS_PATTERN = re.compile(r"^(?:address\s*\(\s*)?(0x[0-9a-fA-F]{40}|0)\s*\)?$")
+
+TIME_UNITS = {"seconds": 1, "minutes": 60, "hours": 3600, "days": 86400, "weeks": 604800}
+INTEGER_TYPES = re.compile(r"^u?int\d*$")
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: lambda a, b: abs(a) // abs(b) * (1 if (a >= 0) == (b >= 0) else -1),
+    ast.Pow: operator.pow,
+}
+
+
+class Value:
+    """A value assigned in config.sol: its struct field type, expression text and span."""
+
+    def __init__(self, struct: str, name: str, field_type: str, text: str, span: Tuple[int, int]):
+        self.struct = struct
+        self.name = name
+        self.type = field_type
+        self.text = text
+        self.span = span
+
+    def __repr__(self) -> str:
+        return f"Value({self.struct}.{self.name}={self.text})"
+
+
+def _evaluate(node: ast.AST, constants: Dict[str, int]) -> int:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, constants)
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in constants:
+        return constants[node.id]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_evaluate(node.operand, constants)
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.left, constants), _evaluate(node.right, constants))
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+
+def evaluate_integer(text: str, constants: Dict[str, int]) -> int:
+    """Value of an integer expression such as `110 * (1_000_000_000 * WAD / 180 days) / 100`.
+
+    Divisions truncate like they do for the typed constants config.sol uses.
+    """
+    expression = re.sub(r"\btype\s*\(\s*(u?int\d*)\s*\)\s*\.\s*max\b", lambda m: str(_max_of(m.group(1))), text)
+    # Casts such as `int256(MILLION)` do not change the value
+    expression = re.sub(r"\bu?int\d*\s*\(", "(", expression)
+    expression = re.sub(
+        r"(\d[\d_]*|\))\s+(" + "|".join(TIME_UNITS) + r")\b",
+        lambda m: f"{m.group(1)} * {TIME_UNITS[m.group(2)]}",
+        expression,
+    )
+    # Python reads `1_000_000` and `10 ** 18` the same way Solidity does
+    return _evaluate(ast.parse(expression, mode="eval"), constants)
+
+
+def _max_of(integer_type: str) -> int:
+    bits = int(re.sub(r"\D", "", integer_type) or 256)
+    return 2**bits - 1 if integer_type.startswith("u") else 2 ** (bits - 1) - 1
+
+
+def _matching(masked: str, start: int, opening: str = "{", closing: str = "}") -> int:
+    """Index of the bracket closing the one at start."""
+    depth = 0
+    for i in range(start, len(masked)):
+        if masked[i] == opening:
+            depth += 1
+        elif masked[i] == closing:
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError(f"Unbalanced {opening} at offset {start}")
+
+
+def _expression_end(masked: str, start: int, terminators: str) -> int:
+    """End of the expression starting at start: the first terminator outside of any brackets."""
+    depth = 0
+    for i in range(start, len(masked)):
+        char = masked[i]
+        if char in "([{":
+            depth += 1
+        elif depth == 0 and char in terminators:
+            return i
+        elif char in ")]}":
+            depth -= 1
+    raise ValueError(f"Unterminated expression at offset {start}")
+
+
+class SpellConfig:
+    """The values of a config.sol, read once, with in-place edits."""
+
+    def __init__(self, content: str, path: str = CONFIG_PATH):
+        self.path = path
+        self.content = content
+        self._masked = mask(content)
+        self._edits: Dict[Tuple[int, int], str] = {}
+        self.struct_fields: Dict[str, Dict[str, str]] = {
+            name: self._struct_fields(body) for name, body in STRUCT_PATTERN.findall(self._masked)
+        }
+        self.constants: Dict[str, int] = {}
+        for match in CONSTANT_PATTERN.finditer(self._masked):
+            self.constants[match.group(1)] = evaluate_integer(match.group(2).strip(), self.constants)
+        self.spell: Dict[str, Value] = {}
+        self.system: Dict[str, Value] = {}
+        self.collaterals: Dict[str, Dict[str, Value]] = {}
+        self._parse_values()
+
+    @classmethod
+    def read(cls, path: str = CONFIG_PATH) -> "SpellConfig":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read(), path)
+
+    @staticmethod
+    def _struct_fields(body: str) -> Dict[str, str]:
+        fields = {}
+        for declaration in body.split(";"):
+            words = declaration.split()
+            if words:
+                fields[words[-1]] = " ".join(words[:-1])
+        return fields
+
+    def _value(self, struct: str, name: str, start: int, end: int) -> Value:
+        # Trailing whitespace and comments are not part of the expression
+        while end > start and self._masked[end - 1].isspace():
+            end -= 1
+        field_type = self.struct_fields.get(struct, {}).get(name, "")
+        return Value(struct, name, field_type, self.content[start:end], (start, end))
+
+    def _struct_literal(self, struct: str, brace: int) -> Dict[str, Value]:
+        values = {}
+        close = _matching(self._masked, brace)
+        position = brace + 1
+        while position < close:
+            end = min(_expression_end(self._masked, position, ",}"), close)
+            match = FIELD_PATTERN.match(self._masked, position)
+            if match:
+                values[match.group(1)] = self._value(struct, match.group(1), match.end(), end)
+            position = end + 1
+        return values
+
+    def _parse_values(self) -> None:
+        for match in SPELL_VALUES_PATTERN.finditer(self._masked):
+            self.spell = self._struct_literal("SpellValues", match.end() - 1)
+        for match in COLLATERAL_PATTERN.finditer(self._masked):
+            ilk = self.content[match.start(1):match.end(1)]
+            self.collaterals[ilk] = self._struct_literal("CollateralValues", match.end() - 1)
+        for match in SYSTEM_VALUE_PATTERN.finditer(self._masked):
+            if match.group(1) == "collaterals":
+                continue
+            end = _expression_end(self._masked, match.end(), ";")
+            self.system[match.group(1)] = self._value("SystemValues", match.group(1), match.end(), end)
+
+    def find(self, name: str) -> Value:
+        """Value by name: a SpellValues or SystemValues field, or `<ilk>.<field>` for collaterals."""
+        if name in self.spell:
+            return self.spell[name]
+        if name in self.system:
+            return self.system[name]
+        ilk, _, field = name.rpartition(".")
+        if ilk in self.collaterals and field in self.collaterals[ilk]:
+            return self.collaterals[ilk][field]
+        raise KeyError(f"{name} is not set in {self.path}")
+
+    def get(self, name: str) -> Any:
+        """Typed value by name, see `find`."""
+        return self.typed(self.find(name))
+
+    def typed(self, value: Value) -> Any:
+        """Python value of a config value, according to its struct field type.
+
+        Addresses are returned checksummed, integers evaluated, bytes32 and strings unquoted.
+        Values that are not literals (e.g. arrays held in local variables) are returned as text.
+        """
+        text = self._edits.get(value.span, value.text).strip()
+        if value.type == "address":
+            match = ADDRESS_PATTERN.match(text)
+            if not match:
+                raise ValueError(f"{value.name} is not an address: {text}")
+            return to_checksum_address(match.group(1) if match.group(1) != "0" else "0x" + "0" * 40)
+        if value.type == "bool":
+            return text == "true"
+        if INTEGER_TYPES.match(value.type):
+            return evaluate_integer(text, self.constants)
+        if value.type in ("bytes32", "string") and text.startswith('"'):
+            return text[1:-1]
+        return text
+
+    def set(self, name: str, text: str) -> None:
+        """Replace the expression of a value, applied by `render`/`write`."""
+        self._edits[self.find(name).span] = text
+
+    def render(self) -> str:
+        """Content with every edit applied; untouched bytes are kept as they are."""
+        parts, position = [], 0
+        for (start, end), text in sorted(self._edits.items()):
+            parts.append(self.content[position:start])
+            parts.append(text)
+            position = end
+        parts.append(self.content[position:])
+        return "".join(parts)
+
+    def write(self, path: Optional[str] = None) -> None:
+        with open(path or self.path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Read or edit the values of {CONFIG_PATH}")
+    parser.add_argument("--config", default=CONFIG_PATH, help=f"Spell test config (default: {CONFIG_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    get_parser = subparsers.add_parser("get", help="Print typed values, e.g. deployed_spell or ETH-A.pct")
+    get_parser.add_argument("names", nargs="+", metavar="name")
+    set_parser = subparsers.add_parser("set", help="Replace the expressions of values in place")
+    set_parser.add_argument("assignments", nargs="+", metavar="name=expression")
+    args = parser.parse_args()
+
+    config = SpellConfig.read(args.config)
+    try:
+        if args.command == "get":
+            for name in args.names:
+                print(config.get(name))
+        else:
+            for assignment in args.assignments:
+                name, separator, text = assignment.partition("=")
+                if not separator:
+                    sys.exit(f"Expected <name>=<expression>, got {assignment}")
+                config.set(name, text)
+            config.write()
+    except (KeyError, ValueError) as e:
+        sys.exit(str(e).strip("'\""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+UTC date and timestamp conversions, and the cast time rules of DssExec spells.
+
+`next_cast_time` mirrors `DssExec.nextCastTime()`: a spell can be cast once its `eta`
+(the schedule time plus the pause delay) has passed, and with office hours enabled only
+on weekdays from 14:00 to 21:00 UTC. The earliest cast time of a spell can therefore be
+computed without any RPC call.
+
+(The CLI is scripts/time.py; this module has its own name as `time` would be shadowed by
+the standard library module of the same name when imported.)
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Union
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+DAY = 24 * 60 * 60
+HOUR = 60 * 60
+MINUTE = 60
+# Office hours, in UTC, of weekdays (Monday to Friday)
+OFFICE_HOURS_START = 14
+OFFICE_HOURS_END = 21
+
+
+def parse_date(text: str) -> datetime:
+    """UTC datetime of a date such as `2024-01-31`, `2024-01-31 14:00` or `2024-01-31T14:00:00 UTC`."""
+    text = text.strip().upper().replace(" UTC", "").removesuffix("Z")
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc)
+
+
+def to_date(stamp: Union[int, str]) -> datetime:
+    return datetime.fromtimestamp(int(stamp), timezone.utc)
+
+
+def to_timestamp(value: Union[int, str]) -> int:
+    """Timestamp of a timestamp or a date."""
+    if isinstance(value, int) or value.strip().isdigit():
+        return int(value)
+    return int(parse_date(value).timestamp())
+
+
+def convert(value: str) -> Dict[str, Any]:
+    """Both forms of a date or timestamp; raises ValueError if it is neither."""
+    stamp = to_timestamp(value)
+    return {"input": value.strip(), "timestamp": stamp, "date": to_date(stamp).strftime(DATE_FORMAT)}
+
+
+def next_cast_time(eta: int, now: Optional[int] = None, office_hours: bool = True) -> int:
+    """Earliest time at or after `now` (default: the eta) that a spell with the eta can be cast."""
+    cast_time = max(eta, eta if now is None else now)
+    if not office_hours:
+        return cast_time
+    # 1970-01-01 was a Thursday, so this counts days from Monday (0) to Sunday (6)
+    day = (cast_time // DAY + 3) % 7
+    hour = cast_time // HOUR % 24
+    minute = cast_time // MINUTE % 60
+    second = cast_time % 60
+    if day >= 5:
+        # Weekend: go to 14:00 UTC on Monday
+        cast_time += (6 - day) * DAY + (24 - hour + OFFICE_HOURS_START) * HOUR - minute * MINUTE - second
+    elif hour >= OFFICE_HOURS_END:
+        # After hours: go to 14:00 UTC of the next day, skipping the weekend on Fridays
+        if day == 4:
+            cast_time += 2 * DAY
+        cast_time += (24 - hour + OFFICE_HOURS_START) * HOUR - minute * MINUTE - second
+    elif hour < OFFICE_HOURS_START:
+        # Before hours: go to 14:00 UTC of the same day
+        cast_time += (OFFICE_HOURS_START - hour) * HOUR - minute * MINUTE - second
+    return cast_time
+
+
+def earliest_cast_time(schedule_time: int, delay: int, office_hours: bool = True) -> Dict[str, int]:
+    """The eta and earliest cast time of a spell scheduled at the time, with the pause delay."""
+    eta = schedule_time + delay
+    return {"schedule": schedule_time, "eta": eta, "cast": next_cast_time(eta, office_hours=office_hours)}
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Sharded parallel runner for the forked spell tests.
+
+Lists the tests, splits them into shards balanced by the durations in the test history
+(scripts/testprofile.py), and runs every shard as its own `forge test` process. All shards
+fork the same pinned block through one local caching RPC proxy (scripts/rpcproxy.py), so
+every storage slot is fetched from ETH_RPC_URL only once, and not at all when the block
+was tested before. The results are merged into one report and recorded in the history.
+
+Usage:
+    ./scripts/test-sharded.py [--shards <n>] [--block <number>] [--match-test <regex>] OR
+    make test-sharded [shards=<n>] [block=<number>] [match=<regex>]
+"""
+import argparse
+import heapq
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from jsonrpc import JsonRpcClient
+from rpcproxy import ResponseCache, RpcProxy
+from testprofile import (
+    CHAIN_ID,
+    DEFAULT_DURATION_SECONDS,
+    TestHistory,
+    failures,
+    list_tests,
+    run_forge_tests,
+    test_records,
+)
+
+
+def balance(tests: List[Tuple[str, str]], durations: Dict[str, float], shards: int) -> List[List[str]]:
+    """Test names split into at most `shards` groups of about the same expected duration.
+
+    Tests are matched by name, so a name shared by several contracts stays in one shard.
+    Tests are assigned longest first, each to the shard with the least expected time so far.
+    """
+    known = sorted(durations.values())
+    default = known[len(known) // 2] if known else DEFAULT_DURATION_SECONDS
+    by_name: Dict[str, float] = {}
+    for contract, name in tests:
+        by_name[name] = by_name.get(name, 0.0) + durations.get(f"{contract}::{name}", default)
+
+    heap = [(0.0, index, []) for index in range(min(shards, len(by_name)))]
+    for name in sorted(by_name, key=lambda name: (-by_name[name], name)):
+        total, index, names = heapq.heappop(heap)
+        names.append(name)
+        heapq.heappush(heap, (total + by_name[name], index, names))
+    return [names for _, _, names in sorted(heap, key=lambda shard: shard[1])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the forked spell tests as parallel shards")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1, help="Parallel forge processes")
+    parser.add_argument("--block", default="", help="Fork block number (default: latest block)")
+    parser.add_argument("--match-test", default="", help="Only run tests matching the regex")
+    parser.add_argument("--no-match-test", default="", help="Skip tests matching the regex")
+    parser.add_argument("--match-contract", default="", help="Only run contracts matching the regex")
+    args = parser.parse_args()
+
+    upstream = os.environ.get("ETH_RPC_URL")
+    if not upstream:
+        sys.exit("Please set ETH_RPC_URL environment variable with RPC url")
+    client = JsonRpcClient(upstream)
+    if client.chain_id() != CHAIN_ID:
+        sys.exit("Please set a mainnet ETH_RPC_URL")
+    # Every shard must see the same chain state
+    block = args.block.replace("block=", "") or str(int(client.request("eth_blockNumber"), 16))
+
+    filters = []
+    for flag, value in (
+        ("--match-contract", args.match_contract),
+        ("--match-test", args.match_test),
+        ("--no-match-test", args.no_match_test),
+    ):
+        if value:
+            filters += [flag, value]
+
+    # Compile once, instead of in every shard at the same time
+    subprocess.run(["forge", "build"], check=True)
+    tests = list_tests(filters)
+    if not tests:
+        sys.exit("No tests match the filters")
+    history = TestHistory()
+    shards = balance(tests, history.durations(), args.shards)
+    # Shards select their tests by name, the contract filter still applies
+    shard_filters = ["--match-contract", args.match_contract] if args.match_contract else []
+    print(f"Running {len(tests)} tests in {len(shards)} shards at block {block}", flush=True)
+
+    proxy = RpcProxy(upstream, ResponseCache())
+    rpc_url = proxy.start()
+    start = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            outcomes = list(
+                executor.map(
+                    lambda names: run_forge_tests(
+                        rpc_url, block, shard_filters + ["--match-test", f"^({'|'.join(map(re.escape, names))})$"]
+                    ),
+                    shards,
+                )
+            )
+    finally:
+        proxy.stop()
+    elapsed = time.monotonic() - start
+
+    errors = []
+    for index, (result, stderr, shard_time) in enumerate(outcomes):
+        if result is None:
+            errors.append(f"✖ Shard {index + 1} produced no results:\n{stderr.strip()}")
+        else:
+            print(f"Shard {index + 1}: {len(shards[index])} tests in {shard_time:.1f}s")
+    records = {}
+    for result, _, _ in outcomes:
+        if result is not None:
+            records.update(test_records(result))
+    history.record("sharded", block, records)
+    failed = failures(records)
+    passed = sum(1 for record in records.values() if record["status"] == "Success")
+
+    for line in failed + errors:
+        print(line)
+    stats = proxy.stats
+    print(
+        f"{'✖' if failed or errors else '✔'} {passed} passed, {len(failed)} failed in {elapsed:.1f}s; "
+        f"RPC: {stats['requests']} requests, {stats['cached']} from cache, {stats['upstream']} sent upstream"
+    )
+    if failed or errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Spell test profiling and history.
+
+Runs of the forked spell tests are recorded in a JSON lines history file, one run per
+line, with the wall time, gas and (when profiled) RPC requests of every test. The history
+shows which tests dominate the suite, flags tests that got slower or use more gas than in
+the baseline run, and gives scripts/test-sharded.py the durations to balance its shards.
+
+`profile` runs every test as its own `forge test` process, several at once, all forking
+the same block through one caching RPC proxy (scripts/rpcproxy.py). Every process uses
+its own URL path on the proxy, so the RPC requests of every test are counted separately.
+
+Usage:
+    ./scripts/testprofile.py profile [--jobs <n>] [--block <number>] [--match-test <regex>]
+    ./scripts/testprofile.py show [--count <n>] [--run <id>]
+    ./scripts/testprofile.py compare [--baseline <id>] [--threshold <ratio>]
+    ./scripts/testprofile.py baseline [<id>]
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from jsonrpc import JsonRpcClient
+from rpcproxy import ResponseCache, RpcProxy
+
+CHAIN_ID = "1"
+HISTORY_PATH = os.path.join("cache", "test-history.jsonl")
+# Assumed duration of a test that has not been run yet
+DEFAULT_DURATION_SECONDS = 1.0
+# A test regressed if it takes this many times as long (or as much gas) as in the baseline...
+DEFAULT_THRESHOLD = 1.25
+# ...and at least this many seconds longer, which keeps noise of short tests out
+MIN_REGRESSION_SECONDS = 0.5
+
+DURATION_PATTERN = re.compile(r"^([\d.]+)\s*(ns|µs|us|ms|s|m|h)$")
+DURATION_UNITS = {"ns": 1e-9, "µs": 1e-6, "us": 1e-6, "ms": 1e-3, "s": 1, "m": 60, "h": 3600}
+
+# Test record by `<contract>::<test>`: status, reason, duration, gas and RPC requests
+Records = Dict[str, Dict[str, Any]]
+
+
+def parse_duration(value: Any) -> float:
+    """Seconds of a duration as forge reports it: `{"secs", "nanos"}`, a number or e.g. `1.2s`."""
+    if isinstance(value, dict):
+        return value.get("secs", 0) + value.get("nanos", 0) / 1e9
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = DURATION_PATTERN.match(str(value).strip())
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)] if match else 0.0
+
+
+def test_name(name: str) -> str:
+    """Test function name without its parameter list, e.g. `testGeneral` for `testGeneral()`."""
+    return name.split("(", 1)[0]
+
+
+def gas_of(result: dict) -> Optional[int]:
+    """Gas of a test result: the gas of a unit test, the mean gas of a fuzz or invariant test."""
+    for kind in (result.get("kind") or {}).values():
+        if isinstance(kind, dict):
+            for field in ("gas", "mean_gas"):
+                if field in kind:
+                    return kind[field]
+    return None
+
+
+def list_tests(filters: List[str]) -> List[Tuple[str, str]]:
+    """`(contract, test)` pairs of every test forge would run with the given filters."""
+    output = subprocess.run(
+        ["forge", "test", "--list", "--json", *filters], stdout=subprocess.PIPE, text=True, check=True
+    ).stdout
+    listing = json.loads(output[output.index("{"):])
+    return [
+        (contract, test_name(test))
+        for contracts in listing.values()
+        for contract, tests in contracts.items()
+        for test in tests
+    ]
+
+
+def run_forge_tests(rpc_url: str, block: str, filters: List[str]) -> Tuple[Optional[dict], str, float]:
+    """Run `forge test --json` on a fork.
+
+    Returns:
+        The parsed JSON results (None if forge produced none), stderr and the wall time.
+    """
+    command = ["forge", "test", "--fork-url", rpc_url, "--fork-block-number", block, "--json", *filters]
+    start = time.monotonic()
+    process = subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env={**os.environ, "FOUNDRY_ROOT_CHAINID": CHAIN_ID},
+    )
+    elapsed = time.monotonic() - start
+    output = process.stdout
+    if "{" not in output:
+        return None, process.stderr or output, elapsed
+    try:
+        return json.loads(output[output.index("{"):]), process.stderr, elapsed
+    except json.JSONDecodeError:
+        return None, process.stderr or output, elapsed
+
+
+def test_records(results: dict) -> Records:
+    """Records of every test in the JSON results of `forge test`."""
+    records: Records = {}
+    for suite, suite_result in results.items():
+        contract = suite.rsplit(":", 1)[-1]
+        for test, result in suite_result.get("test_results", {}).items():
+            records[f"{contract}::{test_name(test)}"] = {
+                "status": result.get("status"),
+                "reason": result.get("reason"),
+                "duration": round(parse_duration(result.get("duration")), 3),
+                "gas": gas_of(result),
+            }
+    return records
+
+
+def failures(records: Records) -> List[str]:
+    """Lines reporting every test that did not pass."""
+    return [
+        f"✖ {test}: {record.get('reason') or record.get('status')}"
+        for test, record in sorted(records.items())
+        if record.get("status") not in ("Success", "Skipped")
+    ]
+
+
+def git_commit() -> str:
+    process = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    return process.stdout.strip()
+
+
+class TestHistory:
+    """Recorded test runs, appended as JSON lines."""
+
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+
+    def runs(self) -> List[dict]:
+        """Every recorded run, oldest first; a `baseline` entry marks the run it names."""
+        if not os.path.exists(self.path):
+            return []
+        runs: List[dict] = []
+        baseline = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if "baseline" in entry:
+                        baseline = entry["baseline"]
+                    else:
+                        runs.append(entry)
+        for run in runs:
+            run["is_baseline"] = run["id"] == baseline
+        return runs
+
+    def _append(self, entry: dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, sort_keys=True) + "\n")
+
+    def record(self, mode: str, block: str, tests: Records) -> dict:
+        """Append a run and return it."""
+        run = {
+            "id": datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S"),
+            "commit": git_commit(),
+            "mode": mode,
+            "block": block,
+            "tests": tests,
+        }
+        self._append(run)
+        return run
+
+    def set_baseline(self, run_id: str) -> None:
+        self._append({"baseline": run_id})
+
+    def find(self, run_id: Optional[str] = None) -> dict:
+        """Run with the given ID, or the latest run."""
+        runs = self.runs()
+        if not runs:
+            raise SystemExit(f"No test runs recorded in {self.path}")
+        if run_id is None:
+            return runs[-1]
+        for run in runs:
+            if run["id"] == run_id:
+                return run
+        raise SystemExit(f"No test run {run_id} in {self.path}")
+
+    def baseline(self, before: dict) -> Optional[dict]:
+        """Run marked as the baseline, or else the run recorded before the given one."""
+        runs = self.runs()
+        marked = [run for run in runs if run["is_baseline"] and run["id"] != before["id"]]
+        if marked:
+            return marked[-1]
+        earlier = [run for run in runs if run["id"] < before["id"]]
+        return earlier[-1] if earlier else None
+
+    def durations(self) -> Dict[str, float]:
+        """Latest recorded duration of every test."""
+        durations: Dict[str, float] = {}
+        for run in self.runs():
+            for test, record in run["tests"].items():
+                durations[test] = record["duration"]
+        return durations
+
+
+def regressions(
+    current: Records,
+    baseline: Records,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_seconds: float = MIN_REGRESSION_SECONDS,
+) -> List[str]:
+    """Lines reporting every test that takes longer or uses more gas than in the baseline."""
+    lines = []
+    for test in sorted(current.keys() & baseline.keys()):
+        now, before = current[test], baseline[test]
+        if now["duration"] > before["duration"] * threshold and now["duration"] - before["duration"] >= min_seconds:
+            lines.append(f"✖ {test}: {before['duration']:.2f}s -> {now['duration']:.2f}s")
+        if now.get("gas") and before.get("gas") and now["gas"] > before["gas"] * threshold:
+            lines.append(f"✖ {test}: {before['gas']} gas -> {now['gas']} gas")
+    return lines
+
+
+def slowest(records: Records, count: int) -> List[str]:
+    """Table of the slowest tests with their share of the total test time."""
+    total = sum(record["duration"] for record in records.values()) or 1.0
+    lines = [f"{'test':<60} {'time':>9} {'share':>6} {'gas':>14} {'rpc':>7}"]
+    for test, record in sorted(records.items(), key=lambda item: -item[1]["duration"])[:count]:
+        gas = record.get("gas")
+        rpc = record.get("rpc")
+        lines.append(
+            f"{test:<60} {record['duration']:>8.2f}s {record['duration'] / total:>6.1%} "
+            f"{gas if gas is not None else '-':>14} {rpc if rpc is not None else '-':>7}"
+        )
+    return lines
+
+
+def profile(tests: List[Tuple[str, str]], upstream: str, block: str, jobs: int) -> Tuple[Records, List[str]]:
+    """Run every test in its own forge process and record its RPC requests.
+
+    Returns:
+        The test records, and errors of forge processes that produced no results.
+    """
+    proxy = RpcProxy(upstream, ResponseCache())
+    rpc_url = proxy.start()
+
+    def run(test: Tuple[str, str]) -> Tuple[Tuple[str, str], Optional[dict], str]:
+        contract, name = test
+        filters = ["--match-contract", f"^{contract}$", "--match-test", f"^{re.escape(name)}$"]
+        results, stderr, _ = run_forge_tests(f"{rpc_url}/{contract}/{name}", block, filters)
+        return test, results, stderr
+
+    records: Records = {}
+    errors: List[str] = []
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for (contract, name), results, stderr in executor.map(run, tests):
+                if results is None:
+                    errors.append(f"✖ {contract}::{name} produced no results:\n{stderr.strip()}")
+                    continue
+                stats = proxy.stats_by_path.get(f"/{contract}/{name}", {})
+                for test, record in test_records(results).items():
+                    record.update(rpc=stats.get("requests", 0), upstream=stats.get("upstream", 0))
+                    records[test] = record
+                    print(f"{test}: {record['duration']:.2f}s, {record['rpc']} RPC requests", flush=True)
+    finally:
+        proxy.stop()
+    return records, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the spell tests and compare runs")
+    parser.add_argument("--history", default=HISTORY_PATH, help=f"History file (default: {HISTORY_PATH})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    profile_parser = subparsers.add_parser("profile", help="Run and record every test in its own forge process")
+    profile_parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Parallel forge processes")
+    profile_parser.add_argument("--block", default="", help="Fork block number (default: latest block)")
+    profile_parser.add_argument("--match-test", default="", help="Only run tests matching the regex")
+    profile_parser.add_argument("--match-contract", default="", help="Only run contracts matching the regex")
+    show_parser = subparsers.add_parser("show", help="Show the slowest tests of a run")
+    show_parser.add_argument("--run", help="Run ID (default: latest run)")
+    show_parser.add_argument("--count", type=int, default=20, help="Number of tests (default: 20)")
+    compare_parser = subparsers.add_parser("compare", help="Compare a run with the baseline")
+    compare_parser.add_argument("--run", help="Run ID (default: latest run)")
+    for subparser in (profile_parser, compare_parser):
+        subparser.add_argument("--baseline", help="Run ID to compare with (default: marked baseline or previous run)")
+        subparser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Ratio that is a regression")
+    baseline_parser = subparsers.add_parser("baseline", help="Mark a run as the baseline")
+    baseline_parser.add_argument("run", nargs="?", help="Run ID (default: latest run)")
+    args = parser.parse_args()
+
+    history = TestHistory(args.history)
+
+    if args.command == "profile":
+        upstream = os.environ.get("ETH_RPC_URL")
+        if not upstream:
+            sys.exit("Please set ETH_RPC_URL environment variable with RPC url")
+        client = JsonRpcClient(upstream)
+        if client.chain_id() != CHAIN_ID:
+            sys.exit("Please set a mainnet ETH_RPC_URL")
+        block = args.block.replace("block=", "") or str(int(client.request("eth_blockNumber"), 16))
+        filters = []
+        for flag, value in (("--match-contract", args.match_contract), ("--match-test", args.match_test)):
+            if value:
+                filters += [flag, value]
+        subprocess.run(["forge", "build"], check=True)
+        tests = list_tests(filters)
+        if not tests:
+            sys.exit("No tests match the filters")
+        print(f"Profiling {len(tests)} tests at block {block}", flush=True)
+        records, errors = profile(tests, upstream, block, args.jobs)
+        run = history.record("profile", block, records)
+        print("\n".join(slowest(records, 20)))
+        problems = failures(records) + errors
+
+    elif args.command == "show":
+        run = history.find(args.run)
+        print(f"Run {run['id']} ({run['mode']}) of {run['commit']} at block {run['block']}")
+        print("\n".join(slowest(run["tests"], args.count)))
+        return
+
+    elif args.command == "baseline":
+        run = history.find(args.run)
+        history.set_baseline(run["id"])
+        print(f"✔ Run {run['id']} is the baseline")
+        return
+
+    else:
+        run = history.find(args.run)
+        problems = []
+
+    baseline = history.find(args.baseline) if args.baseline else history.baseline(run)
+    if baseline is None:
+        print("No earlier run to compare with")
+    else:
+        found = regressions(run["tests"], baseline["tests"], args.threshold)
+        problems += found
+        if not found:
+            print(f"✔ No regressions against run {baseline['id']}")
+    for line in problems:
+        print(line)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
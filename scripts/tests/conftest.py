@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The scripts import each other as top-level modules, as they do when run from scripts/
+sys.path[:0] = [SCRIPTS_DIR, os.path.join(SCRIPTS_DIR, "verification")]
+
+from stubs import StubRpc  # noqa: E402
+
+
+@pytest.fixture
+def rpc(monkeypatch):
+    """Stub JSON-RPC node, set as ETH_RPC_URL."""
+    with StubRpc() as node:
+        monkeypatch.setenv("ETH_RPC_URL", node.url)
+        yield node
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Temporary working directory, so caches written under cache/ do not outlive the test."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
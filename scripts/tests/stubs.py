@@ -0,0 +1,185 @@
+"""
+Local stub servers standing in for the RPC nodes and explorer APIs the scripts talk to.
+
+Every stub listens on a free port of 127.0.0.1 and records the requests it received,
+so tests can check both the results of a script and how many requests it needed.
+"""
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from abi import encode, format_bytes32_string, selector
+
+
+class StubRequest:
+    """A request received by a stub server."""
+
+    def __init__(self, method: str, path: str, query: Dict[str, str], body: bytes, content_type: str):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.body = body
+        self.content_type = content_type
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def form(self) -> Dict[str, str]:
+        return dict(parse_qsl(self.body.decode()))
+
+
+# The handler of a stub answers a request with a status and a JSON body
+Handler = Callable[[StubRequest], Tuple[int, Any]]
+
+
+class StubServer:
+    """HTTP server answering every request with `handler`."""
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.requests: List[StubRequest] = []
+        stub = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self) -> None:
+                parts = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                request = StubRequest(
+                    self.command,
+                    parts.path,
+                    dict(parse_qsl(parts.query)),
+                    self.rfile.read(length),
+                    self.headers.get("Content-Type", ""),
+                )
+                stub.requests.append(request)
+                status, body = stub.handler(request)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class RpcFault(Exception):
+    """Raised by a stub method or contract to answer with a JSON-RPC error."""
+
+    def __init__(self, message: str = "execution reverted", code: int = 3):
+        super().__init__(message)
+        self.error = {"code": code, "message": message}
+
+
+class StubRpc(StubServer):
+    """JSON-RPC node with `methods` by name and contracts answering `eth_call` by selector.
+
+    Batch responses are shuffled, as nodes may return them in any order.
+    """
+
+    def __init__(self, chain_id: int = 1):
+        self.methods: Dict[str, Callable[[list], Any]] = {"eth_chainId": lambda params: hex(chain_id)}
+        self.contracts: Dict[str, Dict[bytes, Callable[[bytes], bytes]]] = {}
+        self.calls: List[Tuple[str, list]] = []
+        super().__init__(self._handle_rpc)
+
+    def contract(self, address: str, signature: str, handler: Callable[[bytes], bytes]) -> None:
+        """Answer `eth_call`s of the signature on the address with `handler(encoded arguments)`."""
+        self.contracts.setdefault(address.lower(), {})[selector(signature)] = handler
+
+    def returns(self, address: str, signature: str, types: List[str], *values: Any) -> None:
+        """Answer `eth_call`s of the signature on the address with fixed values."""
+        self.contract(address, signature, lambda _: encode(types, list(values)))
+
+    def chainlog(self, address: str, entries: Dict[str, str]) -> None:
+        """ChainLog contract at the address with the entries by key."""
+        keys = list(entries)
+        self.returns(address, "list()", ["bytes32[]"], [format_bytes32_string(key) for key in keys])
+
+        def get_address(data: bytes) -> bytes:
+            key = data[:32].rstrip(b"\0").decode()
+            if key not in entries:
+                raise RpcFault("execution reverted: dss-chain-log/invalid-key")
+            return encode(["address"], [entries[key]])
+
+        self.contract(address, "getAddress(bytes32)", get_address)
+
+    def _eth_call(self, params: list) -> str:
+        to, data = params[0]["to"].lower(), bytes.fromhex(params[0]["data"][2:])
+        handler = self.contracts.get(to, {}).get(data[:4])
+        if handler is None:
+            # Calls to accounts without code succeed with empty output
+            if to in self.contracts:
+                raise RpcFault()
+            return "0x"
+        return "0x" + handler(data[4:]).hex()
+
+    def _answer(self, request: dict) -> dict:
+        method, params = request["method"], request.get("params", [])
+        self.calls.append((method, params))
+        response: Dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            if method in self.methods:
+                response["result"] = self.methods[method](params)
+            elif method == "eth_call":
+                response["result"] = self._eth_call(params)
+            else:
+                raise RpcFault(f"the method {method} does not exist", -32601)
+        except RpcFault as fault:
+            response["error"] = fault.error
+        return response
+
+    def _handle_rpc(self, request: StubRequest) -> Tuple[int, Any]:
+        body = request.json()
+        if isinstance(body, dict):
+            return 200, self._answer(body)
+        responses = [self._answer(item) for item in body]
+        random.shuffle(responses)
+        return 200, responses
+
+    def batches(self) -> int:
+        """Number of HTTP requests received, batched or not."""
+        return len(self.requests)
+
+    def count(self, method: str) -> int:
+        return sum(1 for name, _ in self.calls if name == method)
+
+
+def address(index: int) -> str:
+    """Distinct address for an index."""
+    return f"0x{index:040x}"
+
+
+def routes(table: Dict[str, Callable[[StubRequest], Tuple[int, Any]]], fallback: Optional[Handler] = None) -> Handler:
+    """Handler dispatching by `"<METHOD> <path>"`."""
+
+    def handle(request: StubRequest) -> Tuple[int, Any]:
+        handler = table.get(f"{request.method} {request.path}", fallback)
+        if handler is None:
+            return 404, {"message": f"no route for {request.method} {request.path}"}
+        return handler(request)
+
+    return handle
@@ -0,0 +1,94 @@
+import pytest
+
+from abi import (
+    decode,
+    decode_result,
+    encode,
+    encode_call,
+    format_bytes32_string,
+    parse_bytes32_string,
+    parse_signature,
+    selector,
+    to_checksum_address,
+)
+
+
+def test_selector():
+    assert selector("transfer(address,uint256)").hex() == "a9059cbb"
+    # Output types and spaces are ignored
+    assert selector("balanceOf(address)(uint256)") == selector("balanceOf( address )")
+    assert parse_signature("getAddress(bytes32)(address)") == ("getAddress", ["bytes32"], ["address"])
+    with pytest.raises(ValueError, match="Unsupported signature"):
+        parse_signature("f((uint256,address))")
+
+
+def test_encode_call_matches_the_solidity_abi_specification():
+    calldata = encode_call("f(uint256,uint32[],bytes10,bytes)", 0x123, [0x456, 0x789], "1234567890", b"Hello, world!")
+    assert calldata == "0x8be65246" + "".join(
+        [
+            "0000000000000000000000000000000000000000000000000000000000000123",
+            "0000000000000000000000000000000000000000000000000000000000000080",
+            "3132333435363738393000000000000000000000000000000000000000000000",
+            "00000000000000000000000000000000000000000000000000000000000000e0",
+            "0000000000000000000000000000000000000000000000000000000000000002",
+            "0000000000000000000000000000000000000000000000000000000000000456",
+            "0000000000000000000000000000000000000000000000000000000000000789",
+            "000000000000000000000000000000000000000000000000000000000000000d",
+            "48656c6c6f2c20776f726c642100000000000000000000000000000000000000",
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "types, values",
+    [
+        (["address"], ["0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"]),
+        (["bool", "bool"], [True, False]),
+        (["uint8", "uint256"], [255, 2**256 - 1]),
+        (["int256", "int24"], [-1, -(2**23)]),
+        (["bytes32", "bytes4"], [format_bytes32_string("MCD_VAT"), "0xdeadbeef"]),
+        (["string"], ["Hello, world! " * 5]),
+        (["bytes"], ["0x" + "ab" * 33]),
+        (["string", "uint256", "bytes"], ["", 7, "0x"]),
+        (["bytes32[]"], [[format_bytes32_string(key) for key in ("MCD_VAT", "MCD_JUG", "MCD_POT")]]),
+        (["string[]", "address[]"], [["a", "bc" * 20, ""], ["0x0000000000000000000000000000000000000001"]]),
+        (["uint256[]"], [[]]),
+    ],
+)
+def test_round_trip(types, values):
+    assert decode(types, encode(types, values)) == values
+    assert decode(types, "0x" + encode(types, values).hex()) == values
+
+
+def test_decode_result():
+    assert decode_result("wards(address)(uint256)", encode(["uint256"], [1])) == 1
+    data = encode(["address", "uint256"], ["0x0000000000000000000000000000000000000001", 2])
+    assert decode_result("f()(address,uint256)", data) == ("0x0000000000000000000000000000000000000001", 2)
+    with pytest.raises(ValueError, match="Not enough data"):
+        decode_result("wards(address)(uint256)", "0x")
+
+
+def test_encode_errors():
+    with pytest.raises(ValueError, match="Expected 2 values"):
+        encode(["uint256", "uint256"], [1])
+    with pytest.raises(ValueError, match="too long for bytes4"):
+        encode(["bytes4"], ["0xdeadbeef00"])
+    with pytest.raises(ValueError, match="Unsupported type"):
+        encode(["fixed128x18"], [1])
+
+
+def test_checksum_address():
+    for address in (
+        "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed",
+        "0xfB6916095ca1df60bB79Ce92cE3Ea74c37c5d359",
+        "0xdbF03B407c01E7cD3CBea99509d93f8DDDC8C6FB",
+        "0xD1220A0cf47c7B9Be7A2E6BA89F429762e7b9aDb",
+    ):
+        assert to_checksum_address(address.lower()) == address
+
+
+def test_bytes32_strings():
+    assert format_bytes32_string("MCD_VAT") == "0x4d43445f564154" + "00" * 25
+    assert parse_bytes32_string(format_bytes32_string("MCD_VAT")) == "MCD_VAT"
+    with pytest.raises(ValueError, match="too long"):
+        format_bytes32_string("A" * 33)
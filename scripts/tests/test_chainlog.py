@@ -0,0 +1,73 @@
+import sys
+
+import pytest
+
+import chainlog
+from abi import encode, format_bytes32_string, to_checksum_address
+from chainlog import CHANGELOG, UPDATE_ADDRESS_TOPIC, ChainLogSnapshot, book_order
+from stubs import address
+
+VAT, JUG, POT, SPOT, NEW_JUG = (to_checksum_address(address(i)) for i in (1, 2, 3, 4, 5))
+
+BOOK = """\
+contract Addresses {
+
+    mapping (bytes32 => address) public addr;
+
+    constructor() {
+        addr["MCD_VAT"]                          = 0x0000000000000000000000000000000000000001;
+        addr["MCD_SPOT"]                         = 0x0000000000000000000000000000000000000004;
+        addr["MCD_JUG"]                          = 0x0000000000000000000000000000000000000002;
+    }
+}
+"""
+
+
+@pytest.fixture
+def snapshot(rpc, tmp_path):
+    """Snapshot bootstrapped at block 100, then synced past an update of MCD_JUG at block 110."""
+    rpc.chainlog(CHANGELOG, {"MCD_SPOT": SPOT, "MCD_VAT": VAT, "MCD_POT": POT, "MCD_JUG": JUG})
+    rpc.returns(CHANGELOG, "version()", ["string"], "1.0.0")
+    update = {
+        "blockNumber": hex(110),
+        "logIndex": "0x0",
+        "topics": [UPDATE_ADDRESS_TOPIC],
+        "data": "0x" + encode(["bytes32", "address"], [format_bytes32_string("MCD_JUG"), NEW_JUG]).hex(),
+    }
+    rpc.methods["eth_getLogs"] = lambda params: [update]
+
+    snapshot = ChainLogSnapshot(str(tmp_path / "chainlog.sqlite"))
+    snapshot.sync(chainlog.JsonRpcClient(), to_block=100)
+    snapshot.sync(chainlog.JsonRpcClient(), to_block=120)
+    return snapshot
+
+
+def test_addresses_are_sorted_by_key(snapshot):
+    # MCD_JUG changed last, but keeps its place
+    assert list(snapshot.addresses().items()) == [
+        ("MCD_JUG", NEW_JUG),
+        ("MCD_POT", POT),
+        ("MCD_SPOT", SPOT),
+        ("MCD_VAT", VAT),
+    ]
+    assert snapshot.addresses(100)["MCD_JUG"] == JUG
+
+
+def test_book_order(snapshot, tmp_path):
+    book = tmp_path / "addresses_mainnet.sol"
+    book.write_text(BOOK)
+    # Keys of the book come first, in its order, and new keys follow
+    assert list(book_order(snapshot.addresses(), str(book))) == ["MCD_VAT", "MCD_SPOT", "MCD_JUG", "MCD_POT"]
+    assert list(book_order(snapshot.addresses(), str(tmp_path / "missing.sol"))) == list(snapshot.addresses())
+
+
+def test_export_diffs_against_the_book(snapshot, tmp_path, monkeypatch, capsys):
+    book = tmp_path / "addresses_mainnet.sol"
+    book.write_text(BOOK)
+    monkeypatch.setattr(chainlog, "ChainLogSnapshot", lambda: snapshot)
+    monkeypatch.setattr(sys, "argv", ["chainlog.py", "export", "--block", "100", "--book", str(book)])
+    chainlog.main()
+    lines = [line for line in capsys.readouterr().out.splitlines() if "addr[" in line and "=" in line]
+    assert lines == BOOK.splitlines()[5:8] + [
+        '        addr["MCD_POT"]                          = 0x0000000000000000000000000000000000000003;'
+    ]
@@ -0,0 +1,146 @@
+import importlib
+import json
+import sys
+
+import pytest
+
+import etherscan
+from stubs import StubRpc, StubServer
+
+check_deployed = importlib.import_module("check-deployed")
+
+SPELL = "0xA0059DaDd7Fbdbc81a9bb9d1d17cCB029b6AF596"
+LIBRARY = "0x8De6DDbCd5053d32292AAA0D2105A32d108484a6"
+BUILD = "0.8.16+commit.07a7930e"
+BLOCK = 25043934
+TIMESTAMP = 1778166215
+TX_HASH = "0x" + "ab" * 32
+
+CONFIG = f"""contract Config {{
+    struct SpellValues {{
+        address   deployed_spell;
+        uint256   deployed_spell_created;
+        uint256   deployed_spell_block;
+    }}
+    SpellValues spellValues;
+    function setValues() public {{
+        spellValues = SpellValues({{
+            deployed_spell:         address({SPELL}),
+            deployed_spell_created: {TIMESTAMP},
+            deployed_spell_block:   {BLOCK}
+        }});
+    }}
+}}
+"""
+
+SOURCE_CODE = {
+    "SourceCode": "pragma solidity 0.8.16; contract DssSpell {}",
+    "ContractName": "DssSpell",
+    "LicenseType": "GNU AGPLv3",
+    "CompilerVersion": f"v{BUILD}",
+    "OptimizationUsed": "0",
+    "Library": f"DssExecLib:{LIBRARY[2:].lower()}",
+}
+
+
+@pytest.fixture
+def spell_repo(workdir):
+    (workdir / "src" / "test").mkdir(parents=True)
+    (workdir / "src" / "test" / "config.sol").write_text(CONFIG)
+    (workdir / "foundry.toml").write_text(
+        "[profile.default]\n"
+        'solc_version = "0.8.16"\n'
+        f'libraries = ["lib/dss-exec-lib/src/DssExecLib.sol:DssExecLib:{LIBRARY}"]\n'
+    )
+    (workdir / "out" / "build-info").mkdir(parents=True)
+    (workdir / "out" / "build-info" / "spell.json").write_text(json.dumps({"solcLongVersion": BUILD}))
+    return workdir
+
+
+@pytest.fixture
+def explorer(monkeypatch):
+    answers = {
+        "getsourcecode": {"status": "1", "message": "OK", "result": [SOURCE_CODE]},
+        "txlistinternal": {
+            "status": "1",
+            "message": "OK",
+            "result": [{"hash": TX_HASH, "blockNumber": str(BLOCK), "type": "create"}],
+        },
+    }
+    with StubServer(lambda request: (200, answers[request.query["action"]])) as server:
+        server.answers = answers
+        monkeypatch.setattr(etherscan, "ETHERSCAN_API_URL", f"{server.url}/v2/api")
+        monkeypatch.setenv("ETHERSCAN_API_KEY", "key")
+        yield server
+
+
+def chain(rpc, tx_block=BLOCK, timestamp=TIMESTAMP):
+    rpc.methods["eth_getTransactionByHash"] = lambda params: {"hash": params[0], "blockNumber": hex(tx_block)}
+    rpc.methods["eth_getBlockByNumber"] = lambda params: {"number": params[0], "timestamp": hex(timestamp)}
+
+
+def run(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["check-deployed.py", "--json"])
+    try:
+        check_deployed.main()
+        code = 0
+    except SystemExit as exit:
+        code = exit.code
+    return code, json.loads(capsys.readouterr().out)["checks"]
+
+
+def test_deployed_spell_passes(spell_repo, explorer, rpc, monkeypatch, capsys):
+    chain(rpc)
+    code, checks = run(monkeypatch, capsys)
+    assert code == 0
+    assert checks == dict.fromkeys(["verified", "license", "solc", "optimizer", "library", "timestamp", "block"], True)
+    # The transaction and its block are fetched in one batch
+    assert rpc.count("eth_getTransactionByHash") == rpc.count("eth_getBlockByNumber") == 1
+    assert rpc.batches() == 2
+
+
+def test_responses_are_cached(spell_repo, explorer, rpc, monkeypatch, capsys):
+    chain(rpc)
+    run(monkeypatch, capsys)
+    run(monkeypatch, capsys)
+    assert sorted(request.query["action"] for request in explorer.requests) == ["getsourcecode", "txlistinternal"]
+
+
+def test_mismatches_fail(spell_repo, explorer, rpc, monkeypatch, capsys):
+    chain(rpc, tx_block=BLOCK + 1)
+    explorer.answers["getsourcecode"]["result"] = [
+        {**SOURCE_CODE, "CompilerVersion": "v0.8.30+commit.73712a01", "OptimizationUsed": "1", "Library": ""}
+    ]
+    code, checks = run(monkeypatch, capsys)
+    assert code == 1
+    assert [name for name, passed in checks.items() if not passed] == [
+        "solc",
+        "optimizer",
+        "library",
+        "timestamp",
+        "block",
+    ]
+
+
+def test_unverified_spell_without_deployment(spell_repo, explorer, rpc, monkeypatch, capsys):
+    explorer.answers["getsourcecode"]["result"] = [{"SourceCode": "", "ABI": "Contract source code not verified"}]
+    explorer.answers["txlistinternal"] = {"status": "0", "message": "No transactions found", "result": []}
+    code, checks = run(monkeypatch, capsys)
+    assert code == 1
+    assert not checks["verified"] and not checks["timestamp"] and not checks["block"]
+    # Nothing is looked up on chain without a deployment transaction
+    assert rpc.count("eth_getTransactionByHash") == 0
+
+
+def test_rpc_errors_fail_the_deployment_checks(rpc):
+    client = check_deployed.JsonRpcClient(rpc.url)
+    checks = check_deployed.deployment_checks(client, [{"hash": TX_HASH, "blockNumber": str(BLOCK)}], BLOCK, TIMESTAMP)
+    assert [(name, passed) for name, passed, _, _ in checks] == [("timestamp", False), ("block", False)]
+
+
+def test_wrong_chain(spell_repo, explorer, monkeypatch):
+    with StubRpc(chain_id=10) as node:
+        monkeypatch.setenv("ETH_RPC_URL", node.url)
+        monkeypatch.setattr(sys, "argv", ["check-deployed.py"])
+        with pytest.raises(SystemExit, match="Mainnet"):
+            check_deployed.main()
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+import deploy
+from deploy import Checkpoint, run_stages
+
+
+class Timeline:
+    """Stands in for the stages, recording when each one runs."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    def stage(self, name):
+        def run(values):
+            start = time.monotonic()
+            time.sleep(0.05)
+            with self.lock:
+                self.spans[name] = (start, time.monotonic())
+            if name in self.failing:
+                raise SystemExit(f"{name} failed")
+            return {f"{name}_done": "1"}
+
+        return run
+
+    def install(self, monkeypatch):
+        stages = [(name, self.stage(name), dependencies) for name, _, dependencies in deploy.STAGES]
+        monkeypatch.setattr(deploy, "STAGES", stages)
+
+    def overlap(self, first, second):
+        (start, end), (other_start, other_end) = self.spans[first], self.spans[second]
+        return start < other_end and other_start < end
+
+
+def test_tests_run_after_verification(workdir, monkeypatch):
+    timeline = Timeline()
+    timeline.install(monkeypatch)
+    checkpoint = Checkpoint()
+    run_stages(checkpoint)
+
+    assert checkpoint.completed[-1] == "commit"
+    assert sorted(checkpoint.completed) == sorted(name for name, _, _ in deploy.STAGES)
+    # `make test` rebuilds the out/ and cache/ that verification reads
+    assert timeline.spans["test"][0] >= timeline.spans["verify"][1]
+    assert timeline.overlap("verify", "lookup")
+
+
+def test_resume_after_a_failed_verification(workdir, monkeypatch):
+    timeline = Timeline(failing=["verify"])
+    timeline.install(monkeypatch)
+    with pytest.raises(SystemExit, match="--resume"):
+        run_stages(Checkpoint())
+    assert "test" not in timeline.spans
+
+    timeline = Timeline()
+    timeline.install(monkeypatch)
+    checkpoint = Checkpoint()
+    assert checkpoint.load()
+    run_stages(checkpoint)
+    # The deployment is not repeated
+    assert {"verify", "test", "commit"} <= set(timeline.spans)
+    assert not {"preflight", "deploy"} & set(timeline.spans)
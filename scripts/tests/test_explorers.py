@@ -0,0 +1,187 @@
+import json
+
+import pytest
+
+import explorers
+from stubs import StubServer
+
+ADDRESS = "0x00000000000000000000000000000000000000aa"
+BUILD = "0.8.16+commit.07a7930e"
+
+
+def sequence(*responses):
+    """Handler answering with the responses in turn, repeating the last one."""
+    remaining = list(responses)
+
+    def handle(request):
+        return remaining.pop(0) if len(remaining) > 1 else remaining[0]
+
+    return handle
+
+
+@pytest.fixture(autouse=True)
+def spell(monkeypatch):
+    """Skip flattening and compiler lookups, and the waits between attempts."""
+    monkeypatch.setattr(explorers, "get_standard_json_input", lambda: {"language": "Solidity"})
+    monkeypatch.setattr(explorers, "get_compiler_version", lambda: BUILD)
+    monkeypatch.setattr(explorers.time, "sleep", lambda seconds: None)
+
+
+def etherscan(monkeypatch, submissions, statuses=((200, {"status": "1", "result": "Pass - Verified"}),)):
+    submit, check = sequence(*submissions), sequence(*statuses)
+    server = StubServer(lambda request: submit(request) if request.method == "POST" else check(request))
+    monkeypatch.setattr(explorers, "ETHERSCAN_API_URL", f"{server.url}/v2/api")
+    return server
+
+
+def verify_on_etherscan(logs):
+    return explorers.verify_on_etherscan(ADDRESS, "DssSpell", "1", "key", 3, 1, logs.append)
+
+
+def test_etherscan_polls_until_verified(monkeypatch):
+    logs = []
+    with etherscan(
+        monkeypatch,
+        [(200, {"status": "1", "result": "guid-1"})],
+        [(200, {"status": "0", "result": "Pending in queue"}), (200, {"status": "1", "result": "Pass - Verified"})],
+    ) as server:
+        assert verify_on_etherscan(logs)
+
+    submission, *checks = server.requests
+    form = submission.form()
+    assert submission.query == {"chainid": "1"}
+    assert form["action"] == "verifysourcecode"
+    assert form["contractaddress"] == ADDRESS
+    assert form["contractname"] == "src/DssSpell.sol:DssSpell"
+    assert form["compilerversion"] == f"v{BUILD}"
+    assert json.loads(form["sourceCode"]) == {"language": "Solidity"}
+    assert [check.query["guid"] for check in checks] == ["guid-1", "guid-1"]
+    assert logs[-1] == "✓ etherscan verification OK"
+
+
+def test_etherscan_already_verified(monkeypatch):
+    logs = []
+    with etherscan(monkeypatch, [(200, {"status": "0", "result": "Contract source code already verified"})]) as server:
+        assert verify_on_etherscan(logs)
+    assert len(server.requests) == 1
+    assert logs == ["✓ etherscan: already verified"]
+
+
+def test_etherscan_failure(monkeypatch):
+    logs = []
+    with etherscan(
+        monkeypatch,
+        [(200, {"status": "1", "result": "guid-1"})],
+        [(200, {"status": "0", "result": "Fail - Unable to verify. Compiled contract bytecode does NOT match"})],
+    ) as server:
+        assert not verify_on_etherscan(logs)
+    # A failed verification is final, so it is not polled again
+    assert len(server.requests) == 2
+    assert logs[-1] == "✗ etherscan verification failed"
+
+
+def test_etherscan_retries_submission(monkeypatch):
+    logs = []
+    with etherscan(
+        monkeypatch,
+        [
+            (502, {"message": "Bad Gateway"}),
+            (200, {"status": "0", "result": "Unable to locate ContractCode at 0xaa"}),
+            (200, {"status": "1", "result": "guid-1"}),
+        ],
+    ) as server:
+        assert verify_on_etherscan(logs)
+    assert [request.method for request in server.requests] == ["POST", "POST", "POST", "GET"]
+    assert logs[0].startswith("Submission failed")
+    assert logs[1] == "Submission rejected: Unable to locate ContractCode at 0xaa"
+
+
+def test_etherscan_gives_up_after_retries(monkeypatch):
+    logs = []
+    with etherscan(monkeypatch, [(200, {"status": "0", "result": "Unable to locate ContractCode"})]) as server:
+        assert not verify_on_etherscan(logs)
+    # The first attempt and 3 retries
+    assert len(server.requests) == 4
+    assert logs[-1] == "✗ etherscan verification failed"
+
+
+def sourcify(monkeypatch, submissions, jobs=((200, {"isJobCompleted": True, "contract": {"match": "match"}}),)):
+    submit, poll = sequence(*submissions), sequence(*jobs)
+    server = StubServer(lambda request: submit(request) if request.method == "POST" else poll(request))
+    monkeypatch.setattr(explorers, "SOURCIFY_API_URL", server.url)
+    return server
+
+
+def verify_on_sourcify(logs):
+    return explorers.verify_on_sourcify(ADDRESS, "DssSpell", "1", 3, 1, logs.append)
+
+
+def test_sourcify_polls_until_verified(monkeypatch):
+    logs = []
+    with sourcify(
+        monkeypatch,
+        [(202, {"verificationId": "job-1"})],
+        [(200, {"isJobCompleted": False}), (200, {"isJobCompleted": True, "contract": {"match": "exact_match"}})],
+    ) as server:
+        assert verify_on_sourcify(logs)
+
+    submission, *polls = server.requests
+    assert submission.path == f"/v2/verify/1/{ADDRESS}"
+    assert submission.json() == {
+        "stdJsonInput": {"language": "Solidity"},
+        "compilerVersion": BUILD,
+        "contractIdentifier": "src/DssSpell.sol:DssSpell",
+    }
+    assert [poll.path for poll in polls] == ["/v2/verify/job-1", "/v2/verify/job-1"]
+    assert logs[-1] == "✓ sourcify verification OK (exact_match)"
+
+
+def test_sourcify_already_verified(monkeypatch):
+    logs = []
+    with sourcify(monkeypatch, [(409, {"customCode": "already_verified"})]) as server:
+        assert verify_on_sourcify(logs)
+    assert len(server.requests) == 1
+    assert logs == ["✓ sourcify: already verified"]
+
+
+def test_sourcify_job_already_verified(monkeypatch):
+    logs = []
+    with sourcify(
+        monkeypatch,
+        [(202, {"verificationId": "job-1"})],
+        [(200, {"isJobCompleted": True, "error": {"customCode": "already_verified"}})],
+    ):
+        assert verify_on_sourcify(logs)
+    assert logs[-1] == "✓ sourcify: already verified"
+
+
+def test_sourcify_failure(monkeypatch):
+    logs = []
+    with sourcify(
+        monkeypatch,
+        [(202, {"verificationId": "job-1"})],
+        [(200, {"isJobCompleted": True, "error": {"customCode": "no_match", "message": "Bytecode does not match"}})],
+    ) as server:
+        assert not verify_on_sourcify(logs)
+    assert len(server.requests) == 2
+    assert logs[-2:] == ["Status: Bytecode does not match", "✗ sourcify verification failed"]
+
+
+def test_sourcify_retries_submission_and_polls(monkeypatch):
+    logs = []
+    with sourcify(
+        monkeypatch,
+        [(500, {"message": "Internal error"}), (202, {"verificationId": "job-1"})],
+        [(503, {"message": "Unavailable"}), (200, {"isJobCompleted": True, "contract": {"match": "match"}})],
+    ) as server:
+        assert verify_on_sourcify(logs)
+    assert [request.method for request in server.requests] == ["POST", "POST", "GET", "GET"]
+    assert logs[0] == "Submission rejected (500): Internal error"
+    assert logs[2].startswith("Status check failed")
+
+
+def test_backoff_delays_grow_up_to_the_limit(monkeypatch):
+    monkeypatch.setattr(explorers.random, "uniform", lambda low, high: high)
+    assert list(explorers.backoff_delays(8, 1)) == [1, 2, 4, 8, 16, 32, 60, 60]
+    monkeypatch.undo()
+    assert all(0 <= wait <= 4 for wait in explorers.backoff_delays(3, 1))
@@ -0,0 +1,105 @@
+import pytest
+
+from abi import encode
+from jsonrpc import JsonRpcClient, RpcError, eth_call, to_block_tag
+from stubs import RpcFault, StubServer, address
+
+
+@pytest.fixture
+def numbers(rpc):
+    """Node answering `test_echo` with its parameter, failing for odd numbers if asked to."""
+
+    def echo(params):
+        if params[1] and params[0] % 2:
+            raise RpcFault(f"odd number {params[0]}", -32000)
+        return params[0]
+
+    rpc.methods["test_echo"] = echo
+    return rpc
+
+
+def test_request(rpc):
+    client = JsonRpcClient()
+    assert client.url == rpc.url
+    assert client.chain_id() == "1"
+    with pytest.raises(RpcError, match=r"eth_unknown failed \(-32601\)"):
+        client.request("eth_unknown")
+
+
+def test_missing_url(monkeypatch):
+    monkeypatch.delenv("ETH_RPC_URL", raising=False)
+    with pytest.raises(SystemExit, match="ETH_RPC_URL"):
+        JsonRpcClient()
+
+
+def test_batch_results_follow_the_request_order(numbers):
+    # The stub node shuffles the responses of every batch
+    client = JsonRpcClient(numbers.url)
+    assert client.batch([("test_echo", [n, False]) for n in range(50)]) == list(range(50))
+    assert numbers.batches() == 1
+
+
+def test_batches_are_split_into_chunks(numbers):
+    client = JsonRpcClient(numbers.url, batch_size=7, concurrency=3)
+    assert client.batch([("test_echo", [n, False]) for n in range(50)]) == list(range(50))
+    assert numbers.batches() == 8
+    assert client.batch([]) == []
+
+
+def test_batch_errors_per_item(numbers):
+    client = JsonRpcClient(numbers.url, batch_size=4)
+    results = client.batch([("test_echo", [n, True]) for n in range(10)], raise_errors=False)
+    assert results[::2] == list(range(0, 10, 2))
+    errors = results[1::2]
+    assert all(isinstance(error, RpcError) for error in errors)
+    assert [error.code for error in errors] == [-32000] * 5
+    assert str(errors[0]) == "test_echo failed (-32000): odd number 1"
+
+    with pytest.raises(RpcError, match="odd number"):
+        client.batch([("test_echo", [n, True]) for n in range(10)])
+
+
+def test_batch_answered_with_one_error():
+    error = {"jsonrpc": "2.0", "id": None, "error": {"message": "batch too large"}}
+    with StubServer(lambda request: (200, error)) as node:
+        with pytest.raises(RpcError, match="batch too large"):
+            JsonRpcClient(node.url).batch([("eth_chainId", [])] * 2, raise_errors=False)
+
+
+def test_batch_with_missing_responses():
+    def first_only(request):
+        first = request.json()[0]
+        return 200, [{"jsonrpc": "2.0", "id": first["id"], "result": "0x1"}]
+
+    with StubServer(first_only) as node:
+        results = JsonRpcClient(node.url).batch([("eth_chainId", [])] * 2, raise_errors=False)
+    assert results[0] == "0x1"
+    assert isinstance(results[1], RpcError) and "missing response" in str(results[1])
+
+
+def test_http_errors_are_raised():
+    with StubServer(lambda request: (429, {"message": "Too Many Requests"})) as node:
+        with pytest.raises(Exception, match="429"):
+            JsonRpcClient(node.url).request("eth_chainId")
+
+
+def test_calls_are_encoded_and_decoded(rpc):
+    vat = address(1)
+    rpc.contract(vat, "wards(address)", lambda data: encode(["uint256"], [int(data[-20:].hex(), 16) % 2]))
+    rpc.returns(vat, "live()", ["uint256"], 1)
+    client = JsonRpcClient()
+
+    assert client.call(vat, "wards(address)(uint256)", address(3)) == 1
+    assert client.call(vat, "wards(address)(uint256)", address(4)) == 0
+    method, params = eth_call(vat, "live()(uint256)", block=to_block_tag(123))
+    assert params[1] == "0x7b"
+    assert client.batch([(method, params)]) == ["0x" + encode(["uint256"], [1]).hex()]
+    with pytest.raises(RpcError, match="execution reverted"):
+        client.call(vat, "debt()(uint256)")
+
+
+def test_block_tags():
+    assert to_block_tag(123) == "0x7b"
+    assert to_block_tag("123") == "0x7b"
+    assert to_block_tag("latest") == "latest"
+    assert to_block_tag("0x7b") == "0x7b"
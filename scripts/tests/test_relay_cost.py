@@ -0,0 +1,167 @@
+import asyncio
+import importlib
+
+import pytest
+
+from abi import decode, encode
+from chainlog import CHANGELOG
+from forkpool import Lease
+from stubs import RpcFault, StubRpc, address
+
+relay_cost = importlib.import_module("relay-cost")
+
+OPT_L1_RELAY, ARB_L1_RELAY, L1_MESSENGER, ARB_INBOX = address(10), address(11), address(13), address(14)
+OPT_L2_RELAY, L2_MESSENGER, ARB_L2_RELAY = address(20), address(21), address(30)
+BEDROCK_L1_MESSENGER_IMPL = address(12)
+OPT_SPELL, ARB_SPELL = address(0x51), address(0x52)
+GAS_PRICE = 10**8
+
+
+class StubPool:
+    """Fork pool handing out leases of a stub node, recording them."""
+
+    def __init__(self, url, error=None):
+        self.url = url
+        self.error = error
+        self.acquired = []
+        self.released = []
+
+    def acquire(self, fork_url, block=None):
+        if self.error:
+            raise self.error
+        lease = Lease({"port": 0, "url": self.url, "block": block}, fork_url)
+        self.acquired.append(lease)
+        return lease
+
+    def release(self, lease, discard=False):
+        self.released.append(lease)
+
+
+def estimate_gas(params):
+    return hex(21000 + len(params[0]["data"]))
+
+
+@pytest.fixture
+def l1(rpc):
+    rpc.chainlog(CHANGELOG, {"OPTIMISM_GOV_RELAY": OPT_L1_RELAY, "ARBITRUM_GOV_RELAY": ARB_L1_RELAY})
+    rpc.returns(relay_cost.OPT_ADDRESS_MANAGER, "getAddress(string)", ["address"], BEDROCK_L1_MESSENGER_IMPL)
+    rpc.returns(OPT_L1_RELAY, "l2GovernanceRelay()", ["address"], OPT_L2_RELAY)
+    rpc.returns(OPT_L1_RELAY, "messenger()", ["address"], L1_MESSENGER)
+    rpc.returns(ARB_L1_RELAY, "l2GovernanceRelay()", ["address"], ARB_L2_RELAY)
+    rpc.returns(ARB_L1_RELAY, "inbox()", ["address"], ARB_INBOX)
+    rpc.contract(
+        ARB_INBOX,
+        "calculateRetryableSubmissionFee(uint256,uint256)",
+        lambda data: encode(["uint256"], [1000 + decode(["uint256"], data[:32])[0]]),
+    )
+    return rpc
+
+
+@pytest.fixture
+def l2(monkeypatch):
+    with StubRpc(chain_id=10) as optimism, StubRpc(chain_id=42161) as arbitrum, StubRpc(chain_id=10) as fork:
+        optimism.returns(OPT_L2_RELAY, "messenger()", ["address"], L2_MESSENGER)
+        optimism.methods["eth_estimateGas"] = estimate_gas
+        arbitrum.methods["eth_gasPrice"] = lambda params: hex(GAS_PRICE)
+        arbitrum.methods["eth_estimateGas"] = estimate_gas
+        fork.methods["anvil_setStorageAt"] = lambda params: True
+        fork.methods["eth_estimateGas"] = estimate_gas
+        monkeypatch.setattr(relay_cost, "OPTIMISM_RPC_URL", optimism.url)
+        monkeypatch.setattr(relay_cost, "ARBITRUM_RPC_URL", arbitrum.url)
+        pool = StubPool(fork.url)
+        monkeypatch.setattr(relay_cost, "ForkPool", lambda: pool)
+        yield optimism, arbitrum, fork, pool
+
+
+def run(optimism=(), arbitrum=()):
+    return asyncio.run(relay_cost.estimate(list(optimism), list(arbitrum)))
+
+
+def test_bedrock_optimism_spell_is_estimated_on_a_leased_fork(l1, l2):
+    optimism, _, fork, pool = l2
+    costs = run(optimism=[OPT_SPELL])
+
+    assert costs == {"optimism": {OPT_SPELL: {"OPT_GAS": 21000 + len(relay_cost.relay_calldata(OPT_SPELL))}}}
+    assert pool.released == pool.acquired and len(pool.acquired) == 1
+    (_, (messenger, slot, sender)), (_, (call,)) = fork.calls
+    assert messenger == L2_MESSENGER and int(slot, 16) == relay_cost.X_DOMAIN_MSG_SENDER_SLOT
+    assert int(sender, 16) == int(OPT_L1_RELAY, 16)
+    assert call == {"from": L2_MESSENGER, "to": OPT_L2_RELAY, "data": relay_cost.relay_calldata(OPT_SPELL)}
+    # The relays are resolved in two L1 batches, after the chain id
+    assert l1.batches() == 3
+    assert optimism.count("eth_estimateGas") == 0
+
+
+def test_pre_bedrock_optimism_spell_needs_no_fork(l1, l2):
+    optimism, _, fork, pool = l2
+    pre_bedrock_impl = relay_cost.PRE_BEDROCK_L1_MESSENGER_IMPL
+    l1.returns(relay_cost.OPT_ADDRESS_MANAGER, "getAddress(string)", ["address"], pre_bedrock_impl)
+    costs = run(optimism=[OPT_SPELL])
+
+    assert list(costs["optimism"][OPT_SPELL]) == ["OPT_GAS"]
+    assert pool.acquired == [] and fork.calls == []
+    (call,) = [params[0] for method, params in optimism.calls if method == "eth_estimateGas"]
+    aliased = (int(L1_MESSENGER, 16) + relay_cost.L1_TO_L2_ALIAS_OFFSET) % 2**160
+    assert int(call["from"], 16) == aliased and call["to"] == L2_MESSENGER
+
+
+def test_arbitrum_spell(l1, l2):
+    _, arbitrum, _, pool = l2
+    costs = run(arbitrum=[ARB_SPELL])
+
+    (values,) = costs["arbitrum"].values()
+    calldata_size = (len(relay_cost.relay_calldata(ARB_SPELL)) - 2) // 2
+    max_submission_cost = (1000 + calldata_size) * relay_cost.BASE_FEE_SAFETY_FACTOR
+    assert values["ARB_GAS_PRICE_BID"] == GAS_PRICE
+    assert values["ARB_MAX_SUBMISSION_COST"] == max_submission_cost
+    assert values["ARB_L1_CALL_VALUE"] == values["ARB_MAX_GAS"] * GAS_PRICE + max_submission_cost
+    # The gas price and the estimates share one L2 batch
+    assert arbitrum.batches() == 1
+    assert pool.acquired == []
+
+
+def test_estimate_errors_are_reported_per_spell(l1, l2):
+    _, _, fork, pool = l2
+    spells = [OPT_SPELL, address(0x53)]
+
+    def estimate_or_revert(params):
+        if params[0]["data"] == relay_cost.relay_calldata(spells[1]):
+            raise RpcFault("execution reverted: L2GovernanceRelay/not-from-l1-gov-relay")
+        return estimate_gas(params)
+
+    fork.methods["eth_estimateGas"] = estimate_or_revert
+    costs = run(optimism=spells)
+
+    assert "OPT_GAS" in costs["optimism"][spells[0]]
+    assert "execution reverted" in costs["optimism"][spells[1]]["error"]
+    assert pool.released == pool.acquired
+
+
+def test_lease_failure_is_raised_and_nothing_is_released(l1, l2):
+    _, _, _, pool = l2
+    pool.error = SystemExit("anvil exited before the fork was ready")
+    with pytest.raises(SystemExit, match="anvil exited"):
+        run(optimism=[OPT_SPELL])
+    assert pool.released == []
+
+
+def test_fork_errors_are_not_hidden_and_the_lease_is_released(l1, l2):
+    _, _, fork, pool = l2
+    del fork.methods["anvil_setStorageAt"]
+    with pytest.raises(relay_cost.RpcError, match="anvil_setStorageAt"):
+        run(optimism=[OPT_SPELL])
+    assert pool.released == pool.acquired and len(pool.acquired) == 1
+
+
+def test_missing_relay(l1, l2):
+    l1.chainlog(CHANGELOG, {"ARBITRUM_GOV_RELAY": ARB_L1_RELAY})
+    with pytest.raises(SystemExit, match="OPTIMISM_GOV_RELAY"):
+        run(optimism=[OPT_SPELL])
+
+
+def test_wrong_chain(l1, l2):
+    _, _, _, pool = l2
+    l1.methods["eth_chainId"] = lambda params: hex(5)
+    with pytest.raises(SystemExit, match="Mainnet"):
+        run(optimism=[OPT_SPELL])
+    assert pool.acquired == []
@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+from jsonrpc import JsonRpcClient, RpcError
+from rpcproxy import ResponseCache, RpcProxy, cache_key
+from stubs import RpcFault, StubRpc, address
+
+TX_HASH = "0x" + "ab" * 32
+
+
+@pytest.fixture
+def upstream():
+    with StubRpc() as node:
+        node.methods["eth_getStorageAt"] = lambda params: "0x" + params[1][2:].rjust(64, "0")
+        node.methods["eth_blockNumber"] = lambda params: hex(100)
+        yield node
+
+
+@pytest.fixture
+def proxy(upstream):
+    proxy = RpcProxy(upstream.url)
+    proxy.start()
+    yield proxy
+    proxy.stop()
+
+
+def test_cache_keys():
+    pinned = {"method": "eth_getStorageAt", "params": [address(1), "0x0", "0x64"]}
+    assert cache_key(pinned) == cache_key({**pinned, "id": 7})
+    assert cache_key({"method": "eth_getStorageAt", "params": [address(1), "0x0", "latest"]}) is None
+    assert cache_key({"method": "eth_call", "params": [{"to": address(1)}, {"blockHash": TX_HASH}]}) is not None
+    assert cache_key({"method": "eth_blockNumber", "params": []}) is None
+    assert cache_key({"method": "eth_chainId"}) is not None
+
+
+def test_pinned_requests_are_cached(upstream, proxy):
+    client = JsonRpcClient(proxy.url)
+    calls = [("eth_getStorageAt", [address(1), hex(slot), "0x64"]) for slot in range(3)]
+    assert client.batch(calls) == client.batch(calls)
+    assert upstream.count("eth_getStorageAt") == 3
+    # Sent upstream: the chain id when the proxy started, and the first batch
+    assert proxy.stats == {"requests": 6, "cached": 3, "merged": 0, "upstream": 4}
+
+
+def test_unpinned_requests_are_forwarded(upstream, proxy):
+    client = JsonRpcClient(proxy.url)
+    for _ in range(2):
+        client.request("eth_getStorageAt", [address(1), "0x0", "latest"])
+        client.request("eth_blockNumber")
+    assert upstream.count("eth_getStorageAt") == upstream.count("eth_blockNumber") == 2
+
+
+def test_batch_responses_keep_the_request_order(upstream, proxy):
+    client = JsonRpcClient(proxy.url)
+    client.request("eth_getStorageAt", [address(1), "0x5", "0x64"])
+    # A mix of cached, forwarded and failed requests
+    results = client.batch(
+        [
+            ("eth_getStorageAt", [address(1), "0x4", "0x64"]),
+            ("eth_getStorageAt", [address(1), "0x5", "0x64"]),
+            ("eth_unknownMethod", []),
+            ("eth_blockNumber", []),
+        ],
+        raise_errors=False,
+    )
+    assert results[0] == "0x" + "4".rjust(64, "0") and results[1] == "0x" + "5".rjust(64, "0")
+    assert isinstance(results[2], RpcError) and results[3] == hex(100)
+
+
+def test_pending_transactions_are_not_cached(upstream, proxy):
+    transaction = {"hash": TX_HASH, "blockNumber": None, "blockHash": None}
+    upstream.methods["eth_getTransactionByHash"] = lambda params: dict(transaction)
+    client = JsonRpcClient(proxy.url)
+
+    assert client.request("eth_getTransactionByHash", [TX_HASH])["blockNumber"] is None
+    transaction.update(blockNumber=hex(101), blockHash="0x" + "cd" * 32)
+    assert client.request("eth_getTransactionByHash", [TX_HASH])["blockNumber"] == hex(101)
+    # Mined, the transaction is final
+    client.request("eth_getTransactionByHash", [TX_HASH])
+    assert upstream.count("eth_getTransactionByHash") == 2
+
+
+def test_missing_results_and_errors_are_not_cached(upstream, proxy):
+    receipts = iter([None, {"transactionHash": TX_HASH, "status": "0x1"}])
+    upstream.methods["eth_getTransactionReceipt"] = lambda params: next(receipts)
+
+    def reverted(params):
+        raise RpcFault()
+
+    upstream.methods["eth_call"] = reverted
+    client = JsonRpcClient(proxy.url)
+
+    assert client.request("eth_getTransactionReceipt", [TX_HASH]) is None
+    assert client.request("eth_getTransactionReceipt", [TX_HASH])["status"] == "0x1"
+    assert client.request("eth_getTransactionReceipt", [TX_HASH])["status"] == "0x1"
+    assert upstream.count("eth_getTransactionReceipt") == 2
+    for _ in range(2):
+        with pytest.raises(RpcError, match="execution reverted"):
+            client.request("eth_call", [{"to": address(1), "data": "0x"}, "0x64"])
+    assert upstream.count("eth_call") == 2
+
+
+def test_identical_requests_in_flight_are_merged(upstream, proxy):
+    def slow_storage(params):
+        time.sleep(0.2)
+        return "0x" + "1".rjust(64, "0")
+
+    upstream.methods["eth_getStorageAt"] = slow_storage
+    results = []
+
+    def read():
+        results.append(JsonRpcClient(proxy.url).request("eth_getStorageAt", [address(1), "0x0", "0x64"]))
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1 and len(results) == 4
+    assert upstream.count("eth_getStorageAt") == 1
+    assert proxy.stats["merged"] == 3
+
+
+def test_cache_is_shared_through_the_file_per_chain(upstream, tmp_path):
+    path = str(tmp_path / "rpc-cache.sqlite")
+    request = ("eth_getStorageAt", [address(1), "0x0", "0x64"])
+    for _ in range(2):
+        proxy = RpcProxy(upstream.url, ResponseCache(path))
+        proxy.start()
+        JsonRpcClient(proxy.url).request(*request)
+        proxy.stop()
+    assert upstream.count("eth_getStorageAt") == 1
+
+    with StubRpc(chain_id=10) as other_chain:
+        other_chain.methods["eth_getStorageAt"] = lambda params: "0x" + "2".rjust(64, "0")
+        proxy = RpcProxy(other_chain.url, ResponseCache(path))
+        proxy.start()
+        assert JsonRpcClient(proxy.url).request(*request) == "0x" + "2".rjust(64, "0")
+        proxy.stop()
+
+
+def test_upstream_failures_are_errors(upstream, proxy):
+    client = JsonRpcClient(proxy.url)
+    upstream.handler = lambda request: (502, {"message": "Bad Gateway"})
+    with pytest.raises(RpcError, match="Upstream request failed"):
+        client.request("eth_getStorageAt", [address(1), "0x0", "0x64"])
+
+
+def test_unreachable_upstream():
+    with StubRpc() as node:
+        url = node.url
+    with pytest.raises(SystemExit, match="Could not start the RPC proxy"):
+        RpcProxy(url).start()
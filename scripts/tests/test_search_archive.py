@@ -0,0 +1,112 @@
+import importlib
+import os
+import sqlite3
+
+import pytest
+
+from archive import ArchiveStore
+
+search_archive = importlib.import_module("search-archive")
+
+SPELL = """\
+contract DssSpellAction {
+    function actions() public override {
+        DssExecLib.setIlkStabilityFee("ETH-A", FOUR_PCT_RATE, true);
+    }
+}
+"""
+
+
+def write(root, spell, path, content):
+    full_path = os.path.join(root, spell, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+class CountingStore(ArchiveStore):
+    """Archive store counting the files it hashes."""
+
+    hashed = 0
+
+    def digest(self, name, path):
+        self.hashed += 1
+        return super().digest(name, path)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    root = str(tmp_path / "archive")
+    write(root, "2025-01-09-DssSpell", "DssSpell.sol", SPELL)
+    write(root, "2025-01-09-DssSpell", "test/config.sol", 'string public constant COLLATERAL = "ETH-A";\n')
+    write(root, "2025-02-06-DssSpell", "DssSpell.sol", SPELL.replace("FOUR", "FIVE"))
+    return root
+
+
+def open_index(archive, tmp_path):
+    return search_archive.ArchiveIndex(str(tmp_path / "index.sqlite"), CountingStore(archive))
+
+
+def spells(index, *terms, anywhere=False):
+    return sorted({spell for spell, _, _, _ in index.search(terms, anywhere=anywhere)})
+
+
+def test_search(archive, tmp_path):
+    index = open_index(archive, tmp_path)
+    assert index.update() == 3
+    assert spells(index, "stability", "eth-a") == ["2025-01-09-DssSpell", "2025-02-06-DssSpell"]
+    assert spells(index, "FOUR_PCT_RATE") == ["2025-01-09-DssSpell"]
+    assert spells(index, "override", "four", anywhere=True) == ["2025-01-09-DssSpell"]
+    assert spells(index, "override", "four") == []
+    assert spells(index, "collateral") == ["2025-01-09-DssSpell"]
+    assert spells(index, "unknown") == []
+
+
+def test_unchanged_files_are_not_read(archive, tmp_path):
+    open_index(archive, tmp_path).update()
+    index = open_index(archive, tmp_path)
+    assert index.update() == 0
+    assert index.store.hashed == 0
+
+    # Same content, new modification time: hashed, but not indexed again
+    os.utime(os.path.join(archive, "2025-02-06-DssSpell", "DssSpell.sol"), ns=(0, 0))
+    assert index.update() == 0
+    assert index.store.hashed == 1
+
+    write(archive, "2025-02-06-DssSpell", "DssSpell.sol", SPELL.replace("FOUR", "SIX"))
+    assert index.update() == 1
+    assert spells(index, "six") == ["2025-02-06-DssSpell"]
+
+
+def test_stored_spells_are_read_from_their_manifest(archive, tmp_path):
+    store = ArchiveStore(archive)
+    store.pack("2025-01-09-DssSpell", prune=True)
+    index = open_index(archive, tmp_path)
+    assert index.update() == 3
+    assert spells(index, "FOUR_PCT_RATE") == ["2025-01-09-DssSpell"]
+    assert index.update() == 0
+    assert index.store.hashed == 3
+
+
+def test_removed_spells_are_not_found(archive, tmp_path):
+    index = open_index(archive, tmp_path)
+    index.update()
+    os.rename(os.path.join(archive, "2025-02-06-DssSpell"), os.path.join(archive, "2025-02-07-DssSpell"))
+    os.remove(os.path.join(archive, "2025-01-09-DssSpell", "test", "config.sol"))
+    # The renamed spell is indexed under its new name only
+    assert index.update() == 1
+    assert spells(index, "stability") == ["2025-01-09-DssSpell", "2025-02-07-DssSpell"]
+    assert spells(index, "collateral") == []
+
+
+def test_indexes_without_file_stats_are_migrated(archive, tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE files (spell TEXT NOT NULL, path TEXT NOT NULL, digest TEXT NOT NULL, PRIMARY KEY (spell, path))"
+    )
+    db.commit()
+    db.close()
+    index = search_archive.ArchiveIndex(path, CountingStore(archive))
+    assert index.update() == 3
+    assert spells(index, "stability") == ["2025-01-09-DssSpell", "2025-02-06-DssSpell"]
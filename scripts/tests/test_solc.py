@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import solc
+from stubs import StubServer
+
+SOLC_LIST = {
+    "builds": [
+        {"version": "0.8.16", "longVersion": "0.8.16+commit.07a7930e"},
+        {"version": "0.8.30", "prerelease": "nightly.2025.1.1", "longVersion": "0.8.30-nightly.2025.1.1+commit.0"},
+        {"version": "0.8.30", "longVersion": "0.8.30+commit.73712a01"},
+    ],
+    "releases": {
+        "0.8.16": "solc-linux-amd64-v0.8.16+commit.07a7930e",
+        "0.8.30": "solc-linux-amd64-v0.8.30+commit.73712a01",
+    },
+}
+
+
+@pytest.fixture
+def solc_list(workdir, monkeypatch):
+    with StubServer(lambda request: (200, SOLC_LIST)) as server:
+        monkeypatch.setattr(solc, "SOLC_LIST_URL", f"{server.url}/linux-amd64/list.json")
+        yield server
+
+
+def test_build_from_forge_build_info(workdir, solc_list):
+    (workdir / "out" / "build-info").mkdir(parents=True)
+    (workdir / "out" / "build-info" / "a1.json").write_text(json.dumps({"solcLongVersion": "0.8.16+commit.07a7930e"}))
+    assert solc.long_version("0.8.16") == "0.8.16+commit.07a7930e"
+    assert solc_list.requests == []
+
+
+def test_build_from_release_list_is_cached(solc_list):
+    assert solc.long_version("0.8.30") == "0.8.30+commit.73712a01"
+    assert solc.long_version("0.8.16") == "0.8.16+commit.07a7930e"
+    assert len(solc_list.requests) == 1
+
+
+def test_unknown_version(solc_list):
+    with pytest.raises(SystemExit, match="Unknown solc version 0.9.0"):
+        solc.long_version("0.9.0")
+    assert solc.long_version("0.8.16+commit.07a7930e") == "0.8.16+commit.07a7930e"
+
+
+def test_compiler_version_of_foundry_config(workdir, solc_list):
+    (workdir / "foundry.toml").write_text('[profile.default]\nsrc = "src"\nsolc_version = "0.8.30"\n')
+    assert solc.compiler_version() == "0.8.30+commit.73712a01"
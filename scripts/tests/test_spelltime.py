@@ -0,0 +1,89 @@
+import pytest
+
+from spelltime import convert, earliest_cast_time, next_cast_time, to_timestamp
+
+
+def ts(date):
+    return to_timestamp(date)
+
+
+# 2024-01-01 was a Monday, 2024-01-05 a Friday
+@pytest.mark.parametrize(
+    "eta, expected",
+    [
+        # Within office hours
+        ("2024-01-02 15:30:00", "2024-01-02 15:30:00"),
+        ("2024-01-02 14:00:00", "2024-01-02 14:00:00"),
+        ("2024-01-02 20:59:59", "2024-01-02 20:59:59"),
+        # Before 14:00 on a weekday
+        ("2024-01-02 00:00:00", "2024-01-02 14:00:00"),
+        ("2024-01-02 13:59:59", "2024-01-02 14:00:00"),
+        ("2024-01-01 09:12:34", "2024-01-01 14:00:00"),
+        # At or after 21:00 on a weekday
+        ("2024-01-02 21:00:00", "2024-01-03 14:00:00"),
+        ("2024-01-04 23:59:59", "2024-01-05 14:00:00"),
+        # Friday at or after 21:00 goes to Monday
+        ("2024-01-05 21:00:00", "2024-01-08 14:00:00"),
+        ("2024-01-05 22:45:10", "2024-01-08 14:00:00"),
+        ("2024-01-05 20:59:59", "2024-01-05 20:59:59"),
+        # Saturday and Sunday
+        ("2024-01-06 00:00:00", "2024-01-08 14:00:00"),
+        ("2024-01-06 15:00:00", "2024-01-08 14:00:00"),
+        ("2024-01-07 13:59:59", "2024-01-08 14:00:00"),
+        ("2024-01-07 23:59:59", "2024-01-08 14:00:00"),
+    ],
+)
+def test_office_hours(eta, expected):
+    assert next_cast_time(ts(eta)) == ts(expected)
+
+
+@pytest.mark.parametrize(
+    "eta, now, expected",
+    [
+        # A later `now` is the earliest cast time, within office hours
+        ("2024-01-02 10:00:00", "2024-01-02 16:00:00", "2024-01-02 16:00:00"),
+        ("2024-01-02 10:00:00", "2024-01-05 21:00:00", "2024-01-08 14:00:00"),
+        ("2024-01-02 10:00:00", "2024-01-06 12:00:00", "2024-01-08 14:00:00"),
+        # An earlier `now` does not move the eta forward
+        ("2024-01-02 16:00:00", "2024-01-01 16:00:00", "2024-01-02 16:00:00"),
+        ("2024-01-06 12:00:00", "2024-01-02 16:00:00", "2024-01-08 14:00:00"),
+    ],
+)
+def test_now_after_the_eta(eta, now, expected):
+    assert next_cast_time(ts(eta), ts(now)) == ts(expected)
+
+
+@pytest.mark.parametrize(
+    "eta, now, expected",
+    [
+        ("2024-01-06 03:00:00", None, "2024-01-06 03:00:00"),
+        ("2024-01-05 21:00:00", None, "2024-01-05 21:00:00"),
+        ("2024-01-02 10:00:00", "2024-01-07 23:00:00", "2024-01-07 23:00:00"),
+        ("2024-01-02 10:00:00", "2024-01-01 10:00:00", "2024-01-02 10:00:00"),
+    ],
+)
+def test_without_office_hours(eta, now, expected):
+    now = ts(now) if now else None
+    assert next_cast_time(ts(eta), now, office_hours=False) == ts(expected)
+
+
+def test_earliest_cast_time():
+    schedule = ts("2024-01-04 20:00:00")
+    assert earliest_cast_time(schedule, 2 * 24 * 60 * 60) == {
+        "schedule": schedule,
+        "eta": ts("2024-01-06 20:00:00"),
+        "cast": ts("2024-01-08 14:00:00"),
+    }
+    assert earliest_cast_time(schedule, 60, office_hours=False)["cast"] == schedule + 60
+
+
+def test_convert():
+    assert convert(" 1704067200 ") == {"input": "1704067200", "timestamp": 1704067200, "date": "2024-01-01 00:00:00"}
+    assert convert("2024-01-01T14:00:00Z")["timestamp"] == 1704117600
+    assert convert("2024-01-01 14:00 UTC")["timestamp"] == 1704117600
+
+
+@pytest.mark.parametrize("value", ["", "tomorrow", "2024-13-01", "2024-01-01 25:00", "1.5", "-1704067200"])
+def test_convert_errors(value):
+    with pytest.raises(ValueError):
+        convert(value)
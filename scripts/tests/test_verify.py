@@ -0,0 +1,85 @@
+import sys
+import threading
+import time
+
+import pytest
+
+import verify
+from abi import to_checksum_address
+from stubs import address
+
+SPELL, ACTION = to_checksum_address(address(0x51)), to_checksum_address(address(0x52))
+
+
+class Recorder:
+    """Stands in for the verification pipeline of a contract, recording how many run at once."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.running = 0
+        self.most_running = 0
+        self.verified = []
+        self.lock = threading.Lock()
+
+    def __call__(self, contract_name, contract_address, **kwargs):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.1)
+        with self.lock:
+            self.running -= 1
+            self.verified.append((contract_name, contract_address, kwargs["backend"]))
+        return contract_address not in self.failing
+
+
+@pytest.fixture
+def spell(rpc):
+    rpc.returns(SPELL, "action()", ["address"], ACTION)
+    return rpc
+
+
+def run(monkeypatch, recorder, spell_name, backend="http"):
+    monkeypatch.setattr(verify, "verify_contract_with_verifiers", recorder)
+    monkeypatch.setattr(sys, "argv", ["verify.py", spell_name, SPELL])
+    monkeypatch.setenv("VERIFY_BACKEND", backend)
+    try:
+        verify.main()
+    except SystemExit as exit:
+        return exit.code
+    return 0
+
+
+def test_contracts_are_verified_concurrently(spell, monkeypatch):
+    recorder = Recorder()
+    assert run(monkeypatch, recorder, "DssSpell") == 0
+    assert sorted(recorder.verified) == [("DssSpell", SPELL, "http"), ("DssSpellAction", ACTION, "http")]
+    assert recorder.most_running == 2
+
+
+def test_forge_backend_verifies_one_contract_at_a_time(spell, monkeypatch):
+    recorder = Recorder()
+    assert run(monkeypatch, recorder, "DssSpell", backend="forge") == 0
+    assert len(recorder.verified) == 2
+    assert recorder.most_running == 1
+
+
+def test_spell_named_like_the_action(spell, monkeypatch, capsys):
+    # The results of the spell and the action are kept apart even if both are named DssSpellAction
+    recorder = Recorder(failing=[ACTION])
+    assert run(monkeypatch, recorder, "DssSpellAction") == 1
+    errors = capsys.readouterr().err
+    assert "Failed to verify action contract" in errors
+    assert "Failed to verify spell contract" not in errors
+
+    recorder = Recorder(failing=[SPELL])
+    assert run(monkeypatch, recorder, "DssSpellAction") == 1
+    errors = capsys.readouterr().err
+    assert "Failed to verify spell contract" in errors
+    assert "Failed to verify action contract" not in errors
+
+
+def test_spell_without_action(rpc, monkeypatch, capsys):
+    recorder = Recorder()
+    assert run(monkeypatch, recorder, "DssSpell") == 1
+    assert recorder.verified == [("DssSpell", SPELL, "http")]
+    assert "Could not determine action contract address" in capsys.readouterr().err
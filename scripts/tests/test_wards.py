@@ -0,0 +1,104 @@
+import json
+import sys
+
+import pytest
+
+import wards
+from abi import encode, to_checksum_address
+from chainlog import CHANGELOG
+from jsonrpc import JsonRpcClient, RpcError
+from stubs import RpcFault, address
+
+VAT, JUG, PIP_ETH, SPOT, USER = (to_checksum_address(address(i)) for i in (1, 2, 3, 4, 5))
+MEDIANIZER = to_checksum_address(address(9))
+TARGET = to_checksum_address(address(0x77))
+
+
+@pytest.fixture
+def chain(rpc):
+    rpc.chainlog(CHANGELOG, {"MCD_VAT": VAT, "MCD_JUG": JUG, "PIP_ETH": PIP_ETH, "MCD_SPOT": SPOT, "USER": USER})
+    relied = {
+        VAT: {JUG, SPOT},
+        JUG: {TARGET},
+        PIP_ETH: {VAT},
+        TARGET: {VAT},
+        MEDIANIZER: {TARGET},
+    }
+    for contract, contract_wards in relied.items():
+
+        def is_ward(data, contract_wards=contract_wards):
+            return encode(["uint256"], [int(to_checksum_address("0x" + data[12:32].hex()) in contract_wards)])
+
+        rpc.contract(contract, "wards(address)", is_ward)
+    rpc.returns(PIP_ETH, "src()", ["address"], MEDIANIZER)
+
+    # MCD_SPOT has no `wards` for the target address, and USER is not a contract at all
+    def spot_wards(data):
+        if to_checksum_address("0x" + data[12:32].hex()) == TARGET:
+            raise RpcFault()
+        return encode(["uint256"], [0])
+
+    rpc.contract(SPOT, "wards(address)", spot_wards)
+    return rpc
+
+
+def test_relations_of_a_chainlog_key(chain):
+    relations = wards.scan_wards(JsonRpcClient(), {"MCD_VAT": VAT})
+    assert relations == [
+        ("MCD_VAT", "MCD_JUG"),
+        ("PIP_ETH", "MCD_VAT"),
+        ("MCD_VAT", "MCD_SPOT"),
+    ]
+    # The ChainLog list, its addresses, the wards and `src()`s, and the wards of the sources
+    assert chain.batches() == 4
+
+
+def test_relations_of_an_address(chain):
+    relations = wards.scan_wards(JsonRpcClient(), {"new": TARGET})
+    assert relations == [
+        ("new", "MCD_VAT"),
+        ("MCD_JUG", "new"),
+        (f"{MEDIANIZER} (source of PIP_ETH)", "new"),
+    ]
+
+
+def test_several_targets_and_pinned_blocks(chain):
+    relations = wards.scan_wards(JsonRpcClient(), {"MCD_VAT": VAT, "new": TARGET}, block="0x64")
+    assert len(relations) == len(set(relations)) == 6
+    assert all(params[-1] == "0x64" for method, params in chain.calls if method == "eth_call")
+
+
+def test_reverting_calls_are_no_relations(chain):
+    # Contracts without `wards` or `src()` (and accounts without code) fail the calls of the scan
+    relations = wards.scan_wards(JsonRpcClient(), {"MCD_SPOT": SPOT})
+    assert relations == [("MCD_VAT", "MCD_SPOT")]
+
+
+def test_chainlog_errors_are_raised(rpc):
+    def reverted(data):
+        raise RpcFault()
+
+    rpc.contract(CHANGELOG, "list()", reverted)
+    with pytest.raises(RpcError, match="execution reverted"):
+        wards.scan_wards(JsonRpcClient(), {"new": TARGET})
+
+
+def run(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, "argv", ["wards.py", *args])
+    wards.main()
+    return capsys.readouterr().out
+
+
+def test_main(chain, monkeypatch, capsys):
+    output = run(monkeypatch, capsys, "target=MCD_JUG", "--json")
+    assert json.loads(output) == [{"from": "MCD_VAT", "to": "MCD_JUG"}]
+    output = run(monkeypatch, capsys, f"target={TARGET}")
+    assert output.splitlines()[0] == "Network: ethlive"
+    assert "MCD_JUG -> " + TARGET in output
+
+
+def test_main_errors(chain, monkeypatch, capsys):
+    with pytest.raises(SystemExit, match="Could not find MCD_CAT"):
+        run(monkeypatch, capsys, "target=MCD_CAT")
+    with pytest.raises(SystemExit, match="Please specify"):
+        run(monkeypatch, capsys, "target=")
@@ -1,26 +1,116 @@
 #! /usr/bin/env python3
+"""
+Time Converter
 
+Converts UTC dates to timestamps and back, one value per argument, or every line of a
+file (or stdin) in one pass. With --cast it computes when a spell can be cast at the
+earliest, from its schedule time or eta, the pause delay and the office hours rules,
+without any RPC call; the delay and office hours default to src/test/config.sol.
+
+Usage:
+    ./scripts/time.py [date=<date>] [stamp=<stamp>] [<date or stamp> ...] OR
+    ./scripts/time.py --file <path or -> [--json] OR
+    ./scripts/time.py --cast [--schedule <date or stamp>] [--eta <date or stamp>] [--delay <seconds>] OR
+    make time date=<date> stamp=<stamp> OR
+    make cast-time [schedule=<date or stamp>] [eta=<date or stamp>]
+"""
 import argparse
+import json
+import sys
 from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from spellconfig import SpellConfig
+from spelltime import DATE_FORMAT, convert, earliest_cast_time, next_cast_time, to_date, to_timestamp
+
+WEEKDAY_FORMAT = "%A"
+
+
+def _format(stamp: int) -> str:
+    return f"{to_date(stamp).strftime(DATE_FORMAT)} UTC ({to_date(stamp).strftime(WEEKDAY_FORMAT)}, {stamp})"
+
+
+def convert_lines(lines: Iterable[str], as_json: bool = False) -> bool:
+    """Print every value converted; returns whether all of them could be converted."""
+    ok = True
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            converted = convert(line)
+        except ValueError as error:
+            print(f"{line.strip()}\t{error}", file=sys.stderr)
+            ok = False
+            continue
+        if as_json:
+            print(json.dumps(converted))
+        else:
+            print(f"{converted['input']}\t{converted['date']}\t{converted['timestamp']}")
+    return ok
+
+
+def print_cast_time(
+    schedule: Optional[str], eta: Optional[str], delay: Optional[int], office_hours: Optional[bool]
+) -> None:
+    if delay is None or office_hours is None:
+        try:
+            config = SpellConfig.read()
+        except OSError:
+            sys.exit("Please specify --delay and --office-hours, src/test/config.sol could not be read")
+        delay = config.get("pause_delay") if delay is None else delay
+        office_hours = config.get("office_hours_enabled") if office_hours is None else office_hours
+
+    if eta is not None:
+        eta_time = to_timestamp(eta)
+        times = {"eta": eta_time, "cast": next_cast_time(eta_time, office_hours=office_hours)}
+    else:
+        schedule_time = to_timestamp(schedule) if schedule else int(datetime.now(timezone.utc).timestamp())
+        times = earliest_cast_time(schedule_time, delay, office_hours)
+        print(f"Scheduled:     {_format(times['schedule'])}")
+        print(f"Pause delay:   {delay}s ({delay / 3600:g} hours)")
+    print(f"ETA:           {_format(times['eta'])}")
+    print(f"Office hours:  {'enabled' if office_hours else 'disabled'}")
+    print(f"Earliest cast: {_format(times['cast'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert UTC dates and timestamps, and compute spell cast times")
+    parser.add_argument("values", nargs="*", metavar="value", help="date=<date>, stamp=<stamp>, a date or a timestamp")
+    parser.add_argument("--file", help="Convert every line of the file (- for stdin)")
+    parser.add_argument("--json", action="store_true", help="Print the --file conversions as JSON lines")
+    parser.add_argument("--cast", action="store_true", help="Compute the earliest cast time of a spell")
+    parser.add_argument("--schedule", help="Time the spell is scheduled (default: now)")
+    parser.add_argument("--eta", help="Eta of the scheduled spell, instead of --schedule")
+    parser.add_argument("--delay", type=int, help="Pause delay in seconds (default: pause_delay in the config)")
+    parser.add_argument(
+        "--office-hours",
+        choices=("true", "false"),
+        help="Whether the spell has office hours (default: office_hours_enabled in the config)",
+    )
+    args = parser.parse_args()
+
+    if args.cast:
+        office_hours = None if args.office_hours is None else args.office_hours == "true"
+        print_cast_time(args.schedule, args.eta, args.delay, office_hours)
+        return
+    if args.file:
+        if args.file == "-":
+            ok = convert_lines(sys.stdin, args.json)
+        else:
+            with open(args.file, "r", encoding="utf-8") as f:
+                ok = convert_lines(f, args.json)
+        sys.exit(0 if ok else 1)
+
+    for value in args.values:
+        # Cleanup `date=`/`stamp=` arguments
+        value = value.replace("date=", "").replace("stamp=", "").strip()
+        if not value:
+            continue
+        utc_date = to_date(to_timestamp(value))
+        print(utc_date)
+        # Dates are converted to a timestamp, timestamps to a date
+        print(utc_date.strftime(DATE_FORMAT) if value.isdigit() else int(utc_date.timestamp()))
+
 
-DATE_FORMAT="%Y-%m-%d %H:%M:%S";
-
-# Parse positional arguments
-parser=argparse.ArgumentParser()
-parser.add_argument("date", help="Converts date to UTC timestamp")
-parser.add_argument("stamp", help="Converts timestamp to UTC date")
-parsed=parser.parse_args()
-
-# Cleanup positional arguments
-date = parsed.date.replace("date=", "").upper().replace(" UTC", "")
-stamp = parsed.stamp.replace("stamp=", "")
-
-# Convert provided input in UTC format into desired output in UTC as well
-if date:
-    utc_date = datetime.fromisoformat(date).replace(tzinfo=timezone.utc)
-    print(utc_date)
-    print(int(utc_date.timestamp()))
-if stamp:
-    utc_date = datetime.fromtimestamp(int(stamp), timezone.utc)
-    print(utc_date)
-    print(utc_date.strftime(DATE_FORMAT))
+if __name__ == "__main__":
+    main()
@@ -3,43 +3,65 @@
 Helpers to query on-chain data needed during spell verification (chain ID, action address).
 """
 import os
-import subprocess
 import sys
-from typing import Optional
+from typing import Optional, Tuple
 
+import requests
 
-def get_chain_id() -> str:
-    """Get the current chain ID via ``cast chain-id``."""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from abi import decode_result  # noqa: E402
+from jsonrpc import JsonRpcClient, RpcError, eth_call  # noqa: E402
+
+ACTION_SIGNATURE = "action()(address)"
+
+
+def get_chain_id(client: Optional[JsonRpcClient] = None) -> str:
+    """Get the current chain ID via ``eth_chainId``."""
     print("Obtaining chain ID... ")
     try:
-        result = subprocess.run(
-            ["cast", "chain-id"], capture_output=True, text=True, check=True
-        )
-    except (subprocess.CalledProcessError, FileNotFoundError) as e:
-        print(
-            f"Failed to get chain ID — is ETH_RPC_URL valid and cast installed?\n  {e}",
-            file=sys.stderr,
-        )
+        chain_id = (client or JsonRpcClient()).chain_id()
+    except (requests.exceptions.RequestException, RpcError, ValueError) as e:
+        print(f"Failed to get chain ID — is ETH_RPC_URL valid?\n  {e}", file=sys.stderr)
         sys.exit(1)
-    chain_id = result.stdout.strip()
     print(f"CHAIN_ID: {chain_id}")
     return chain_id
 
 
-def get_action_address(spell_address: str) -> Optional[str]:
+def get_action_address(spell_address: str, client: Optional[JsonRpcClient] = None) -> Optional[str]:
     """Get the action contract address from the spell contract."""
     try:
-        result = subprocess.run(
-            ["cast", "call", spell_address, "action()(address)"],
-            capture_output=True,
-            text=True,
-            check=True,
-            env=os.environ | {"ETH_GAS_PRICE": "0", "ETH_PRIO_FEE": "0"},
-        )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
+        return (client or JsonRpcClient()).call(spell_address, ACTION_SIGNATURE)
+    except (requests.exceptions.RequestException, RpcError, ValueError) as e:
         print(f"Error getting action address: {str(e)}", file=sys.stderr)
         return None
-    except Exception as e:
-        print(f"Unexpected error getting action address: {str(e)}", file=sys.stderr)
-        return None
+
+
+def get_chain_id_and_action_address(
+    spell_address: str, client: Optional[JsonRpcClient] = None
+) -> Tuple[str, Optional[str]]:
+    """Get the chain ID and the action contract address in a single batch request."""
+    print("Obtaining chain ID and action address... ")
+    try:
+        chain_id_hex, action_data = (client or JsonRpcClient()).batch(
+            [("eth_chainId", []), eth_call(spell_address, ACTION_SIGNATURE)],
+            raise_errors=False,
+        )
+    except (requests.exceptions.RequestException, RpcError, ValueError) as e:
+        print(f"Failed to query ETH_RPC_URL — is it valid?\n  {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if isinstance(chain_id_hex, RpcError):
+        print(f"Failed to get chain ID\n  {chain_id_hex}", file=sys.stderr)
+        sys.exit(1)
+    chain_id = str(int(chain_id_hex, 16))
+    print(f"CHAIN_ID: {chain_id}")
+
+    action_address = None
+    if isinstance(action_data, RpcError):
+        print(f"Error getting action address: {action_data}", file=sys.stderr)
+    else:
+        try:
+            action_address = decode_result(ACTION_SIGNATURE, action_data)
+        except ValueError as e:
+            print(f"Error getting action address: {str(e)}", file=sys.stderr)
+    return chain_id, action_address
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Native verification backend that submits the standard-JSON input of the spell
+straight to the Etherscan and Sourcify APIs, instead of running
+`forge verify-contract` once per explorer and contract.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tomllib
+from typing import Callable, Iterator, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flatten import SOURCE_FILE_PATH, flatten, inputs_digest  # noqa: E402
+from solc import compiler_version  # noqa: E402
+
+ETHERSCAN_API_URL = os.environ.get("ETHERSCAN_API_URL", "https://api.etherscan.io/v2/api")
+SOURCIFY_API_URL = os.environ.get("SOURCIFY_API_URL", "https://sourcify.dev/server")
+FOUNDRY_CONFIG_PATH = "foundry.toml"
+STANDARD_JSON_CACHE_DIR = os.path.join("cache", "verification")
+
+MAX_BACKOFF_SECONDS = 60
+REQUEST_TIMEOUT_SECONDS = 30
+
+Logger = Callable[[str], None]
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_standard_json_lock = threading.Lock()
+_compiler_version: Optional[str] = None
+_compiler_version_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Shared HTTP session, so all submissions reuse pooled connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def backoff_delays(retries: int, delay: int) -> Iterator[float]:
+    """Exponential backoff with full jitter: up to `retries` waits starting at `delay` seconds."""
+    for attempt in range(retries):
+        yield random.uniform(0, min(MAX_BACKOFF_SECONDS, delay * 2**attempt))
+
+
+def get_compiler_version() -> str:
+    """Full solc build string matching the version configured in foundry.toml."""
+    global _compiler_version
+    with _compiler_version_lock:
+        if _compiler_version is None:
+            _compiler_version = compiler_version(FOUNDRY_CONFIG_PATH)
+        return _compiler_version
+
+
+def build_standard_json_input(flat_source: str) -> dict:
+    """Standard-JSON compiler input for the flattened spell, using foundry.toml settings."""
+    with open(FOUNDRY_CONFIG_PATH, "rb") as f:
+        profile = tomllib.load(f)["profile"]["default"]
+
+    # Libraries are flattened into the spell source, so they are linked from there.
+    libraries: dict = {}
+    for library in profile.get("libraries", []):
+        _, name, address = library.split(":")
+        libraries.setdefault(SOURCE_FILE_PATH, {})[name] = address
+
+    return {
+        "language": "Solidity",
+        "sources": {SOURCE_FILE_PATH: {"content": flat_source}},
+        "settings": {
+            "optimizer": {
+                "enabled": bool(profile.get("optimizer", False)),
+                "runs": int(profile.get("optimizer_runs", 200)),
+            },
+            "evmVersion": profile.get("evm_version", "cancun"),
+            "viaIR": bool(profile.get("via_ir", False)),
+            "libraries": libraries,
+            "outputSelection": {
+                "*": {"*": ["abi", "evm.bytecode", "evm.deployedBytecode", "metadata"]}
+            },
+        },
+    }
+
+
+def get_standard_json_input() -> dict:
+    """Standard-JSON input for the spell, flattening at most once per source change."""
+    with _standard_json_lock:
+        path = os.path.join(STANDARD_JSON_CACHE_DIR, f"{inputs_digest()}.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        standard_json = build_standard_json_input(flatten())
+        os.makedirs(STANDARD_JSON_CACHE_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(standard_json, f)
+        return standard_json
+
+
+def verify_on_etherscan(
+    address: str,
+    contract_name: str,
+    chain_id: str,
+    api_key: str,
+    retries: int,
+    delay: int,
+    log: Logger,
+) -> bool:
+    """Submit the standard-JSON input to Etherscan and poll until it is processed."""
+    session = get_session()
+    url = f"{ETHERSCAN_API_URL}?chainid={chain_id}"
+    submission = {
+        "apikey": api_key,
+        "module": "contract",
+        "action": "verifysourcecode",
+        "contractaddress": address,
+        "sourceCode": json.dumps(get_standard_json_input()),
+        "codeformat": "solidity-standard-json-input",
+        "contractname": f"{SOURCE_FILE_PATH}:{contract_name}",
+        "compilerversion": f"v{get_compiler_version()}",
+    }
+
+    # The explorer might not have indexed a freshly deployed contract yet,
+    # so the submission itself is retried as well.
+    guid = None
+    for wait in [0.0, *backoff_delays(retries, delay)]:
+        time.sleep(wait)
+        try:
+            response = session.post(url, data=submission, timeout=REQUEST_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            body = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log(f"Submission failed: {e}")
+            continue
+        result = str(body.get("result", ""))
+        if "already verified" in result.lower():
+            log("✓ etherscan: already verified")
+            return True
+        if body.get("status") == "1":
+            guid = result
+            break
+        log(f"Submission rejected: {result}")
+    if guid is None:
+        log("✗ etherscan verification failed")
+        return False
+
+    log(f"Submitted, GUID: {guid}")
+    for wait in backoff_delays(retries + 1, delay):
+        time.sleep(wait)
+        try:
+            response = session.get(
+                url,
+                params={
+                    "apikey": api_key,
+                    "module": "contract",
+                    "action": "checkverifystatus",
+                    "guid": guid,
+                },
+                timeout=REQUEST_TIMEOUT_SECONDS,
+            )
+            response.raise_for_status()
+            result = str(response.json().get("result", ""))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log(f"Status check failed: {e}")
+            continue
+        log(f"Status: {result}")
+        if "already verified" in result.lower():
+            log("✓ etherscan: already verified")
+            return True
+        if result.startswith("Pass"):
+            log("✓ etherscan verification OK")
+            return True
+        if result.startswith("Fail"):
+            break
+
+    log("✗ etherscan verification failed")
+    return False
+
+
+def verify_on_sourcify(
+    address: str,
+    contract_name: str,
+    chain_id: str,
+    retries: int,
+    delay: int,
+    log: Logger,
+) -> bool:
+    """Submit the standard-JSON input to Sourcify and poll the verification job."""
+    session = get_session()
+    submission = {
+        "stdJsonInput": get_standard_json_input(),
+        "compilerVersion": get_compiler_version(),
+        "contractIdentifier": f"{SOURCE_FILE_PATH}:{contract_name}",
+    }
+
+    verification_id = None
+    for wait in [0.0, *backoff_delays(retries, delay)]:
+        time.sleep(wait)
+        try:
+            response = session.post(
+                f"{SOURCIFY_API_URL}/v2/verify/{chain_id}/{address}",
+                json=submission,
+                timeout=REQUEST_TIMEOUT_SECONDS,
+            )
+            body = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log(f"Submission failed: {e}")
+            continue
+        if response.status_code == 409:
+            log("✓ sourcify: already verified")
+            return True
+        if response.status_code == 202 and body.get("verificationId"):
+            verification_id = body["verificationId"]
+            break
+        log(f"Submission rejected ({response.status_code}): {body.get('message', body)}")
+    if verification_id is None:
+        log("✗ sourcify verification failed")
+        return False
+
+    log(f"Submitted, verification ID: {verification_id}")
+    for wait in backoff_delays(retries + 1, delay):
+        time.sleep(wait)
+        try:
+            response = session.get(
+                f"{SOURCIFY_API_URL}/v2/verify/{verification_id}",
+                timeout=REQUEST_TIMEOUT_SECONDS,
+            )
+            response.raise_for_status()
+            job = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log(f"Status check failed: {e}")
+            continue
+        if not job.get("isJobCompleted"):
+            log("Status: pending")
+            continue
+        error = job.get("error")
+        if error:
+            if error.get("customCode") == "already_verified":
+                log("✓ sourcify: already verified")
+                return True
+            log(f"Status: {error.get('message', error)}")
+            break
+        match = (job.get("contract") or {}).get("match")
+        if match:
+            log(f"✓ sourcify verification OK ({match})")
+            return True
+        break
+
+    log("✗ sourcify verification failed")
+    return False
@@ -1,18 +1,34 @@
 #!/usr/bin/env python3
 """
 Enhanced contract verification script for Sky Protocol spells on mainnet.
-This script verifies both the DssSpell and DssSpellAction contracts on multiple block explorers
-using forge verify-contract --flatten with robust retry mechanisms and fallback options.
+This script verifies both the DssSpell and DssSpellAction contracts on multiple block explorers,
+either by submitting the flattened standard-JSON input over HTTP (default) or by running
+forge verify-contract --flatten, with robust retry mechanisms and fallback options.
 """
 import os
 import sys
 import subprocess
-from typing import Tuple, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 
-from contract_data import get_chain_id, get_action_address
+from contract_data import get_chain_id_and_action_address
+from explorers import verify_on_etherscan, verify_on_sourcify
 
 # Constants
 SOURCE_FILE_PATH = "src/DssSpell.sol"
+BACKENDS = ("http", "forge")
+
+# Serializes output of the concurrently running verification pipelines
+_output_lock = threading.Lock()
+
+
+def log(message: str, prefix: str = "", error: bool = False) -> None:
+    """Print every line of the message with the given prefix, without interleaving."""
+    stream = sys.stderr if error else sys.stdout
+    with _output_lock:
+        for line in message.splitlines() or [""]:
+            print(f"{prefix}{line}", file=stream, flush=True)
 
 
 def require_env_var(var_name: str, error_message: str) -> None:
@@ -80,7 +96,36 @@ def verify_once_on(
     retries: int,
     delay: int,
     etherscan_api_key: str = "",
+    backend: str = "http",
+    chain_id: str = "1",
 ) -> bool:
+    prefix = f"[{contract_name}/{verifier}] "
+
+    if backend == "http":
+        log(f"Verifying {contract_name} at {address} on {verifier}...", prefix)
+
+        def report(message: str) -> None:
+            log(message, prefix, error=message.startswith("✗"))
+
+        if verifier == "etherscan":
+            return verify_on_etherscan(
+                address=address,
+                contract_name=contract_name,
+                chain_id=chain_id,
+                api_key=etherscan_api_key,
+                retries=retries,
+                delay=delay,
+                log=report,
+            )
+        return verify_on_sourcify(
+            address=address,
+            contract_name=contract_name,
+            chain_id=chain_id,
+            retries=retries,
+            delay=delay,
+            log=report,
+        )
+
     cmd = build_forge_cmd(
         verifier=verifier,
         address=address,
@@ -90,7 +135,7 @@ def verify_once_on(
         etherscan_api_key=etherscan_api_key,
     )
 
-    print(f"\nVerifying {contract_name} at {address} on {verifier}...")
+    log(f"Verifying {contract_name} at {address} on {verifier}...", prefix)
     # Workaround for Forge bug: when ETHERSCAN_API_KEY is set, Forge ignores
     # --verifier sourcify and uses Etherscan (see
     # https://github.com/foundry-rs/foundry/issues/10774)
@@ -98,34 +143,32 @@ def verify_once_on(
     env = os.environ | {"ETHERSCAN_API_KEY": ""} if verifier == "sourcify" else os.environ
 
     try:
-        result = subprocess.run(
+        process = subprocess.Popen(
             cmd,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
-            check=False,
             env=env,
         )
     except FileNotFoundError:
-        print("✗ forge not found in PATH", file=sys.stderr)
+        log("✗ forge not found in PATH", prefix, error=True)
         return False
 
-    stdout = result.stdout or ""
-    stderr = result.stderr or ""
-    combined = f"{stdout}\n{stderr}".strip()
-    combined_lower = combined.lower()
+    # Stream forge output as it arrives for easier debugging.
+    output: List[str] = []
+    for line in process.stdout:
+        output.append(line)
+        log(line.rstrip("\n"), prefix)
+    returncode = process.wait()
 
-    # Surface forge output for easier debugging.
-    if stdout:
-        print(stdout.strip())
-    if stderr:
-        print(stderr.strip(), file=sys.stderr)
+    combined_lower = "".join(output).lower()
 
     if "already verified" in combined_lower:
-        print(f"✓ {verifier}: already verified")
+        log(f"✓ {verifier}: already verified", prefix)
         return True
 
-    if result.returncode != 0:
-        print(f"✗ {verifier} verification failed", file=sys.stderr)
+    if returncode != 0:
+        log(f"✗ {verifier} verification failed", prefix, error=True)
         return False
 
     # Guard against false-positives where forge returns 0 but output indicates failure.
@@ -136,10 +179,10 @@ def verify_once_on(
         "not verified",
     )
     if any(marker in combined_lower for marker in failure_markers):
-        print(f"✗ {verifier} verification failed", file=sys.stderr)
+        log(f"✗ {verifier} verification failed", prefix, error=True)
         return False
 
-    print(f"✓ {verifier} verification OK")
+    log(f"✓ {verifier} verification OK", prefix)
     return True
 
 
@@ -150,8 +193,10 @@ def verify_contract_with_verifiers(
     etherscan_api_key: str,
     retries: int,
     delay: int,
+    backend: str = "http",
 ) -> bool:
-    """Verify contract by issuing forge commands per explorer."""
+    """Verify contract on every configured explorer, one after another."""
+    prefix = f"[{contract_name}] "
     attempted = 0
     successes = 0
 
@@ -165,10 +210,12 @@ def verify_contract_with_verifiers(
             retries=retries,
             delay=delay,
             etherscan_api_key=etherscan_api_key,
+            backend=backend,
+            chain_id=chain_id,
         ):
             successes += 1
     elif chain_id == "1":
-        print("ETHERSCAN_API_KEY not set; skipping Etherscan.")
+        log("ETHERSCAN_API_KEY not set; skipping Etherscan.", prefix)
 
     # Sourcify (works without API key); blockscout pulls from it.
     if chain_id == "1":
@@ -179,26 +226,68 @@ def verify_contract_with_verifiers(
             contract_name=contract_name,
             retries=retries,
             delay=delay,
+            backend=backend,
+            chain_id=chain_id,
         ):
             successes += 1
     else:
-        print(f"Sourcify not configured for CHAIN_ID {chain_id}, skipping.")
+        log(f"Sourcify not configured for CHAIN_ID {chain_id}, skipping.", prefix)
 
     if successes == 0:
         return False
 
     if attempted > successes:
-        print(
+        log(
             (
                 f"Warning: verification partially succeeded for {contract_name} "
                 f"({successes}/{attempted} explorers)."
             ),
-            file=sys.stderr,
+            prefix,
+            error=True,
         )
 
     return True
 
 
+def verify_contracts_concurrently(
+    contracts: Dict[str, Tuple[str, str]],
+    chain_id: str,
+    etherscan_api_key: str,
+    retries: int,
+    delay: int,
+    backend: str = "http",
+) -> Dict[str, bool]:
+    """Run the per-contract verification pipelines in parallel.
+
+    Explorers are still called in order within each pipeline, so the
+    Etherscan-before-Sourcify rule holds for every contract. The forge
+    backend runs one contract at a time, as concurrent `forge verify-contract`
+    runs in the same project share its cache/ and out/ directories.
+
+    Args:
+        contracts: (contract name, address) of every contract, by role (e.g. "spell")
+
+    Returns:
+        Mapping of role to its verification result.
+    """
+    workers = 1 if backend == "forge" else max(len(contracts), 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            role: executor.submit(
+                verify_contract_with_verifiers,
+                contract_name=contract_name,
+                contract_address=contract_address,
+                chain_id=chain_id,
+                etherscan_api_key=etherscan_api_key,
+                retries=retries,
+                delay=delay,
+                backend=backend,
+            )
+            for role, (contract_name, contract_address) in contracts.items()
+        }
+        return {role: future.result() for role, future in futures.items()}
+
+
 def main():
     """Main entry point for the enhanced verification script."""
     try:
@@ -213,44 +302,40 @@ def main():
         # Parse command line arguments
         spell_name, spell_address = parse_command_line_args()
 
+        # Resolve the chain and the action contract up front in one round trip,
+        # so both verification pipelines can start together
+        chain_id, action_address = get_chain_id_and_action_address(spell_address)
+
         # Parse configuration from environment
-        chain_id = get_chain_id()
         # Optional on mainnet; verification still succeeds via Sourcify without it.
         etherscan_api_key = os.environ.get("ETHERSCAN_API_KEY", "")
         retries = int(os.environ.get("VERIFY_RETRIES", "5"))
         delay = int(os.environ.get("VERIFY_DELAY", "5"))
-
-        # Verify spell contract
-        spell_success = verify_contract_with_verifiers(
-            contract_name=spell_name,
-            contract_address=spell_address,
-            chain_id=chain_id,
-            etherscan_api_key=etherscan_api_key,
-            retries=retries,
-            delay=delay,
-        )
-
-        if not spell_success:
-            print("Failed to verify spell contract", file=sys.stderr)
-            sys.exit(1)
-
-        # Get and verify action contract
-        action_address = get_action_address(spell_address)
-        if not action_address:
+        backend = os.environ.get("VERIFY_BACKEND", "http")
+        if backend not in BACKENDS:
+            sys.exit(f"Unknown VERIFY_BACKEND {backend!r}, expected one of: {', '.join(BACKENDS)}")
+
+        # Keyed by role, as the spell may be named DssSpellAction too
+        contracts = {"spell": (spell_name, spell_address)}
+        if action_address:
+            contracts["action"] = ("DssSpellAction", action_address)
+        else:
             print("Could not determine action contract address", file=sys.stderr)
-            sys.exit(1)
 
-        action_success = verify_contract_with_verifiers(
-            contract_name="DssSpellAction",
-            contract_address=action_address,
+        results = verify_contracts_concurrently(
+            contracts=contracts,
             chain_id=chain_id,
             etherscan_api_key=etherscan_api_key,
             retries=retries,
             delay=delay,
+            backend=backend,
         )
 
-        if not action_success:
+        if not results["spell"]:
+            print("Failed to verify spell contract", file=sys.stderr)
+        if action_address and not results["action"]:
             print("Failed to verify action contract", file=sys.stderr)
+        if not action_address or not all(results.values()):
             sys.exit(1)
 
         print("\n🎉 All verifications complete!")
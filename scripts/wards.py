@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+ChainLog Ward Scanner
+
+Lists which ChainLog contracts (and their price sources) rely on the given targets, and
+which ones the targets rely on. The ChainLog is listed once, every address is resolved in
+one batch, and the `wards` of every target/contract pair are then checked in one more batch
+(plus one for the `src()` of oracles), instead of several `cast call`s per ChainLog key.
+
+Usage:
+    ./scripts/wards.py <target> [<target> ...] [--json] OR
+    make wards target=<target>
+
+Where <target> is an address (e.g. 0x35D1b3F3D7966A1DFe207aa4514C12a259A0492B)
+or a ChainLog key (e.g. MCD_VAT)
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+from chainlog import CHAIN_NAMES, decode_or_none, get_addresses, list_keys
+from jsonrpc import DEFAULT_BATCH_SIZE, JsonRpcClient, eth_call, to_block_tag
+
+WARDS_SIGNATURE = "wards(address)(uint256)"
+SRC_SIGNATURE = "src()(address)"
+
+
+def scan_wards(client: JsonRpcClient, targets: Dict[str, str], block: str = "latest") -> List[Tuple[str, str]]:
+    """Find every `rely` relation between the targets and the ChainLog contracts.
+
+    Args:
+        client: The JSON-RPC client
+        targets: Target addresses by the label to print them with
+        block: Block tag to scan at
+
+    Returns:
+        `(from, to)` label pairs where `to` is a ward of `from`
+    """
+    keys = list_keys(client, block=block)
+    contracts = {key: address for key, address in get_addresses(client, keys, block=block).items() if address}
+
+    calls = [eth_call(address, SRC_SIGNATURE, block=block) for address in contracts.values()]
+    pairs = [(label, target, key, address) for label, target in targets.items() for key, address in contracts.items()]
+    for _, target, _, address in pairs:
+        calls.append(eth_call(target, WARDS_SIGNATURE, address, block=block))
+        calls.append(eth_call(address, WARDS_SIGNATURE, target, block=block))
+    results = client.batch(calls, raise_errors=False)
+
+    sources = {
+        key: decode_or_none(SRC_SIGNATURE, result)
+        for key, result in zip(contracts, results[:len(contracts)])
+    }
+    sources = {key: src for key, src in sources.items() if src}
+
+    ward_results = results[len(contracts):]
+    relies = {}
+    for i, (label, _, key, _) in enumerate(pairs):
+        relies[(label, key)] = decode_or_none(WARDS_SIGNATURE, ward_results[2 * i]) == 1
+        relies[(key, label)] = decode_or_none(WARDS_SIGNATURE, ward_results[2 * i + 1]) == 1
+
+    # Price sources of oracles, e.g. the medianizer behind an OSM
+    source_pairs = [(label, target, key, src) for label, target in targets.items() for key, src in sources.items()]
+    source_results = client.batch(
+        [eth_call(src, WARDS_SIGNATURE, target, block=block) for _, target, _, src in source_pairs],
+        raise_errors=False,
+    )
+    for (label, _, key, _), result in zip(source_pairs, source_results):
+        relies[(f"src:{key}", label)] = decode_or_none(WARDS_SIGNATURE, result) == 1
+
+    # Targets can be ChainLog keys themselves, so the same relation may show up twice
+    relations: Dict[Tuple[str, str], None] = {}
+    for label in targets:
+        for key in contracts:
+            if relies[(label, key)]:
+                relations[(label, key)] = None
+            if relies[(key, label)]:
+                relations[(key, label)] = None
+            if relies.get((f"src:{key}", label)):
+                relations[(f"{sources[key]} (source of {key})", label)] = None
+    return list(relations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan the ChainLog for wards of the given targets")
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        metavar="target",
+        help="Target address or ChainLog key, e.g. MCD_VAT",
+    )
+    parser.add_argument("--block", default="latest", help="Block number or tag to scan at (default: latest)")
+    parser.add_argument("--json", action="store_true", help="Print the relations as JSON")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Maximum number of calls per JSON-RPC batch (default: {DEFAULT_BATCH_SIZE})",
+    )
+    args = parser.parse_args()
+
+    labels = [target.replace("target=", "") for target in args.targets]
+    labels = [label for label in labels if label]
+    if not labels:
+        sys.exit(
+            "Please specify the Target Address (e.g. target=0x35D1b3F3D7966A1DFe207aa4514C12a259A0492B) "
+            "or ChainLog Key (e.g. target=MCD_VAT) to inspect"
+        )
+
+    client = JsonRpcClient(batch_size=args.batch_size)
+    block = to_block_tag(args.block)
+    keys = [label for label in labels if not label.startswith("0x")]
+    addresses = get_addresses(client, keys, block=block) if keys else {}
+    for key in keys:
+        if addresses[key] is None:
+            sys.exit(f"Could not find {key} in the ChainLog")
+    targets = {label: addresses.get(label, label) for label in labels}
+    relations = scan_wards(client, targets, block=block)
+
+    if args.json:
+        print(json.dumps([{"from": source, "to": ward} for source, ward in relations], indent=2))
+        return
+
+    chain_id = client.chain_id()
+    print(f"Network: {CHAIN_NAMES.get(chain_id, chain_id)}")
+    for source, ward in relations:
+        print(f"{source} -> {ward}")
+
+
+if __name__ == "__main__":
+    main()
@@ -36,6 +36,7 @@ contract Rates {
         rates[  150] = 1000000000472114805215157978;
         rates[  175] = 1000000000550121712943459312;
         rates[  200] = 1000000000627937192491029810;
+        rates[  210] = 1000000000659009994589562852;
         rates[  225] = 1000000000705562181084137268;
         rates[  250] = 1000000000782997609082909351;
         rates[  262] = 1000000000820099554044024241;